@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Benchmark aller Löser gegen den echten Katalog (.service_config.json)
+
+Jeder registrierte Löser rechnet ein festes Raster aus Zielbeträgen und
+Mengenprofilen. Gemessen werden Latenz (Perzentile), Durchsatz und die
+Abweichung von der optimalen Differenz; die Ergebnisse lassen sich als JSON
+speichern und mit einem früheren Lauf vergleichen:
+
+    python service_benchmark.py --output bench.json
+    python service_benchmark.py --compare bench.json
+
+Zusätzlich wird der Kaltstart der Kommandozeile gemessen (Import plus
+Katalog laden in einem frischen Interpreter); über STARTUP_BUDGET_MS oder
+mit geladenem GUI-Toolkit bzw. NumPy gilt das als Regression.
+
+Als Optimum dient die exakte DP (solve_dp), die in den Tests gegen
+vollständige Aufzählung geprüft wird; echte Aufzählung ist für 36 Services
+nicht machbar.
+"""
+
+import argparse
+import ast
+import compileall
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from service_logic import SOLVERS, ServiceCalculatorLogic, load_numpy, solve_dp, to_cents
+
+CONFIG_FILE = ".service_config.json"
+TARGETS = [12.34, 99.99, 150.00, 487.65, 1500.98, 3210.55]
+PROFILES = {
+    "cap1": lambda n: [1] * n,
+    "cap5": lambda n: [5] * n,
+    "cap1000": lambda n: [1000] * n,
+    "mixed": lambda n: [(0, 3, 12, 1, 40)[i % 5] for i in range(n)],
+}
+# 旧的贪心副本（模块导入时会直接运行脚本，所以只取出函数本身）
+LEGACY_COPIES = ["test_unit_greedy.py", "test_greedy_no_gui.py", "reproduce_error.py"]
+# 相对上次结果变慢超过这个倍数时标记为回归
+REGRESSION_FACTOR = 1.25
+# 命令行冷启动（导入 + 读取目录）的上限，以及启动时不允许出现的重模块
+STARTUP_BUDGET_MS = 50
+HEAVY_MODULES = ("tkinter", "PyQt5", "numpy", "concurrent.futures.process", "logging")
+STARTUP_SCRIPT = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import service_calculator_cli\n"
+    "service_calculator_cli.ServiceCalculatorLogic().services\n"
+    "elapsed = (time.perf_counter() - start) * 1000\n"
+    "print(elapsed, *[m for m in {heavy!r} if m in sys.modules])\n"
+)
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_catalog(path: str = CONFIG_FILE) -> List[float]:
+    """Preise wie in der Kommandozeile: SQLite-Speicher oder JSON-Stand plus Änderungsprotokoll"""
+    calc = ServiceCalculatorLogic()
+    calc.config_file = path
+    return [service["price"] for service in calc.services]
+
+
+def load_legacy_solver(path: str) -> Callable:
+    """Lade nur die Funktion ``find_best_combination`` aus einer Skriptdatei"""
+    with open(path, "r") as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == "find_best_combination":
+            namespace = {}
+            exec(compile(ast.Module(body=[node], type_ignores=[]), path, "exec"), namespace)
+            return namespace["find_best_combination"]
+    raise ValueError(f"{path} enthält keine find_best_combination")
+
+
+def registered_solvers() -> Dict[str, Callable]:
+    """Alle Löser: die aus SOLVERS, NumPy-Backend, Greedy und die alten Kopien"""
+    solvers = dict(SOLVERS)
+    if load_numpy() is not None:
+        solvers["dp-numpy"] = lambda p, q, t: solve_dp(p, q, t, backend="numpy")
+    solvers["greedy"] = ServiceCalculatorLogic().find_greedy_combination
+    for path in LEGACY_COPIES:
+        if os.path.exists(path):
+            solvers["legacy:" + os.path.splitext(path)[0]] = load_legacy_solver(path)
+    return solvers
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Perzentil nach der Nearest-Rank-Methode"""
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+def run_solver(solver: Callable, prices: List[float], targets: List[float],
+               profiles: Dict[str, List[int]], optimum: Dict, repeat: int) -> dict:
+    """Miss einen Löser über das ganze Raster"""
+    latencies = []
+    gaps = []
+    invalid = 0
+    weights = [to_cents(p) if p > 0 else 0 for p in prices]
+    for name, quantities in profiles.items():
+        for target in targets:
+            for _ in range(repeat):
+                with contextlib.redirect_stdout(io.StringIO()):  # 旧实现会打印每一步
+                    start = time.perf_counter()
+                    combo = solver(prices, quantities, target)[0]
+                    latencies.append(time.perf_counter() - start)
+            # 用返回的组合重新按分计算，避免浮点结果掩盖误差
+            if len(combo) != len(prices) or any(not 0 <= q <= (c if w > 0 else 0)
+                                                for q, c, w in zip(combo, quantities, weights)):
+                invalid += 1
+                continue
+            total = sum(w * q for w, q in zip(weights, combo))
+            gaps.append(abs(total - to_cents(target)) - optimum[name, target])
+    elapsed = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+        },
+        "throughput_per_s": len(latencies) / elapsed if elapsed > 0 else None,
+        "gap_cents": {
+            "mean": sum(gaps) / len(gaps) if gaps else None,
+            "max": max(gaps) if gaps else None,
+        },
+        "exact_rate": sum(1 for g in gaps if g == 0) / (len(gaps) + invalid),
+        "invalid": invalid,
+    }
+
+
+def measure_startup(repeat: int = 10) -> dict:
+    """Kaltstart der Kommandozeile in frischen Interpretern (jeweils der beste Lauf)"""
+    # 和安装后的程序一样先生成字节码，否则测到的是编译时间
+    compileall.compile_dir(HERE, maxlevels=0, quiet=1)
+    script = STARTUP_SCRIPT.format(heavy=HEAVY_MODULES)
+    import_times = []
+    process_times = []
+    heavy = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.split()
+        process_times.append(time.perf_counter() - start)
+        import_times.append(float(output[0]))
+        heavy = output[1:]
+    return {
+        "import_ms": min(import_times),
+        "process_ms": min(process_times) * 1000,
+        "heavy_modules": heavy,
+    }
+
+
+def check_startup(startup: dict) -> List[str]:
+    """Verstöße gegen das Startbudget"""
+    problems = []
+    if startup["import_ms"] > STARTUP_BUDGET_MS:
+        problems.append(f"Kaltstart: {startup['import_ms']:.1f} ms > {STARTUP_BUDGET_MS} ms")
+    if startup["heavy_modules"]:
+        problems.append(f"Kaltstart lädt {', '.join(startup['heavy_modules'])}")
+    return problems
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(prices: List[float], solvers: Dict[str, Callable], targets: List[float] = None,
+                  profiles: Dict[str, Callable] = None, repeat: int = 3) -> dict:
+    """Führe das Raster für alle Löser aus und liefere die Ergebnisse als dict"""
+    targets = TARGETS if targets is None else targets
+    profiles = {name: make(len(prices)) for name, make in (PROFILES if profiles is None else profiles).items()}
+    optimum = {}
+    for name, quantities in profiles.items():
+        for target in targets:
+            optimum[name, target] = to_cents(solve_dp(prices, quantities, target)[2])
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "targets": targets,
+        "profiles": list(profiles),
+        "repeat": repeat,
+        "solvers": {name: run_solver(solver, prices, targets, profiles, optimum, repeat)
+                    for name, solver in solvers.items()},
+    }
+
+
+def compare(current: dict, previous: dict) -> List[str]:
+    """Regressionen gegenüber einem früheren Lauf (langsamer oder ungenauer)"""
+    problems = []
+    for name, result in current["solvers"].items():
+        old = previous.get("solvers", {}).get(name)
+        if old is None:
+            continue
+        ratio = result["latency_ms"]["p50"] / old["latency_ms"]["p50"] if old["latency_ms"]["p50"] else 1
+        if ratio > REGRESSION_FACTOR:
+            problems.append(f"{name}: p50 {old['latency_ms']['p50']:.2f} ms -> "
+                            f"{result['latency_ms']['p50']:.2f} ms (x{ratio:.2f})")
+        if result["exact_rate"] < old["exact_rate"] or result["invalid"] > old["invalid"]:
+            problems.append(f"{name}: Trefferquote {old['exact_rate']:.0%} -> {result['exact_rate']:.0%}, "
+                            f"ungültig {old['invalid']} -> {result['invalid']}")
+    return problems
+
+
+def format_report(results: dict) -> str:
+    lines = [f"{'Löser':28} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'Aufrufe/s':>10} "
+             f"{'exakt':>6} {'Lücke Ø':>9} {'ungültig':>8}"]
+    for name, r in results["solvers"].items():
+        gap = r["gap_cents"]["mean"]
+        throughput = r["throughput_per_s"]
+        lines.append(f"{name:28} {r['latency_ms']['p50']:9.2f} {r['latency_ms']['p90']:9.2f} "
+                     f"{r['latency_ms']['p99']:9.2f} {throughput or 0:10.1f} {r['exact_rate']:6.0%} "
+                     f"{'-' if gap is None else f'{gap / 100:.2f}':>9} {r['invalid']:8d}")
+    startup = results.get("startup")
+    if startup is not None:
+        lines.append(f"\nKaltstart Kommandozeile: {startup['import_ms']:.1f} ms "
+                     f"(Prozess gesamt {startup['process_ms']:.1f} ms, Budget {STARTUP_BUDGET_MS} ms)")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark aller Löser gegen .service_config.json")
+    parser.add_argument("--solvers", help="Kommagetrennte Auswahl (Standard: alle)")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen je Ziel und Profil (Standard: 3)")
+    parser.add_argument("--output", metavar="DATEI", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--compare", metavar="DATEI", help="Mit früherem JSON-Ergebnis vergleichen")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    solvers = registered_solvers()
+    if args.solvers:
+        names = args.solvers.split(",")
+        unknown = [name for name in names if name not in solvers]
+        if unknown:
+            print(f"Unbekannte Löser: {', '.join(unknown)} (vorhanden: {', '.join(solvers)})", file=sys.stderr)
+            return 2
+        solvers = {name: solvers[name] for name in names}
+
+    results = run_benchmark(load_catalog(), solvers, repeat=args.repeat)
+    results["startup"] = measure_startup()
+    print(format_report(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    problems = check_startup(results["startup"])
+    if args.compare:
+        with open(args.compare, "r") as f:
+            problems += compare(results, json.load(f))
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,17 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import json
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from service_database import open_store
+from service_logic import solve_dp
+from service_storage import CatalogJournal
+from service_trace import TRACE, format_steps
 
 class ServiceCalculator:
+    # Ruhepause (ms), nach der Tastendruck-Änderungen eines Feldes als ein Protokolleintrag gespeichert werden
+    CHANGE_DELAY_MS = 500
+
     def __init__(self, root):
         self.root = root
         self.root.title("Service-Rechner")
@@ -12,9 +20,17 @@ class ServiceCalculator:
         
         # Konfigurationsdatei für persistente Daten
         self.config_file = ".service_config.json"
+        # Einzelne Änderungen landen als kleine Einträge im Änderungsprotokoll (ohne SQLite-Speicher)
+        self.journal = None
+        # 输入中的改价先按行合并，停顿后每行只写一条日志
+        self.pending_changes = {}
+        self.pending_job = None
+        # Optionaler SQLite-Speicher (wenn .service_catalog.db existiert) und dessen aktives Projekt
+        self.store = None
+        self.project_name = None
         
         # Service-Daten mit Standardwerten
-        self.services = [
+        self.default_services = [
             {"name": "LO1", "price": 27.85},
             {"name": "LO2", "price": 14.91},
             {"name": "LO3", "price": 6.80},
@@ -52,6 +68,7 @@ class ServiceCalculator:
             {"name": "L31", "price": 0.68},
             {"name": "L32+L33", "price": 0.68}
         ]
+        self.services = [dict(service) for service in self.default_services]
         
         # Lade gespeicherte Konfiguration
         self.load_config()
@@ -65,25 +82,82 @@ class ServiceCalculator:
         self.create_widgets()
         
     def load_config(self):
-        """Lade gespeicherte Service-Preise aus Konfigurationsdatei"""
+        """Lade gespeicherte Service-Preise aus Konfigurationsdatei (oder dem SQLite-Speicher)"""
+        if self.store is not None:
+            self.store.close()
+        self.store = open_store(self.config_file)
+        if self.store is not None:
+            # 数据库里存的是完整的服务列表（名称和价格），只读当前项目
+            self.project_name = self.store.active_project()
+            if self.project_name is not None:
+                self.services = self.store.load(self.project_name)
+            else:
+                self.project_name = "Service-Rechner"
+            return
+        # 重新加载时从默认数据开始，日志不会被重放两次
+        self.services = [dict(service) for service in self.default_services]
+        snapshot_seq = 0
         if os.path.exists(self.config_file):
             try:
                 with open(self.config_file, 'r') as f:
                     saved_prices = json.load(f)
+                    snapshot_seq = saved_prices.get("journal_seq", 0)
                     for i, service in enumerate(self.services):
                         if str(i) in saved_prices:
                             self.services[i]["price"] = saved_prices[str(i)]
             except Exception as e:
                 print(f"Fehler beim Laden der Konfiguration: {e}")
+        # 快照之后的修改记录在日志里
+        self.journal = CatalogJournal(self.config_file)
+        self.journal.replay(self.services, snapshot_seq)
     
     def save_config(self):
-        """Speichere aktuelle Service-Preise in Konfigurationsdatei"""
+        """Speichere aktuelle Service-Preise in Konfigurationsdatei (sofort, atomar) und leere das Protokoll"""
+        if self.store is not None:
+            # 只写有变化的行
+            self.store.save(self.project_name, self.services)
+            return
+        # 快照已包含尚未写入日志的修改
+        self.cancel_pending_changes()
+        prices_to_save = {str(i): service["price"] for i, service in enumerate(self.services)}
+        self.journal.compact(prices_to_save)
+    
+    def record_change(self, op: str, **fields):
+        """Einzelne Änderung speichern: ein Protokolleintrag, Gesamtstand erst ab der Größenschwelle"""
+        if self.store is not None:
+            # 数据库按行写入，代价很小
+            self.save_config()
+            return
         try:
-            prices_to_save = {str(i): service["price"] for i, service in enumerate(self.services)}
-            with open(self.config_file, 'w') as f:
-                json.dump(prices_to_save, f)
-        except Exception as e:
-            print(f"Fehler beim Speichern der Konfiguration: {e}")
+            if self.journal.append(op, **fields):
+                self.save_config()
+        except OSError as e:
+            print(f"Fehler beim Speichern: {e}")
+    
+    def schedule_change(self, index: int, **fields):
+        """Änderung bei jedem Tastendruck: nach kurzer Ruhepause ein Protokolleintrag je Zeile"""
+        self.pending_changes.setdefault(index, {}).update(fields)
+        if self.pending_job is not None:
+            self.root.after_cancel(self.pending_job)
+        self.pending_job = self.root.after(self.CHANGE_DELAY_MS, self.flush_changes)
+    
+    def flush_changes(self):
+        """Schreibe zurückgehaltene Änderungen sofort"""
+        changes = self.pending_changes
+        self.cancel_pending_changes()
+        for index, fields in changes.items():
+            self.record_change("set", index=index, **fields)
+    
+    def cancel_pending_changes(self):
+        if self.pending_job is not None:
+            self.root.after_cancel(self.pending_job)
+            self.pending_job = None
+        self.pending_changes = {}
+    
+    def close(self):
+        """Fenster schließen; Änderungen aus der Ruhepause gehen nicht verloren"""
+        self.flush_changes()
+        self.root.destroy()
     
     def create_widgets(self):
         """Erstelle die GUI-Elemente"""
@@ -122,6 +196,10 @@ class ServiceCalculator:
         calculate_btn = ttk.Button(target_frame, text="Berechnen", command=self.calculate_optimal_combination)
         calculate_btn.grid(row=0, column=2, padx=10)
         
+        # Rechenschritte des Lösers unter dem Ergebnis anzeigen
+        self.show_steps_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(target_frame, text="Schritte anzeigen", variable=self.show_steps_var).grid(row=0, column=3, padx=5)
+        
         # Ergebnisbereich
         result_frame = ttk.LabelFrame(main_frame, text="Ergebnis", padding="10")
         result_frame.grid(row=len(self.services) + 4, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=10)
@@ -157,7 +235,7 @@ class ServiceCalculator:
                 new_price = int(price_var.get())
                 if new_price > 0:
                     self.services[row_index]["price"] = new_price
-                    self.save_config()
+                    self.schedule_change(row_index, price=new_price)
                 else:
                     price_var.set(str(self.services[row_index]["price"]))
             except ValueError:
@@ -233,13 +311,21 @@ class ServiceCalculator:
                     current_quantities.append(0)
                     service_prices.append(self.services[i]["price"])
             
-            # Optimale Kombination berechnen
-            best_combination, best_total, difference = self.find_best_combination(
-                service_prices, current_quantities, target_amount
-            )
+            # Optimale Kombination berechnen (Schritte nur aufzeichnen, wenn sie angezeigt werden)
+            steps = None
+            if self.show_steps_var.get():
+                with TRACE.recording() as events:
+                    best_combination, best_total, difference = self.find_best_combination(
+                        service_prices, current_quantities, target_amount
+                    )
+                steps = format_steps(events, [service["name"] for service in self.services])
+            else:
+                best_combination, best_total, difference = self.find_best_combination(
+                    service_prices, current_quantities, target_amount
+                )
             
             # Ergebnis anzeigen
-            self.display_result(best_combination, best_total, difference, target_amount)
+            self.display_result(best_combination, best_total, difference, target_amount, steps)
             
         except ValueError:
             messagebox.showerror("Fehler", "Ungültiger Zielbetrag. Bitte geben Sie eine gültige Zahl ein.")
@@ -248,77 +334,14 @@ class ServiceCalculator:
     
     def find_best_combination(self, prices: List[int], current_quantities: List[int], target: float) -> Tuple[List[int], float, float]:
         """
-        贪心算法 + 最小服务微调方案
-        第一步：用大服务快速接近目标（贪心）
-        第二步：用最小价格服务精确调整剩余误差
-        第三步：确保结果在输入约束内
+        精确动态规划（整数分）：在数量上限内找与目标金额最接近的组合
+        具体实现见 service_logic.solve_dp
         """
-        n = len(prices)
-        if n == 0:
-            return [], 0, target
-        
-        # 过滤有效服务（价格>0且有库存）
-        valid_items = [(prices[i], i) for i in range(n) if prices[i] > 0 and current_quantities[i] > 0]
-        if not valid_items:
-            return [0] * n, 0, target
-        
-        # 按价格从大到小排序
-        valid_items.sort(reverse=True)
-        
-        combo = [0] * n
-        remaining_target = target
-        
-        # 第一步：用大服务快速接近目标（贪心）
-        for price, idx in valid_items[:-1]:  # 除了最小的服务
-            if remaining_target <= 0:
-                break
-            # 计算可以使用的最大数量（不超过库存）
-            max_allowed = current_quantities[idx]
-            # 计算需要的数量
-            needed_qty = int(remaining_target / price)
-            # 实际使用数量
-            actual_qty = min(needed_qty, max_allowed)
-            
-            if actual_qty > 0:
-                combo[idx] = actual_qty
-                remaining_target -= price * actual_qty
-                print(f"步骤1 - 使用 {actual_qty} 个 {self.services[idx]['name']} (单价{price}), 剩余目标: {remaining_target:.2f}")
-        
-        # 第二步：用最小价格服务精确调整
-        if remaining_target > 0 and valid_items:
-            min_price, min_idx = valid_items[-1]  # 最小价格服务
-            min_max_allowed = current_quantities[min_idx]
-            
-            # 计算需要的最小服务数量
-            if remaining_target > 0:
-                needed_min_qty = int(remaining_target / min_price)
-                # 允许稍微超过一点点来达到目标
-                if needed_min_qty * min_price < remaining_target:
-                    needed_min_qty += 1
-                
-                # 实际使用数量（不超过库存）
-                actual_min_qty = min(needed_min_qty, min_max_allowed)
-                combo[min_idx] = actual_min_qty
-                remaining_target -= min_price * actual_min_qty
-                print(f"步骤2 - 使用 {actual_min_qty} 个 {self.services[min_idx]['name']} (单价{min_price}), 剩余目标: {remaining_target:.2f}")
-        
-        # 第三步：确保结果在输入约束内
-        # 验证所有数量都不超过输入限制
-        for i in range(n):
-            if combo[i] > current_quantities[i]:
-                print(f"⚠️  警告: 服务 {self.services[i]['name']} 计算量 {combo[i]} 超过输入量 {current_quantities[i]}")
-            combo[i] = min(combo[i], current_quantities[i])
-        
-        # 计算最终结果
-        total = sum(prices[i] * combo[i] for i in range(n))
-        difference = abs(total - target)
-        
-        print(f"\n最终结果 - 总金额: {total:.2f}, 目标: {target:.2f}, 差异: {difference:.2f}")
-        
-        return combo, total, difference
+        return solve_dp(prices, current_quantities, target)
     
-    def display_result(self, combination: List[int], total: float, difference: float, target: float):
-        """Zeige das Berechnungsergebnis an"""
+    def display_result(self, combination: List[int], total: float, difference: float, target: float,
+                       steps: Optional[List[str]] = None):
+        """Zeige das Berechnungsergebnis an (optional mit den Rechenschritten)"""
         self.result_text.config(state=tk.NORMAL)
         self.result_text.delete(1.0, tk.END)
         
@@ -347,12 +370,16 @@ class ServiceCalculator:
         else:
             result += f"\n⚠️ Abweichung: {difference/target*100:.2f}%"
         
+        if steps:
+            result += "\n\nRechenschritte:\n" + "-" * 30 + "\n" + "\n".join(steps)
+        
         self.result_text.insert(tk.END, result)
         self.result_text.config(state=tk.DISABLED)
 
 def main():
     root = tk.Tk()
     app = ServiceCalculator(root)
+    root.protocol("WM_DELETE_WINDOW", app.close)
     root.mainloop()
 
 if __name__ == "__main__":
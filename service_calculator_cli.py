@@ -3,15 +3,228 @@
 服务计算器 - 命令行版本（无需 tkinter）
 """
 
-from service_logic import ServiceCalculatorLogic
+from service_logic import ServiceCalculatorLogic, find_best_combinations, reducible_quantities
+from service_trace import TRACE, format_steps
+import argparse
+import contextlib
+import json
+import math
 import sys
 
-def main():
+# 退出码
+EXIT_OK = 0
+EXIT_BAD_RECORDS = 1  # 有无法处理的输入行（其余行照常输出）
+EXIT_USAGE = 2        # 参数错误或输入文件无法打开
+
+# 批量模式下每次一起求解的目标数（内存占用与输入总量无关）
+BATCH_CHUNK = 256
+# 最大目标金额（欧元）：表格按分建，更大的目标会占用数百 MB 内存
+MAX_TARGET = 100_000
+# 每个服务的最大数量；JSON 里的 Infinity 或 1e400 不能变成整数
+MAX_QUANTITY = 1_000_000
+
+
+def parse_record(line, services, default_cap):
+    """
+    解析一行输入，返回 (目标金额, 各服务数量上限)
+    CSV:   目标[,上限1,上限2,...]
+    JSONL: {"target": 目标, "quantities": [上限...] 或 {"服务名": 上限}}
+    没给上限的服务使用 default_cap
+    """
+    if line.startswith("{"):
+        return parse_request(json.loads(line), services, default_cap)
+    caps = [default_cap] * len(services)
+    fields = [field.strip() for field in line.split(",")]
+    target = float(fields[0])
+    if len(fields) - 1 > len(caps):
+        raise ValueError("zu viele Mengen")
+    caps[:len(fields) - 1] = [_quantity(q) if q else 0 for q in fields[1:]]
+    return _checked(target, caps)
+
+
+def parse_request(record, services, default_cap):
+    """解析一个 JSON 请求（已解码的 dict），格式同 JSONL 输入行"""
+    caps = [default_cap] * len(services)
+    target = float(record["target"])
+    quantities = record.get("quantities", [])
+    if isinstance(quantities, dict):
+        names = {service["name"]: i for i, service in enumerate(services)}
+        for name, qty in quantities.items():
+            if name not in names:
+                raise ValueError(f"unbekannter Service: {name}")
+            caps[names[name]] = _quantity(qty)
+    else:
+        quantities = list(quantities)
+        if len(quantities) > len(caps):
+            raise ValueError("zu viele Mengen")
+        caps[:len(quantities)] = [_quantity(q) for q in quantities]
+    return _checked(target, caps)
+
+
+def _quantity(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError("Menge muss eine endliche Zahl sein")
+    quantity = int(value)
+    if quantity > MAX_QUANTITY:
+        raise ValueError(f"Menge darf höchstens {MAX_QUANTITY} sein")
+    return quantity
+
+
+def _checked(target, caps):
+    if not math.isfinite(target):
+        raise ValueError("Zielbetrag muss eine endliche Zahl sein")
+    if target <= 0:
+        raise ValueError("Zielbetrag muss größer als 0 sein")
+    if target > MAX_TARGET:
+        raise ValueError(f"Zielbetrag darf höchstens {MAX_TARGET} sein")
+    return target, [max(0, c) for c in caps]
+
+
+def result_record(target, services, result):
+    """一个结果 → JSON 对象（dict）"""
+    combination, total, difference = result
+    return {
+        "target": target,
+        "total": round(total, 2),
+        "difference": round(difference, 2),
+        "combination": {service["name"]: qty for service, qty in zip(services, combination) if qty > 0},
+    }
+
+
+def reduction_record(target, services, quantities, result):
+    """减少模式的一个结果 → JSON 对象（dict）"""
+    reduction, reduced, difference = result
+    original = sum(service["price"] * qty for service, qty in zip(services, quantities))
+    return {
+        "target": target,
+        "reduced": round(reduced, 2),
+        "difference": round(difference, 2),
+        "original_total": round(original, 2),
+        "final_total": round(original - reduced, 2),
+        "reduction": {service["name"]: qty for service, qty in zip(services, reduction) if qty > 0},
+    }
+
+
+def format_result(target, services, result):
+    """一个结果 → 一行 JSON"""
+    return json.dumps(result_record(target, services, result), ensure_ascii=False)
+
+
+def format_reduction(target, services, quantities, result):
+    """减少模式的一个结果 → 一行 JSON"""
+    return json.dumps(reduction_record(target, services, quantities, result), ensure_ascii=False)
+
+
+def run_batch(source, out, err, calc, default_cap, reduce=False):
+    """
+    流式批量模式：逐行读取目标，每行输出一个 JSON 结果
+    相邻且数量上限相同的目标凑成一组，用 find_best_combinations 一起求解
+    reduce=True 时每行给的是现有数量，目标是要减少的金额（每个服务至少保留 1 个，
+    与 service_logic.solve_reduction 相同）
+    """
+    prices = [service["price"] for service in calc.services]
+    exit_code = EXIT_OK
+    pending = []  # (目标, 上限, 现有数量, 行号)
+
+    def flush():
+        nonlocal exit_code
+        # 按上限分组，保持输出顺序
+        start = 0
+        while start < len(pending):
+            caps = pending[start][1]
+            end = start
+            while end < len(pending) and pending[end][1] == caps:
+                end += 1
+            group = pending[start:end]
+            try:
+                results = find_best_combinations(prices, caps, [target for target, _, _, _ in group])
+            except (ValueError, OverflowError, MemoryError) as e:
+                # 一组失败不影响其他组
+                for _, _, _, line_no in group:
+                    err.write(f"Zeile {line_no}: {str(e) or type(e).__name__}\n")
+                exit_code = EXIT_BAD_RECORDS
+                start = end
+                continue
+            for (target, _, quantities, _), result in zip(group, results):
+                if reduce:
+                    out.write(format_reduction(target, calc.services, quantities, result) + "\n")
+                else:
+                    out.write(format_result(target, calc.services, result) + "\n")
+            start = end
+        pending.clear()
+        out.flush()
+
+    for line_no, line in enumerate(source, 1):
+        line = line.strip()
+        if not line or line.startswith("#") or line.lower().startswith("target"):
+            continue
+        try:
+            target, quantities = parse_record(line, calc.services, default_cap)
+        except (ValueError, KeyError, TypeError) as e:
+            flush()
+            err.write(f"Zeile {line_no}: {e}\n")
+            exit_code = EXIT_BAD_RECORDS
+            continue
+        caps = reducible_quantities(prices, quantities) if reduce else quantities
+        pending.append((target, caps, quantities, line_no))
+        if len(pending) >= BATCH_CHUNK:
+            flush()
+    flush()
+    return exit_code
+
+
+def main_batch(args):
+    calc = ServiceCalculatorLogic(project=args.project)
+    try:
+        calc.services
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        source = sys.stdin if args.batch == "-" else open(args.batch, "r", encoding="utf-8")
+    except OSError as e:
+        print(f"Eingabe kann nicht geöffnet werden: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        default = 0 if args.reduce else args.cap
+        return run_batch(source, sys.stdout, sys.stderr, calc, default, reduce=args.reduce)
+    except BrokenPipeError:
+        # 下游（如 head）提前关闭管道
+        sys.stderr.close()
+        return EXIT_OK
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Service-Rechner (Kommandozeile)")
+    parser.add_argument("--batch", metavar="DATEI", nargs="?", const="-",
+                        help="Stapelbetrieb: Ziele als CSV/JSONL aus DATEI oder stdin (-), "
+                             "je Zeile ein JSON-Ergebnis auf stdout")
+    parser.add_argument("--cap", type=int, default=1000,
+                        help="Mengenobergrenze für Services ohne eigene Angabe (Standard: 1000)")
+    parser.add_argument("--reduce", action="store_true",
+                        help="Reduziermodus: Mengen je Zeile sind der aktuelle Bestand, das Ziel ist der "
+                             "abzuziehende Betrag (mindestens 1 je Service bleibt; ohne Angabe Menge 0)")
+    parser.add_argument("--project", metavar="NAME",
+                        help="Projekt aus .service_catalog.db (Standard: das aktive Projekt)")
+    parser.add_argument("--steps", action="store_true",
+                        help="Interaktiv: Rechenschritte des Lösers unter jedem Ergebnis anzeigen")
+    return parser.parse_args(argv)
+
+
+def main(steps=False, project=None):
     print("=" * 60)
     print("🎯 服务计算器 - 命令行版本")
     print("=" * 60)
     
-    calc = ServiceCalculatorLogic()
+    calc = ServiceCalculatorLogic(project=project)
+    try:
+        calc.services
+    except ValueError as e:
+        print(f"❌ 错误: {e}")
+        return
     
     # 显示所有服务
     print("\n📋 可用服务:")
@@ -39,9 +252,10 @@ def main():
             prices = [s['price'] for s in calc.services]
             current_quantities = [0] * len(prices)
             
-            combination, total, difference = calc.find_best_combination(
-                prices, current_quantities, target_amount
-            )
+            with TRACE.recording() if steps else contextlib.nullcontext([]) as events:
+                combination, total, difference = calc.find_best_combination(
+                    prices, current_quantities, target_amount
+                )
             
             # 显示结果
             print(f"\n🔍 计算结果:")
@@ -66,6 +280,11 @@ def main():
                 print("✅ 非常接近！")
             else:
                 print("⚠️ 有一定差距")
+
+            if steps:
+                print("\n🧮 计算步骤:")
+                for line in format_steps(events, [s['name'] for s in calc.services]):
+                    print(f"  {line}")
                 
         except ValueError:
             print("❌ 错误：请输入有效的数字")
@@ -76,4 +295,7 @@ def main():
             print(f"❌ 错误: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    arguments = parse_args()
+    if arguments.batch is not None:
+        sys.exit(main_batch(arguments))
+    main(steps=arguments.steps, project=arguments.project)
\ No newline at end of file
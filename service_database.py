@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Optionaler Katalogspeicher in SQLite: viele Projekte in einer Datei
+
+Liegt neben .service_config.json eine .service_catalog.db, lesen und
+schreiben alle Oberflächen ihre Services dort statt in der JSON-Datei:
+
+- Beim Laden wird nur der Katalog des gewählten Projekts gelesen (Standard:
+  das zuletzt aktive), andere Projekte bleiben unberührt.
+- ``save`` vergleicht mit dem gespeicherten Stand und schreibt nur geänderte
+  Zeilen; ein geänderter Preis ist also genau ein UPDATE.
+
+Die Datenbank entsteht einmalig aus den vorhandenen JSON-Dateien:
+
+    python service_database.py --migrate                      # .service_config.json
+    python service_database.py --migrate projekt_a.json projekt_b.json
+    python service_database.py --list
+    python service_database.py --activate "Projekt B"
+
+Noch nicht komprimierte Einträge im Änderungsprotokoll (``.journal``) werden
+dabei mit übernommen. Die JSON-Dateien bleiben als Sicherung unverändert liegen.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from service_storage import CatalogJournal
+
+CONFIG_FILE = ".service_config.json"
+DB_FILE = ".service_catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS services (
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (project_id, position)
+);
+"""
+
+
+def catalog_db_path(config_file: str = CONFIG_FILE) -> str:
+    """Pfad der Datenbank neben der JSON-Konfiguration"""
+    return os.path.join(os.path.dirname(os.path.abspath(config_file)), DB_FILE)
+
+
+def open_store(config_file: str = CONFIG_FILE) -> Optional["CatalogStore"]:
+    """Datenbank neben ``config_file`` öffnen, falls vorhanden (sonst None: JSON verwenden)"""
+    path = catalog_db_path(config_file)
+    return CatalogStore(path) if os.path.exists(path) else None
+
+
+class CatalogStore:
+    """Projekte und ihre Services in einer SQLite-Datei"""
+
+    def __init__(self, path: str = DB_FILE):
+        import sqlite3  # 只有真的用数据库时才导入，不拖慢命令行启动
+        self.path = path
+        self.rows_written = 0  # 实际写入的服务行数
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        # WAL：写入中途崩溃不会损坏数据库，读的工具不会被写阻塞
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def projects(self) -> List[str]:
+        return [name for name, in self._db.execute("SELECT name FROM projects ORDER BY name")]
+
+    def active_project(self) -> Optional[str]:
+        """Zuletzt aktives Projekt (oder das erste, falls keines markiert ist)"""
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'active_project'").fetchone()
+        if row is not None and self._project_id(row[0]) is not None:
+            return row[0]
+        projects = self.projects()
+        return projects[0] if projects else None
+
+    def set_active_project(self, project: str):
+        if self._project_id(project) is None:
+            raise KeyError(project)
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('active_project', ?)", (project,))
+
+    def load(self, project: str) -> List[dict]:
+        """Services eines Projekts in gespeicherter Reihenfolge"""
+        project_id = self._project_id(project)
+        if project_id is None:
+            raise KeyError(project)
+        return [{"name": name, "price": price} for name, price in self._db.execute(
+            "SELECT name, price FROM services WHERE project_id = ? ORDER BY position", (project_id,))]
+
+    def count(self, project: str) -> int:
+        """Anzahl Services eines Projekts, ohne den Katalog zu laden"""
+        return self._db.execute("SELECT COUNT(*) FROM services JOIN projects ON projects.id = project_id "
+                                "WHERE projects.name = ?", (project,)).fetchone()[0]
+
+    def save(self, project: str, services: List[dict]):
+        """Speichere den Katalog eines Projekts; geschrieben werden nur geänderte Zeilen"""
+        with self._db:
+            project_id = self._project_id(project)
+            if project_id is None:
+                project_id = self._db.execute("INSERT INTO projects (name) VALUES (?)", (project,)).lastrowid
+            stored = self._db.execute("SELECT name, price FROM services WHERE project_id = ? ORDER BY position",
+                                      (project_id,)).fetchall()
+            for position, service in enumerate(services):
+                row = (service["name"], float(service["price"]))
+                if position >= len(stored):
+                    self._db.execute("INSERT INTO services (project_id, position, name, price) VALUES (?, ?, ?, ?)",
+                                     (project_id, position) + row)
+                elif stored[position] != row:
+                    self._db.execute("UPDATE services SET name = ?, price = ? WHERE project_id = ? AND position = ?",
+                                     row + (project_id, position))
+                else:
+                    continue
+                self.rows_written += 1
+            if len(stored) > len(services):
+                self._db.execute("DELETE FROM services WHERE project_id = ? AND position >= ?",
+                                 (project_id, len(services)))
+                self.rows_written += len(stored) - len(services)
+
+    def delete_project(self, project: str):
+        with self._db:
+            self._db.execute("DELETE FROM projects WHERE name = ?", (project,))
+
+    def import_json(self, config_file: str) -> str:
+        """Übernimm eine JSON-Konfiguration (Format der Oberflächen) als neues Projekt"""
+        with open(config_file, "r") as f:
+            config = json.load(f)
+        if "services" not in config:
+            raise ValueError(f"{config_file}: kein 'services'-Eintrag (altes Preisformat ohne Namen)")
+        project = config.get("project_name") or os.path.splitext(os.path.basename(config_file))[0]
+        if self._project_id(project) is not None:
+            raise ValueError(f"Projekt '{project}' existiert bereits")
+        # 快照之后的修改还在日志里，一起迁移
+        services = config["services"]
+        CatalogJournal(config_file).replay(services, config.get("journal_seq", 0))
+        self.save(project, services)
+        return project
+
+    def _project_id(self, project: str) -> Optional[int]:
+        row = self._db.execute("SELECT id FROM projects WHERE name = ?", (project,)).fetchone()
+        return row[0] if row is not None else None
+
+
+def migrate(config_files: List[str], db_path: str) -> List[str]:
+    """Einmalige Übernahme der JSON-Dateien; das erste Projekt wird aktiv"""
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} existiert bereits")
+    store = CatalogStore(db_path)
+    try:
+        projects = [store.import_json(config_file) for config_file in config_files]
+        store.set_active_project(projects[0])
+    except BaseException:
+        store.close()
+        os.unlink(db_path)
+        raise
+    store.close()
+    return projects
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite-Katalogspeicher für mehrere Projekte")
+    parser.add_argument("--db", help="Datenbankdatei (Standard: .service_catalog.db neben der Konfiguration)")
+    parser.add_argument("--migrate", metavar="JSON", nargs="*",
+                        help="Einmalig aus JSON-Dateien anlegen (Standard: .service_config.json)")
+    parser.add_argument("--list", action="store_true", help="Projekte auflisten")
+    parser.add_argument("--activate", metavar="PROJEKT", help="Projekt für die Oberflächen auswählen")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    db_path = args.db or catalog_db_path(CONFIG_FILE)
+    if args.migrate is not None:
+        try:
+            projects = migrate(args.migrate or [CONFIG_FILE], db_path)
+        except (OSError, ValueError) as e:
+            print(f"Migration fehlgeschlagen: {e}", file=sys.stderr)
+            return 1
+        print(f"{len(projects)} Projekt(e) nach {db_path} übernommen: {', '.join(projects)}")
+        return 0
+    if not os.path.exists(db_path):
+        print(f"{db_path} existiert nicht (zuerst --migrate)", file=sys.stderr)
+        return 1
+    store = CatalogStore(db_path)
+    try:
+        if args.activate:
+            try:
+                store.set_active_project(args.activate)
+            except KeyError:
+                print(f"Unbekanntes Projekt: {args.activate}", file=sys.stderr)
+                return 1
+        active = store.active_project()
+        for project in store.projects():
+            print(f"{'*' if project == active else ' '} {project} ({store.count(project)} Services)")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
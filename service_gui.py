@@ -1,9 +1,294 @@
 import sys
 import json
 import os
+import threading
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, \
-    QPushButton, QTableWidget, QTableWidgetItem, QGroupBox, QTextEdit, QMessageBox, QDialog, QFormLayout
-from PyQt5.QtCore import Qt
+    QPushButton, QTableView, QHeaderView, QAbstractItemView, QStyledItemDelegate, QStyle, QStyleOptionButton, \
+    QGroupBox, QTextEdit, QMessageBox, QDialog, QFormLayout
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QAbstractTableModel, QModelIndex, QRect, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QIntValidator
+
+from service_database import open_store
+from service_logic import CalculationCancelled, IncrementalSolver
+from service_storage import CatalogJournal
+
+
+class CalculationSignals(QObject):
+    """Signale eines Hintergrund-Jobs (werden im GUI-Thread zugestellt)"""
+    finished = pyqtSignal(int, object)  # Generation, Ergebnis
+    failed = pyqtSignal(int, str)       # Generation, Fehlermeldung
+
+
+class CalculationJob(QRunnable):
+    """Führt eine Berechnung im Thread-Pool aus, damit das Fenster bedienbar bleibt
+
+    ``func`` bekommt zusätzlich ``cancelled=``, eine Funktion, die nach
+    ``cancel()`` True liefert; der Löser hört dann vorzeitig auf.
+    """
+
+    def __init__(self, generation, func, *args):
+        super().__init__()
+        self.generation = generation
+        self.func = func
+        self.args = args
+        self.context = None
+        self.signals = CalculationSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            result = self.func(*self.args, cancelled=self._cancelled.is_set)
+        except CalculationCancelled:
+            return  # 结果本来也会被丢弃
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+        else:
+            self.signals.finished.emit(self.generation, result)
+
+
+NAME, PRICE, QUANTITY, ACTION = range(4)
+HEADERS = {
+    "de": ["Service-Name", "Preis pro Einheit", "Menge", "Löschen"],
+    "cn": ["服务名称", "单价", "数量", "删除"],
+}
+NEW_NAME_PLACEHOLDER = {"de": "Neuer Service-Name", "cn": "新服务名称"}
+NEW_NAME_MISSING = {"de": "Bitte Service-Name eingeben", "cn": "请输入服务名称"}
+
+
+class ServiceTableModel(QAbstractTableModel):
+    """Servicetabelle als Modell: eine Zeile je Service plus die Zeile zum Hinzufügen
+
+    Die Ansicht (QTableView) zeichnet nur die sichtbaren Zeilen, Editoren
+    entstehen erst beim Bearbeiten einer Zelle. Änderungen melden genau den
+    betroffenen Index (dataChanged) bzw. die eingefügte oder entfernte Zeile,
+    die Tabelle wird nie als Ganzes neu aufgebaut. ``services`` ist dieselbe
+    Liste wie im Fenster.
+    """
+
+    nameChanged = pyqtSignal(int, str)
+    priceChanged = pyqtSignal(int, float)
+    quantityChanged = pyqtSignal(int, int)
+
+    def __init__(self, services, language="de", parent=None):
+        super().__init__(parent)
+        self.services = services
+        self.quantities = [0] * len(services)
+        self.language = language
+        # 新增行里还没保存的输入
+        self.new_name = ""
+        self.new_price = ""
+        self.new_name_missing = False  # 没填名称就保存时显示提示
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.services) + 1
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 4
+
+    def is_add_row(self, row):
+        return row == len(self.services)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[self.language][section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() in (NAME, PRICE) or (index.column() == QUANTITY and not self.is_add_row(index.row())):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.TextAlignmentRole:
+            if column == PRICE or (column == QUANTITY and not self.is_add_row(row)):
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            return int(Qt.AlignCenter)
+        if self.is_add_row(row):
+            return self._add_row_data(column, role)
+        service = self.services[row]
+        if column == NAME and role in (Qt.DisplayRole, Qt.EditRole):
+            return service["name"]
+        if column == PRICE and role in (Qt.DisplayRole, Qt.EditRole):
+            return str(service["price"])
+        if column == QUANTITY:
+            qty = self.quantities[row]
+            if role == Qt.DisplayRole:
+                return str(qty)
+            if role == Qt.EditRole:
+                return str(qty) if qty else ""
+            if role == Qt.ForegroundRole and not qty:
+                return QColor("gray")  # 相当于原来的占位符 "0"
+        if column == ACTION and role == Qt.DisplayRole:
+            return "-"
+        return None
+
+    def _add_row_data(self, column, role):
+        if column == NAME:
+            if role == Qt.EditRole:
+                return self.new_name
+            if role == Qt.DisplayRole:
+                placeholder = NEW_NAME_MISSING if self.new_name_missing else NEW_NAME_PLACEHOLDER
+                return self.new_name or placeholder[self.language]
+            if role == Qt.ForegroundRole and not self.new_name:
+                return QColor("gray")
+        elif column == PRICE:
+            if role == Qt.EditRole:
+                return self.new_price
+            if role == Qt.DisplayRole:
+                return self.new_price or "0.00"
+            if role == Qt.ForegroundRole and not self.new_price:
+                return QColor("gray")
+        elif column == QUANTITY:
+            if role == Qt.DisplayRole:
+                return "新增"
+            if role == Qt.ForegroundRole:
+                return QColor("gray")
+            if role == Qt.FontRole:
+                font = QFont()
+                font.setItalic(True)
+                return font
+        elif column == ACTION:
+            if role == Qt.DisplayRole:
+                return "✓"  # 使用勾号表示保存
+            if role == Qt.BackgroundRole:
+                return QColor("#4CAF50")
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row, column = index.row(), index.column()
+        text = str(value).strip()
+        if self.is_add_row(row):
+            if column == NAME:
+                self.new_name = text
+                self.new_name_missing = False
+            elif column == PRICE:
+                # 新增行的价格：无效或负数按 0.00 处理
+                try:
+                    self.new_price = text if not text or float(text) >= 0 else "0.00"
+                except ValueError:
+                    self.new_price = "0.00"
+            else:
+                return False
+        elif column == NAME:
+            # 未改动的单元格（例如用 Tab 键经过）不写回、不发信号
+            if str(value) == self.services[row]["name"]:
+                return True
+            self.services[row]["name"] = str(value)
+            self.nameChanged.emit(row, str(value))
+        elif column == PRICE:
+            # 无效或非正的价格不接受，单元格保持原值
+            try:
+                price = float(text)
+            except ValueError:
+                return False
+            if price <= 0:
+                return False
+            if price == self.services[row]["price"]:
+                return True
+            self.services[row]["price"] = price
+            self.priceChanged.emit(row, price)
+        elif column == QUANTITY:
+            try:
+                qty = int(text) if text else 0
+            except ValueError:
+                return False
+            if qty < 0:
+                return False
+            self.quantities[row] = qty
+            self.quantityChanged.emit(row, qty)
+        else:
+            return False
+        self.dataChanged.emit(index, index)
+        return True
+
+    def set_language(self, language):
+        self.language = language
+        self.headerDataChanged.emit(Qt.Horizontal, 0, self.columnCount() - 1)
+        add_row = len(self.services)
+        self.dataChanged.emit(self.index(add_row, NAME), self.index(add_row, NAME))
+
+    def set_new_name_missing(self):
+        self.new_name_missing = True
+        add_row = len(self.services)
+        self.dataChanged.emit(self.index(add_row, NAME), self.index(add_row, NAME))
+
+    def add_service(self, name, price):
+        """Neuen Service anhängen; die Zeile zum Hinzufügen wird wieder leer"""
+        row = len(self.services)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.services.append({"name": name, "price": price})
+        self.quantities.append(0)
+        self.new_name = ""
+        self.new_price = ""
+        self.new_name_missing = False
+        self.endInsertRows()
+        self.dataChanged.emit(self.index(row + 1, NAME), self.index(row + 1, PRICE))
+
+    def remove_service(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.services[row]
+        del self.quantities[row]
+        self.endRemoveRows()
+
+    def set_services(self, services):
+        """Ganze Liste austauschen (z. B. nach erneutem Laden der Konfiguration)"""
+        self.beginResetModel()
+        self.services = services
+        self.quantities = [0] * len(services)
+        self.endResetModel()
+
+    def clear_quantities(self):
+        self.quantities = [0] * len(self.services)
+        if self.services:
+            self.dataChanged.emit(self.index(0, QUANTITY), self.index(len(self.services) - 1, QUANTITY))
+
+
+class ServiceItemDelegate(QStyledItemDelegate):
+    """Editoren für Name, Preis und Menge; die letzte Spalte wird als Knopf gezeichnet"""
+
+    BUTTON_SIZE = 25
+
+    def createEditor(self, parent, option, index):
+        if index.column() == ACTION:
+            return None
+        editor = QLineEdit(parent)
+        editor.setAlignment(Qt.AlignRight if index.column() in (PRICE, QUANTITY) else Qt.AlignCenter)
+        if index.column() == QUANTITY:
+            editor.setValidator(QIntValidator(0, 2 ** 31 - 1, editor))
+            editor.setPlaceholderText("0")
+        elif index.column() == PRICE:
+            editor.setPlaceholderText("0.00")
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.EditRole) or "")
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.EditRole)
+
+    def paint(self, painter, option, index):
+        if index.column() != ACTION:
+            super().paint(painter, option, index)
+            return
+        button = QStyleOptionButton()
+        center = option.rect.center()
+        size = self.BUTTON_SIZE
+        button.rect = QRect(center.x() - size // 2, center.y() - size // 2, size, size)
+        button.text = index.data(Qt.DisplayRole)
+        button.state = QStyle.State_Enabled
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
 
 
 class ServiceCalculatorGUI(QMainWindow):
@@ -16,9 +301,19 @@ class ServiceCalculatorGUI(QMainWindow):
 
         # Konfigurationsdatei für persistente Daten
         self.config_file = ".service_config.json"
-
-        # 服务数据（您的表格数据）
-        self.services = [
+        # Einzelne Änderungen landen als kleine Einträge im Änderungsprotokoll (ohne SQLite-Speicher)
+        self.journal = None
+        # Optionaler SQLite-Speicher (wenn .service_catalog.db existiert)
+        self.store = None
+
+        # Hintergrund-Berechnung: ein Worker, nur das Ergebnis der neuesten Anfrage zählt
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.calc_generation = 0
+        self.running_job = None
+
+        # 服务数据（您的表格数据）；没有保存的服务列表时从这份默认数据开始
+        self.default_services = [
             {"name": "L01", "price": 27.85}, {"name": "L02", "price": 14.91}, {"name": "L03", "price": 6.80},
             {"name": "L04", "price": 6.80}, {"name": "L05", "price": 17.00}, {"name": "L06", "price": 6.80},
             {"name": "L07", "price": 6.80}, {"name": "L08", "price": 12.23}, {"name": "L09", "price": 23.54},
@@ -32,18 +327,39 @@ class ServiceCalculatorGUI(QMainWindow):
             {"name": "L27", "price": 6.80}, {"name": "L28", "price": 6.80}, {"name": "L29", "price": 11.51},
             {"name": "L30", "price": 5.23}, {"name": "L31", "price": 0.68}, {"name": "L32+L33", "price": 0.68}
         ]
+        self.services = [dict(service) for service in self.default_services]
 
         # Lade gespeicherte Konfiguration
         self.load_config()
+        # 增删服务或改价时只重算受影响的部分
+        self.solver_state = IncrementalSolver([service["price"] for service in self.services],
+                                              [0] * len(self.services))
 
         self.init_ui()
 
     def load_config(self):
         """Lade gespeicherte Konfiguration (Projektname und Service-Preise)"""
+        if self.store is not None:
+            self.store.close()
+        self.store = open_store(self.config_file)
+        if self.store is not None:
+            # 多项目数据库：只读取当前项目的服务
+            project = self.store.active_project()
+            if project is not None:
+                self.project_name = project
+                self.setWindowTitle(self.project_name)
+                self.services = self.store.load(project)
+                if hasattr(self, "table_model"):
+                    self.table_model.set_services(self.services)
+            return
+        # 重新加载时从默认数据开始，日志不会被重放两次
+        self.services = [dict(service) for service in self.default_services]
+        snapshot_seq = 0
         if os.path.exists(self.config_file):
             try:
                 with open(self.config_file, 'r') as f:
                     config_data = json.load(f)
+                    snapshot_seq = config_data.get("journal_seq", 0)
                     
                     # 加载项目名称
                     if "project_name" in config_data:
@@ -60,18 +376,37 @@ class ServiceCalculatorGUI(QMainWindow):
                                 self.services[i]["price"] = saved_prices[str(i)]
             except Exception as e:
                 print(f"Fehler beim Laden der Konfiguration: {e}")
+        # 快照之后的修改记录在日志里
+        self.journal = CatalogJournal(self.config_file)
+        self.journal.replay(self.services, snapshot_seq)
+        if hasattr(self, "table_model"):
+            self.table_model.set_services(self.services)
+
+    def config_data(self):
+        return {
+            "project_name": self.project_name,
+            "services": self.services
+        }
 
     def save_config(self):
-        """Speichere aktuelle Konfiguration (Projektname und Services)"""
+        """Speichere aktuelle Konfiguration (Projektname und Services) sofort und atomar, leere das Protokoll"""
+        if self.store is not None:
+            # 只写有变化的行
+            self.store.save(self.project_name, self.services)
+            return
+        self.journal.compact(self.config_data(), indent=2)
+
+    def record_change(self, op, **fields):
+        """Einzelne Änderung speichern: ein Protokolleintrag, Gesamtstand erst ab der Größenschwelle"""
+        if self.store is not None:
+            # 数据库按行写入，代价很小
+            self.save_config()
+            return
         try:
-            config_data = {
-                "project_name": self.project_name,
-                "services": self.services
-            }
-            with open(self.config_file, 'w') as f:
-                json.dump(config_data, f, indent=2)
-        except Exception as e:
-            print(f"Fehler beim Speichern der Konfiguration: {e}")
+            if self.journal.append(op, **fields):
+                self.save_config()
+        except OSError as e:
+            print(f"Fehler beim Speichern: {e}")
 
     def init_ui(self):
         central_widget = QWidget()
@@ -95,8 +430,23 @@ class ServiceCalculatorGUI(QMainWindow):
         table_layout = QVBoxLayout()
         
         # 表格 (4 Spalten: Name, Preis, Menge, Löschen) + 1额外行用于新增
-        self.table = QTableWidget(len(self.services) + 1, 4)
-        self.table.setHorizontalHeaderLabels(["Service-Name", "Preis pro Einheit", "Menge", "Löschen"])
+        # 模型/视图：只绘制可见的行，编辑框只在编辑时创建
+        self.table_model = ServiceTableModel(self.services, self.current_language, self)
+        self.table_model.priceChanged.connect(self.on_service_price_changed)
+        self.table_model.nameChanged.connect(lambda index, text: self.record_change("set", index=index, name=text))
+        # 目录或数量一变，正在进行的计算就作废
+        self.table_model.nameChanged.connect(self.cancel_calculation)
+        self.table_model.quantityChanged.connect(self.cancel_calculation)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setItemDelegate(ServiceItemDelegate(self.table))
+        self.table.setEditTriggers(QAbstractItemView.CurrentChanged | QAbstractItemView.SelectedClicked |
+                                   QAbstractItemView.DoubleClicked | QAbstractItemView.AnyKeyPressed |
+                                   QAbstractItemView.EditKeyPressed)
+        self.table.clicked.connect(self.on_table_clicked)
+        # 固定行高：视图不必为每一行计算尺寸
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(28)
         self.table.setColumnWidth(0, 120)  # Name
         self.table.setColumnWidth(1, 80)   # Preis
         self.table.setColumnWidth(2, 60)   # Menge (kleiner)
@@ -117,67 +467,6 @@ class ServiceCalculatorGUI(QMainWindow):
         self.result_group.setLayout(result_layout)
         main_layout.addWidget(self.result_group, 1)  # 1/3 des Platzes
         
-        # 填充现有服务行
-        for i, service in enumerate(self.services):
-            # 服务名称输入框
-            name_edit = QLineEdit(service["name"])
-            name_edit.setAlignment(Qt.AlignCenter)
-            self.table.setCellWidget(i, 0, name_edit)
-            name_edit.textChanged.connect(lambda text, idx=i: self.on_service_name_changed(idx, text))
-            
-            # 单价输入框
-            price_edit = QLineEdit(str(service["price"]))
-            price_edit.setAlignment(Qt.AlignRight)
-            self.table.setCellWidget(i, 1, price_edit)
-            
-            # 数量输入框 - stabile Implementierung ohne Event-Probleme
-            qty_edit = QLineEdit()
-            qty_edit.setPlaceholderText("0")
-            qty_edit.setAlignment(Qt.AlignRight)
-            self.table.setCellWidget(i, 2, qty_edit)
-            
-            # Einfache Signal-basierte Lösung (stabil unter Wayland)
-            def on_text_changed(text):
-                # Bei leerem Text den Placeholder anzeigen
-                if text == "":
-                    qty_edit.setPlaceholderText("0")
-            
-            qty_edit.textChanged.connect(on_text_changed)
-            
-            # Preis-Validierung und Speicherung
-            def make_price_validator(edit_widget, service_index):
-                def validator():
-                    try:
-                        price_text = edit_widget.text().strip()
-                        if not price_text:
-                            edit_widget.setText(f"{self.services[service_index]['price']:.2f}")
-                            return
-
-                        price = float(price_text)
-                        if price <= 0:
-                            edit_widget.setText(f"{self.services[service_index]['price']:.2f}")
-                            return
-
-                        # Preis aktualisieren und speichern
-                        self.services[service_index]["price"] = price
-                        self.save_config()
-                        
-                    except ValueError:
-                        edit_widget.setText(f"{self.services[service_index]['price']:.2f}")
-
-                return validator
-
-            price_edit.textChanged.connect(make_price_validator(price_edit, i))
-            
-            # 删除按钮
-            delete_btn = QPushButton("-")
-            delete_btn.setFixedSize(25, 25)
-            delete_btn.clicked.connect(lambda checked, idx=i: self.delete_service(idx))
-            self.table.setCellWidget(i, 3, delete_btn)
-        
-        # 添加新增服务行
-        self.setup_add_new_row()
-        
         layout.addLayout(main_layout)
         
         # 目标金额区域 (unter beiden Spalten)
@@ -186,6 +475,7 @@ class ServiceCalculatorGUI(QMainWindow):
         target_layout.addWidget(self.target_label)
         self.target_edit = QLineEdit()
         self.target_edit.setAlignment(Qt.AlignRight)
+        self.target_edit.textChanged.connect(self.cancel_calculation)
         target_layout.addWidget(self.target_edit)
         self.calculate_btn = QPushButton("Berechnen")
         self.calculate_btn.clicked.connect(self.calculate)
@@ -213,11 +503,8 @@ class ServiceCalculatorGUI(QMainWindow):
                 self.result_group.setTitle("计算结果")
                 self.target_label.setText("目标金额:")
                 self.calculate_btn.setText("计算")
-                # 更新表格列标题
-                self.table.setHorizontalHeaderLabels(["服务名称", "单价", "数量", "删除"])
-                # 更新新增行提示文本
-                if hasattr(self, 'new_name_edit'):
-                    self.new_name_edit.setPlaceholderText("新服务名称")
+                # 更新表格列标题和新增行提示文本
+                self.table_model.set_language(self.current_language)
             else:
                 self.current_language = "de"
                 self.lang_btn.setText("DE")
@@ -225,11 +512,8 @@ class ServiceCalculatorGUI(QMainWindow):
                 self.result_group.setTitle("Berechnungsergebnis")
                 self.target_label.setText("Zielbetrag:")
                 self.calculate_btn.setText("Berechnen")
-                # 更新表格列标题
-                self.table.setHorizontalHeaderLabels(["Service-Name", "Preis pro Einheit", "Menge", "Löschen"])
-                # 更新新增行提示文本
-                if hasattr(self, 'new_name_edit'):
-                    self.new_name_edit.setPlaceholderText("Neuer Service-Name")
+                # 更新表格列标题和新增行提示文本
+                self.table_model.set_language(self.current_language)
         except Exception as e:
             # Bei Fehlern einfach ignorieren
             pass
@@ -239,11 +523,20 @@ class ServiceCalculatorGUI(QMainWindow):
 
 
     
-    def on_service_name_changed(self, index, text):
-        """服务名称改变时的处理"""
-        if index < len(self.services):
-            self.services[index]["name"] = text
-            self.save_config()
+    def on_service_price_changed(self, index, price):
+        """单价改变（模型已校验并写入 self.services）：更新求解状态并保存"""
+        self.cancel_calculation()
+        self.solver_state.set_price(index, price)
+        self.record_change("set", index=index, price=price)
+    
+    def on_table_clicked(self, index):
+        """最后一列：服务行删除，新增行保存"""
+        if index.column() != ACTION:
+            return
+        if self.table_model.is_add_row(index.row()):
+            self.save_new_service()
+        else:
+            self.delete_service(index.row())
     
     def delete_service(self, index):
         """删除指定索引的服务"""
@@ -263,66 +556,25 @@ class ServiceCalculatorGUI(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            # 从数据中删除
-            del self.services[index]
-            # 重新构建表格
-            self.rebuild_table()
+            # 从数据中删除（表格只移除这一行）
+            self.cancel_calculation()
+            self.table_model.remove_service(index)
+            self.solver_state.remove_service(index)
             # 保存配置
-            self.save_config()
-    
-    def setup_add_new_row(self):
-        """设置新增服务行"""
-        add_row = len(self.services)  # 新增行索引
-        
-        # 服务名称输入框
-        self.new_name_edit = QLineEdit()
-        self.new_name_edit.setPlaceholderText("新服务名称" if self.current_language == "cn" else "Neuer Service-Name")
-        self.new_name_edit.setAlignment(Qt.AlignCenter)
-        self.table.setCellWidget(add_row, 0, self.new_name_edit)
-        
-        # 单价输入框
-        self.new_price_edit = QLineEdit()
-        self.new_price_edit.setPlaceholderText("0.00")
-        self.new_price_edit.setAlignment(Qt.AlignRight)
-        self.table.setCellWidget(add_row, 1, self.new_price_edit)
-        
-        # 数量输入框（只读，显示提示）
-        qty_label = QLabel("新增")
-        qty_label.setAlignment(Qt.AlignCenter)
-        qty_label.setStyleSheet("color: gray; font-style: italic;")
-        self.table.setCellWidget(add_row, 2, qty_label)
-        
-        # 保存按钮
-        save_btn = QPushButton("✓")  # 使用勾号表示保存
-        save_btn.setFixedSize(25, 25)
-        save_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
-        save_btn.clicked.connect(self.save_new_service)
-        self.table.setCellWidget(add_row, 3, save_btn)
-        
-        # 价格验证
-        def validate_price():
-            try:
-                price_text = self.new_price_edit.text().strip()
-                if not price_text:
-                    return
-                price = float(price_text)
-                if price < 0:
-                    self.new_price_edit.setText("0.00")
-            except ValueError:
-                self.new_price_edit.setText("0.00")
-        
-        self.new_price_edit.textChanged.connect(validate_price)
+            self.record_change("remove", index=index)
     
     def save_new_service(self):
         """保存新增服务"""
-        name = self.new_name_edit.text().strip()
-        price_text = self.new_price_edit.text().strip()
+        name = self.table_model.new_name.strip()
+        price_text = self.table_model.new_price.strip()
         
         # 验证输入
         if not name:
             # 如果没有输入名称，给出提示
-            self.new_name_edit.setPlaceholderText("请输入服务名称" if self.current_language == "cn" else "Bitte Service-Name eingeben")
-            self.new_name_edit.setFocus()
+            self.table_model.set_new_name_missing()
+            name_index = self.table_model.index(len(self.services), NAME)
+            self.table.setCurrentIndex(name_index)
+            self.table.edit(name_index)
             return
         
         try:
@@ -332,87 +584,22 @@ class ServiceCalculatorGUI(QMainWindow):
         except ValueError:
             price = 0.00
         
-        # 添加新服务
-        new_service = {"name": name, "price": price}
-        self.services.append(new_service)
+        # 添加新服务（表格只插入这一行）
+        self.cancel_calculation()
+        self.table_model.add_service(name, price)
+        self.solver_state.add_service(price)
         
         # 保存配置
-        self.save_config()
-        
-        # 重新构建表格（包括新的新增行）
-        self.rebuild_table()
+        self.record_change("add", name=name, price=price)
         
         # 给用户反馈
         print(f"新服务已添加: {name} - {price:.2f}€")
     
-    def rebuild_table(self):
-        """重新构建整个表格"""
-        # 清空现有表格
-        self.table.setRowCount(len(self.services) + 1)  # +1 for add new row
-        
-        # 重新填充现有服务
-        for i, service in enumerate(self.services):
-            # 服务名称输入框
-            name_edit = QLineEdit(service["name"])
-            name_edit.setAlignment(Qt.AlignCenter)
-            self.table.setCellWidget(i, 0, name_edit)
-            name_edit.textChanged.connect(lambda text, idx=i: self.on_service_name_changed(idx, text))
-            
-            # 单价输入框
-            price_edit = QLineEdit(str(service["price"]))
-            price_edit.setAlignment(Qt.AlignRight)
-            self.table.setCellWidget(i, 1, price_edit)
-            
-            # 数量输入框
-            qty_edit = QLineEdit()
-            qty_edit.setPlaceholderText("0")
-            qty_edit.setAlignment(Qt.AlignRight)
-            self.table.setCellWidget(i, 2, qty_edit)
-            
-            def on_text_changed(text, edit_widget=qty_edit):
-                if text == "":
-                    edit_widget.setPlaceholderText("0")
-            
-            qty_edit.textChanged.connect(on_text_changed)
-            
-            # Preis-Validierung
-            def make_price_validator(edit_widget, service_index):
-                def validator():
-                    try:
-                        price_text = edit_widget.text().strip()
-                        if not price_text:
-                            edit_widget.setText(f"{self.services[service_index]['price']:.2f}")
-                            return
-                        price = float(price_text)
-                        if price <= 0:
-                            edit_widget.setText(f"{self.services[service_index]['price']:.2f}")
-                            return
-                        self.services[service_index]["price"] = price
-                        self.save_config()
-                    except ValueError:
-                        edit_widget.setText(f"{self.services[service_index]['price']:.2f}")
-                return validator
-            
-            price_edit.textChanged.connect(make_price_validator(price_edit, i))
-            
-            # 删除按钮
-            delete_btn = QPushButton("-")
-            delete_btn.setFixedSize(25, 25)
-            delete_btn.clicked.connect(lambda checked, idx=i: self.delete_service(idx))
-            self.table.setCellWidget(i, 3, delete_btn)
-        
-        # 重新设置新增行
-        self.setup_add_new_row()
-    
     def clear_inputs(self):
         """清空所有数量输入框和目标金额"""
         try:
             # 清空所有服务的数量输入框
-            for i in range(len(self.services)):
-                qty_edit = self.table.cellWidget(i, 2)
-                if qty_edit:
-                    qty_edit.clear()
-                    qty_edit.setPlaceholderText("0")
+            self.table_model.clear_quantities()
             
             # 清空目标金额输入框
             self.target_edit.clear()
@@ -425,19 +612,12 @@ class ServiceCalculatorGUI(QMainWindow):
             pass
 
     def calculate(self):
+        """读取输入并把计算交给后台线程；旧的任务作废，只显示最新一次的结果"""
         try:
             # ===== 读取输入 =====
-            prices = []
-            quantities = []
-            for i in range(len(self.services)):
-                price = float(self.table.cellWidget(i, 1).text())
-                qty_text = self.table.cellWidget(i, 2).text()
-                qty = int(qty_text) if qty_text else 0
-                prices.append(price)
-                quantities.append(qty)
-
-            # 原始金额
-            original_total = sum(prices[i] * quantities[i] for i in range(len(prices)))
+            names = [service["name"] for service in self.services]
+            prices = [float(service["price"]) for service in self.services]
+            quantities = list(self.table_model.quantities)
 
             # ⭐ 输入 = 要减少的金额
             reduce_target = float(self.target_edit.text().replace(',', '.'))
@@ -447,80 +627,81 @@ class ServiceCalculatorGUI(QMainWindow):
                 return
 
             # =================================================
-            # 1️⃣ 生成可减少服务池（每个服务最多减少 qty-1）
-            # =================================================
-            items = []
-            for i in range(len(self.services)):
-                qty = quantities[i]
-                price = prices[i]
-
-                if qty >= 2 and price > 0:
-                    reducible = qty - 1  # ⭐必须保留1个
-                    items.append((price, reducible, i))
-
-            # 按价格从大到小 → 优先减少贵的
-            items.sort(reverse=True)
-
-            # ===== reduction 数组（删除数量）=====
-            reduction = [0] * len(self.services)
-            remaining = reduce_target
-
-            # =================================================
-            # 2️⃣ Greedy 删除大金额服务
+            # 1️⃣ 后台精确求解删除数量（每个服务最多减少 qty-1，必须保留1个）
+            #    见 service_logic.solve_reduction；增量状态只重算改动过的服务
             # =================================================
-            for price, max_reduce, idx in items:
-                if remaining <= 0:
-                    break
+            self.cancel_calculation()
+            job = CalculationJob(self.calc_generation, self.solver_state.find_best_reduction,
+                                 prices, quantities, reduce_target)
+            # 结果按计算时的目录显示
+            job.context = (names, prices, quantities, reduce_target)
+            job.signals.finished.connect(self.on_calculation_finished)
+            job.signals.failed.connect(self.on_calculation_failed)
+            self.running_job = job
+            self.result_label.setText("计算中..." if self.current_language == "cn" else "Berechnung läuft...")
+            self.thread_pool.start(job)
 
-                max_possible = int(remaining // price)
-                use = min(max_possible, max_reduce)
-
-                if use <= 0:
-                    continue
-
-                reduction[idx] = use
-                remaining -= use * price
-
-            # =================================================
-            # 3️⃣ 用最便宜服务微调（允许略超）
-            # =================================================
-            if remaining > 0 and items:
-                min_price, max_reduce, idx = items[-1]
-                left = max_reduce - reduction[idx]
-
-                if left > 0:
-                    need = int(round(remaining / min_price))
-                    need = max(1, min(need, left))
-                    reduction[idx] += need
-                    remaining -= need * min_price
-
-            # =================================================
-            # 4️⃣ 计算最终数量与金额
-            # =================================================
-            final_qty = [quantities[i] - reduction[i] for i in range(len(quantities))]
-            final_total = sum(prices[i] * final_qty[i] for i in range(len(prices)))
-
-            reduced_money = original_total - final_total
-            diff = abs(reduced_money - reduce_target)
-
-            # =================================================
-            # 5️⃣ 输出结果（全部服务显示）
-            # =================================================
-            result = f"💰 原始金额: {original_total:.2f}\n"
-            result += f"🎯 目标减少: {reduce_target:.2f}\n"
-            result += f"🧾 实际减少: {reduced_money:.2f}\n"
-            result += f"📊 剩余金额: {final_total:.2f}\n"
-            result += f"🔍 误差: {diff:.2f}\n\n"
-            result += "📋 服务变化:\n"
+        except Exception as e:
+            self.result_label.setText(str(e))
 
-            for i, service in enumerate(self.services):
-                if quantities[i] > 0:
-                    result += f"{service['name']}: {quantities[i]} → {final_qty[i]}\n"
+    def cancel_calculation(self, *args):
+        """作废正在进行和排队中的计算（输入改变或重新计算时调用）"""
+        self.calc_generation += 1
+        # 尚未开始的任务直接移除；正在运行的任务在下一个服务前停下
+        self.thread_pool.clear()
+        if self.running_job is not None:
+            self.running_job.cancel()
+            self.running_job = None
+            self.result_label.setText("")
 
-            self.result_label.setText(result)
+    def on_calculation_finished(self, generation, result):
+        if generation != self.calc_generation or self.running_job is None:
+            return
+        names, prices, quantities, reduce_target = self.running_job.context
+        self.running_job = None
+        reduction, _, _ = result
+        self.display_reduction(names, prices, quantities, reduce_target, reduction)
 
-        except Exception as e:
-            self.result_label.setText(str(e))
+    def on_calculation_failed(self, generation, message):
+        if generation != self.calc_generation:
+            return
+        self.running_job = None
+        self.result_label.setText(message)
+
+    def display_reduction(self, names, prices, quantities, reduce_target, reduction):
+        # 原始金额
+        original_total = sum(prices[i] * quantities[i] for i in range(len(prices)))
+
+        # =================================================
+        # 2️⃣ 计算最终数量与金额
+        # =================================================
+        final_qty = [quantities[i] - reduction[i] for i in range(len(quantities))]
+        final_total = sum(prices[i] * final_qty[i] for i in range(len(prices)))
+
+        reduced_money = original_total - final_total
+        diff = abs(reduced_money - reduce_target)
+
+        # =================================================
+        # 3️⃣ 输出结果（全部服务显示）
+        # =================================================
+        result = f"💰 原始金额: {original_total:.2f}\n"
+        result += f"🎯 目标减少: {reduce_target:.2f}\n"
+        result += f"🧾 实际减少: {reduced_money:.2f}\n"
+        result += f"📊 剩余金额: {final_total:.2f}\n"
+        result += f"🔍 误差: {diff:.2f}\n\n"
+        result += "📋 服务变化:\n"
+
+        for i, name in enumerate(names):
+            if quantities[i] > 0:
+                result += f"{name}: {quantities[i]} → {final_qty[i]}\n"
+
+        self.result_label.setText(result)
+
+    def closeEvent(self, event):
+        # 关闭窗口前等待后台计算结束
+        self.cancel_calculation()
+        self.thread_pool.waitForDone()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Persistenter Index aller erreichbaren Summen eines Preiskatalogs
+
+Die Summen (in Cent) werden einmal vorberechnet und sortiert in eine Datei
+geschrieben, die beim Start per mmap ohne Kopie geladen wird. "Nächste
+erreichbare Summe zu X" ist danach eine binäre Suche. Der Index ist über
+einen Hash der Preise und Mengenobergrenzen an den Katalog gebunden und wird
+neu gebaut, sobald sich der Hash ändert.
+
+Vorberechnen für den aktuellen Katalog:
+    python service_index.py [max_zielbetrag] [menge_pro_service]
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+
+from service_logic import PriceClasses, ReachableSums, ServiceCalculatorLogic, _set_bits, to_cents
+
+INDEX_FILE = ".service_index.bin"
+MAGIC = b"SRSI"
+VERSION = 2
+# Magic, Version, Katalog-Hash, Tabellengrenze und größter Zielbetrag (Cent),
+# Anzahl Summen, Anzahl Pakete, Anzahl Services. Danach Preis (Cent) und
+# Obergrenze je Service, die Pakete, die Summen und je Summe ihr erstes Paket.
+HEADER = struct.Struct("<4sH32sQQQII")
+HEADER_SIZE = 80
+
+
+def catalog_key(weights: List[int], caps: List[int]) -> bytes:
+    """SHA-256 über Preise (Cent) und Mengenobergrenzen"""
+    text = ";".join(f"{w}:{c}" for w, c in zip(weights, caps))
+    return hashlib.sha256(text.encode("ascii")).digest()
+
+
+def _index_problem(prices: List[float], caps: List[int], max_target: float):
+    weights = [to_cents(p) if p > 0 else 0 for p in prices]
+    caps = [max(0, c) if w > 0 else 0 for w, c in zip(weights, caps)]
+    return weights, caps, to_cents(max_target)
+
+
+class ReachableSumsIndex:
+    """Sortierte, per mmap geladene Liste aller erreichbaren Summen bis ``limit``
+
+    Summen und ``limit`` sind wie bei solve_dp in Einheiten von
+    ``classes.scale`` Cent (ggT der Preise) gespeichert.
+
+    Zu jeder Summe steht das Zweierpotenz-Paket, durch das sie zuerst
+    erreichbar wurde; damit lässt sich auch die Kombination rekonstruieren.
+    Die Pakete beziehen sich wie bei solve_dp auf Preisklassen (PriceClasses).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER_SIZE:
+            self._mmap.close()
+            raise ValueError(f"Keine gültige Indexdatei: {path}")
+        (magic, version, self.key, self.limit, self.max_target,
+         count, n_chunks, self.n_services) = HEADER.unpack_from(self._mmap, 0)
+        if (magic != MAGIC or version != VERSION
+                or len(self._mmap) != HEADER_SIZE + 8 * self.n_services + 12 * n_chunks + 8 * count):
+            self._mmap.close()
+            raise ValueError(f"Keine gültige Indexdatei: {path}")
+        view = memoryview(self._mmap)
+        offset = HEADER_SIZE
+        catalog = view[offset:offset + 8 * self.n_services].cast("I")
+        self.classes = PriceClasses(catalog[0::2], catalog[1::2])
+        catalog.release()
+        offset += 8 * self.n_services
+        chunks = view[offset:offset + 12 * n_chunks].cast("I")
+        self.chunks = [tuple(chunks[k:k + 3]) for k in range(0, len(chunks), 3)]
+        chunks.release()
+        offset += 12 * n_chunks
+        # 零拷贝：直接指向映射的文件内容
+        self.sums = view[offset:offset + 4 * count].cast("I")
+        offset += 4 * count
+        self.first = view[offset:offset + 4 * count].cast("I")
+        view.release()
+
+    @classmethod
+    def build(cls, path: str, prices: List[float], caps: List[int], max_target: float) -> "ReachableSumsIndex":
+        """Berechne den Index neu und schreibe ihn atomar nach ``path``"""
+        weights, caps, target_cents = _index_problem(prices, caps, max_target)
+        classes = PriceClasses(weights, caps)
+        limit = classes.limit(target_cents) if classes.weights else 0
+        table = ReachableSums(classes.weights, classes.caps, limit)
+        first = array("I", bytes(4 * (limit + 1)))
+        chunks = array("I")
+        for k, w in enumerate(classes.weights):
+            for before, after, take in table.chunk_states(k):
+                # 这个分包新增的金额
+                for s in _set_bits(after & ~before, limit + 1):
+                    first[s] = len(chunks) // 3
+                chunks.extend((k, take, w * take))
+        sums = array("I", _set_bits(table.bits, limit + 1))
+        firsts = array("I", (first[s] for s in sums))
+
+        header = HEADER.pack(MAGIC, VERSION, catalog_key(weights, caps), limit, target_cents,
+                             len(sums), len(chunks) // 3, len(weights))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            array("I", (v for pair in zip(weights, caps) for v in pair)).tofile(f)
+            chunks.tofile(f)
+            sums.tofile(f)
+            firsts.tofile(f)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    @classmethod
+    def open(cls, path: str, prices: List[float], caps: List[int], max_target: float) -> "ReachableSumsIndex":
+        """Lade den Index; baue ihn neu, wenn Katalog-Hash oder Grenze nicht passen"""
+        weights, caps_checked, target_cents = _index_problem(prices, caps, max_target)
+        if os.path.exists(path):
+            try:
+                index = cls(path)
+            except ValueError as e:
+                print(f"Index wird neu erstellt: {e}")
+            else:
+                if index.key == catalog_key(weights, caps_checked) and index.max_target >= target_cents:
+                    return index
+                index.close()
+        return cls.build(path, prices, caps, max_target)
+
+    def close(self):
+        self.sums.release()
+        self.first.release()
+        self._mmap.close()
+
+    def neighbours(self, target: int) -> Tuple[int, Optional[int]]:
+        """Größte gespeicherte Summe <= ``target`` und kleinste >= ``target`` (oder None)"""
+        pos = bisect_right(self.sums, target)
+        below = self.sums[pos - 1]  # 0 总是可达
+        if below == target:
+            return below, below
+        return below, self.sums[pos] if pos < len(self.sums) else None
+
+    def nearest(self, target: int) -> int:
+        """Erreichbare Summe mit kleinstem Abstand zu ``target`` (Cent), bei Gleichstand die höhere"""
+        if target < 0 or target > self.max_target:
+            raise ValueError(f"Zielbetrag {target} liegt außerhalb des Index (0..{self.max_target})")
+        return self.classes.nearest(self, target)
+
+    def combination(self, total: int) -> List[int]:
+        """Rekonstruiere eine Mengenverteilung, die genau ``total`` Cent ergibt"""
+        combo = [0] * len(self.classes.weights)
+        units, rest = divmod(total, self.classes.scale)
+        while units > 0 or rest:
+            pos = bisect_left(self.sums, units)
+            if rest or pos == len(self.sums) or self.sums[pos] != units:
+                raise ValueError(f"Summe {total} ist nicht erreichbar")
+            i, take, shift = self.chunks[self.first[pos]]
+            combo[i] += take
+            units -= shift
+        return self.classes.split(combo)
+
+    def find_best_combination(self, target: float) -> Tuple[List[int], float, float]:
+        """Wie solve_dp, aber per binärer Suche im Index"""
+        target_cents = to_cents(target)
+        total_cents = self.nearest(max(0, target_cents))
+        return self.combination(total_cents), total_cents / 100, abs(total_cents - target_cents) / 100
+
+
+def main():
+    max_target = float(sys.argv[1]) if len(sys.argv) > 1 else 5000.0
+    cap = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    # 和命令行一样读取目录：SQLite 目录库或 JSON 快照加变更日志
+    prices = [service["price"] for service in ServiceCalculatorLogic().services]
+    index = ReachableSumsIndex.open(INDEX_FILE, prices, [cap] * len(prices), max_target)
+    print(f"Index {INDEX_FILE}: {len(index.sums)} erreichbare Summen, Ziele bis {index.max_target / 100:.2f}€")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,43 +4,1274 @@ Vereinfachte Testversion ohne GUI-Abhängigkeiten
 """
 
 import json
+import math
 import os
-from typing import List, Tuple
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Callable, List, Optional, Tuple
+
+from service_database import catalog_db_path, open_store
+from service_storage import CatalogJournal
+from service_trace import TRACE
+
+# NumPy ist optional und wird erst beim ersten numpy-Backend importiert (Startzeit);
+# ohne NumPy rechnet das reine Python-Bitfeld
+np = None
+_numpy_loaded = False
+
+BACKENDS = ("python", "numpy")
+
+
+def load_numpy():
+    """Importiere NumPy beim ersten Aufruf; None, wenn nicht installiert"""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np
+
+
+def to_cents(amount) -> int:
+    """Wandle einen Euro-Betrag (Zahl, Text oder Decimal) in ganze Cent um
+
+    Gerechnet wird dezimal über die kürzeste Darstellung der Zahl, so dass
+    z. B. 1.005 wie eingetippt zu 101 Cent wird (kaufmännisch gerundet) und
+    nicht zu 100 wie bei ``round(1.005 * 100)``.
+    """
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount).strip().replace(",", "."))
+    return int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def split_quantity(quantity: int) -> List[int]:
+    """Zerlege eine Menge in Zweierpotenz-Pakete (1, 2, 4, ..., Rest)"""
+    parts = []
+    chunk = 1
+    while quantity > 0:
+        take = min(chunk, quantity)
+        parts.append(take)
+        quantity -= take
+        chunk *= 2
+    return parts
+
+
+def _bit_neighbours(bits: int, target: int) -> Tuple[int, Optional[int]]:
+    """Größtes gesetztes Bit <= ``target`` und kleinstes >= ``target`` (oder None) eines Bitfelds mit Bit 0"""
+    below = (bits & ((1 << (target + 1)) - 1)).bit_length() - 1
+    upper = bits >> target
+    if not upper:
+        return below, None
+    return below, target + (upper & -upper).bit_length() - 1
+
+
+def _closer(below: int, above: Optional[int], target) -> int:
+    """Die nähere von zwei Summen um ``target``, bei Gleichstand die höhere"""
+    if above is None or target - below < above - target:
+        return below
+    return above
+
+
+class CalculationCancelled(Exception):
+    """Die Berechnung wurde abgebrochen, weil ihr Ergebnis nicht mehr gebraucht wird"""
+
+
+class ReachableSums:
+    """Alle mit den Mengenobergrenzen erreichbaren Summen (in Cent) bis ``limit``
+
+    Die Menge wird als Bitfeld in einem Python-int gehalten: Bit ``s`` ist
+    gesetzt, wenn die Summe ``s`` erreichbar ist. Für jeden Service wird der
+    Stand vor seiner Hinzunahme gemerkt, damit sich Kombinationen
+    rekonstruieren lassen und Änderungen ab einem Service nur den Rest neu
+    berechnen (siehe ``replace_from``).
+    """
+
+    def __init__(self, weights: List[int], caps: List[int], limit: int,
+                 cancelled: Optional[Callable[[], bool]] = None):
+        self.limit = limit
+        self._mask = (1 << (limit + 1)) - 1
+        self._states = None  # 批量求解时缓存各分包之前的状态（bytes）
+        self.weights = []
+        self.caps = []
+        self.prefixes = [1]  # prefixes[i]: 只用前 i 个服务可达的金额，最后一项为全部
+        self.replace_from(0, weights, caps, cancelled)
+
+    @property
+    def bits(self) -> int:
+        return self.prefixes[-1]
+
+    def replace_from(self, start: int, weights: List[int], caps: List[int],
+                     cancelled: Optional[Callable[[], bool]] = None):
+        """Ersetze die Services ab Position ``start`` und rechne nur diese neu
+
+        Die Stände vor ``start`` bleiben gültig; Kosten proportional zur
+        Anzahl der ersetzten Services. Liefert ``cancelled()`` zwischen zwei
+        Services True, endet die Rechnung mit CalculationCancelled; gültig
+        sind dann nur die ersten ``len(prefixes) - 1`` Services.
+        """
+        self.weights[start:] = weights
+        self.caps[start:] = [min(c, self.limit // w) if w > 0 and c > 0 else 0
+                             for w, c in zip(weights, caps)]
+        del self.prefixes[start + 1:]
+        if self._states:
+            self._states = {i: s for i, s in self._states.items() if i < start}
+        bits = self.prefixes[start]
+        for w, c in zip(self.weights[start:], self.caps[start:]):
+            if cancelled is not None and cancelled():
+                raise CalculationCancelled()
+            for take in split_quantity(c):
+                bits = (bits | (bits << (w * take))) & self._mask
+            self.prefixes.append(bits)
+
+    def contains(self, total: int) -> bool:
+        return 0 <= total <= self.limit and (self.bits >> total) & 1 == 1
+
+    def neighbours(self, target: int) -> Tuple[int, Optional[int]]:
+        """Größte erreichbare Summe <= ``target`` und kleinste >= ``target`` (oder None)"""
+        return _bit_neighbours(self.bits, max(0, min(target, self.limit)))
+
+    def nearest(self, target: int) -> int:
+        """Erreichbare Summe mit kleinstem Abstand zu ``target``, bei Gleichstand die höhere"""
+        return _closer(*self.neighbours(target), max(0, min(target, self.limit)))
+
+    def keep_chunk_states(self):
+        """Merke die Pakete für viele Rekonstruktionen als Bytes (mehr Speicher, O(1)-Bittest)"""
+        if self._states is None:
+            self._states = {}
+
+    def chunk_states(self, i: int) -> List[Tuple[int, int, int]]:
+        """Spiele die Pakete von Service ``i`` nach: Liste von (vorher, nachher, menge)"""
+        states = []
+        bits = self.prefixes[i]
+        w = self.weights[i]
+        for take in split_quantity(self.caps[i]):
+            after = (bits | (bits << (w * take))) & self._mask
+            states.append((bits, after, take))
+            bits = after
+        return states
+
+    def _chunks_backwards(self, i: int):
+        """(vorher, menge) der Pakete von Service ``i`` vom letzten zum ersten"""
+        if self._states is None:
+            return [(before, take) for before, _, take in reversed(self.chunk_states(i))]
+        if i not in self._states:
+            size = (self.limit + 8) // 8
+            self._states[i] = [(before.to_bytes(size, "little"), take)
+                               for before, _, take in reversed(self.chunk_states(i))]
+        return self._states[i]
+
+    def combination(self, total: int) -> List[int]:
+        """Rekonstruiere eine Mengenverteilung, die genau ``total`` ergibt"""
+        if not self.contains(total):
+            raise ValueError(f"Summe {total} ist nicht erreichbar")
+        combo = [0] * len(self.weights)
+        remaining = total
+        for i in range(len(self.weights) - 1, -1, -1):
+            if self.caps[i] == 0 or remaining == 0:
+                continue
+            # 重放该服务的二进制分包，从最后一个包往回判断是否必须使用
+            for before, take in self._chunks_backwards(i):
+                if isinstance(before, bytes):
+                    reachable = before[remaining >> 3] >> (remaining & 7) & 1
+                else:
+                    reachable = (before >> remaining) & 1
+                if not reachable:
+                    combo[i] += take
+                    remaining -= self.weights[i] * take
+        return combo
+
+
+class NumpyReachableSums:
+    """NumPy-Variante von ReachableSums mit gleicher Schnittstelle und gleichen Ergebnissen
+
+    Ein bool-Array über alle Cent-Beträge; jedes Zweierpotenz-Paket wird als
+    eine vektorisierte Verschiebung eingemischt. Statt Zwischenständen wird
+    pro Summe das Paket gemerkt, durch das sie zuerst erreichbar wurde.
+    """
+
+    def __init__(self, weights: List[int], caps: List[int], limit: int):
+        np = load_numpy()
+        if np is None:
+            raise ImportError("NumPy ist nicht installiert")
+        self.weights = list(weights)
+        self.limit = limit
+        self.caps = [min(c, limit // w) if w > 0 and c > 0 else 0 for w, c in zip(weights, caps)]
+        size = limit + 1
+        self.reach = np.zeros(size, dtype=bool)
+        self.reach[0] = True
+        self.first = np.full(size, -1, dtype=np.int32)  # 每个金额最早由哪个分包得到
+        self.chunks = []  # (服务索引, 数量, 金额)
+        gain = np.empty(size, dtype=bool)
+        for i, (w, c) in enumerate(zip(self.weights, self.caps)):
+            for take in split_quantity(c):
+                shift = w * take
+                new = np.greater(self.reach[:size - shift], self.reach[shift:], out=gain[:size - shift])
+                np.logical_or(self.reach[shift:], new, out=self.reach[shift:])
+                np.copyto(self.first[shift:], len(self.chunks), where=new)
+                self.chunks.append((i, take, shift))
+
+    def contains(self, total: int) -> bool:
+        return 0 <= total <= self.limit and bool(self.reach[total])
+
+    def neighbours(self, target: int) -> Tuple[int, Optional[int]]:
+        """Größte erreichbare Summe <= ``target`` und kleinste >= ``target`` (oder None)"""
+        target = max(0, min(target, self.limit))
+        below = target - int(self.reach[target::-1].argmax())
+        upper = self.reach[target:]
+        if not upper.any():
+            return below, None
+        return below, target + int(upper.argmax())
+
+    def nearest(self, target: int) -> int:
+        """Erreichbare Summe mit kleinstem Abstand zu ``target``, bei Gleichstand die höhere"""
+        return _closer(*self.neighbours(target), max(0, min(target, self.limit)))
+
+    def combination(self, total: int) -> List[int]:
+        """Rekonstruiere eine Mengenverteilung, die genau ``total`` ergibt"""
+        if not self.contains(total):
+            raise ValueError(f"Summe {total} ist nicht erreichbar")
+        combo = [0] * len(self.weights)
+        remaining = total
+        while remaining > 0:
+            i, take, shift = self.chunks[self.first[remaining]]
+            combo[i] += take
+            remaining -= shift
+        return combo
+
+
+def make_reachable_sums(weights: List[int], caps: List[int], limit: int, backend: str = "python"):
+    """Erzeuge die Tabelle der erreichbaren Summen für das gewünschte Backend
+
+    ``"numpy"`` fällt auf das reine Python-Bitfeld zurück, wenn NumPy fehlt.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unbekanntes Backend: {backend}")
+    if backend == "numpy" and load_numpy() is not None:
+        return NumpyReachableSums(weights, caps, limit)
+    return ReachableSums(weights, caps, limit)
+
+
+class PriceClasses:
+    """Fasst Services mit gleichem Preis (in Cent) zu einer Klasse zusammen
+
+    Gleiche Preise vervielfachen den Suchraum, ohne neue Summen zu liefern.
+    Eine Klasse bekommt die Summe der Mengenobergrenzen ihrer Mitglieder;
+    Services ohne Preis oder ohne Menge fallen ganz weg. ``split`` verteilt
+    die Menge einer Klasse deterministisch zurück: die Mitglieder werden in
+    Index-Reihenfolge bis zu ihrer Obergrenze aufgefüllt.
+
+    Zusätzlich werden die Klassenpreise durch ihren größten gemeinsamen
+    Teiler ``scale`` geteilt; alle Tabellen rechnen in diesen Einheiten.
+    """
+
+    def __init__(self, weights: List[int], caps: List[int]):
+        self.n = len(weights)
+        self.weights = []  # 每个类的单价（以 scale 分为单位），按首次出现的顺序
+        self.caps = []  # 每个类的数量上限之和
+        self.members = []  # 每个类的 (服务索引, 数量上限)
+        by_weight = {}
+        for i, (w, c) in enumerate(zip(weights, caps)):
+            if w <= 0 or c <= 0:
+                continue
+            k = by_weight.setdefault(w, len(self.weights))
+            if k == len(self.weights):
+                self.weights.append(w)
+                self.caps.append(0)
+                self.members.append([])
+            self.caps[k] += c
+            self.members[k].append((i, c))
+        # 所有可达金额都是 scale 的倍数，表格因此缩小 scale 倍
+        self.scale = math.gcd(*self.weights) or 1
+        self.weights = [w // self.scale for w in self.weights]
+
+    def limit(self, target_cents: int) -> int:
+        """Tabellengrenze (in ``scale``-Einheiten) für Ziele bis ``target_cents``
+
+        Die nächste erreichbare Summe über dem Ziel ist immer kleiner als
+        Ziel + größter Einzelpreis.
+        """
+        return -(-target_cents // self.scale) + max(self.weights) - 1
+
+    def nearest(self, table, target_cents: int) -> int:
+        """Nächste erreichbare Summe in Cent, bei Gleichstand die höhere"""
+        below, _ = table.neighbours(target_cents // self.scale)
+        _, above = table.neighbours(-(-target_cents // self.scale))
+        return _closer(below * self.scale, None if above is None else above * self.scale, target_cents)
+
+    def split(self, class_combo: List[int]) -> List[int]:
+        """Verteile die Klassenmengen auf die einzelnen Services"""
+        combo = [0] * self.n
+        for take, members in zip(class_combo, self.members):
+            for i, c in members:
+                combo[i] = min(take, c)
+                take -= combo[i]
+        return combo
+
+
+def prepare_problem(prices: List[float], current_quantities: List[int], target: float):
+    """Gemeinsame Normalisierung für alle Löser; ``None``, wenn es nichts zu rechnen gibt
+
+    Preise und Ziel werden genau einmal in ganze Cent umgerechnet, gleiche
+    Preise zusammengefasst und durch ihren ggT geteilt. Liefert
+    ``(classes, target_cents, limit)`` mit ``limit`` in ``classes.scale``-Einheiten.
+    """
+    weights = [to_cents(p) if p > 0 else 0 for p in prices]
+    caps = [max(0, q) if w > 0 else 0 for w, q in zip(weights, current_quantities)]
+    classes = PriceClasses(weights, caps)
+    target_cents = to_cents(target)
+    if not classes.weights or target_cents <= 0:
+        return None
+    return classes, target_cents, classes.limit(target_cents)
+
+
+def solve_dp(prices: List[float], current_quantities: List[int], target: float,
+             backend: str = "python") -> Tuple[List[int], float, float]:
+    """
+    精确的有界背包动态规划（整数分）
+    价格和目标金额换算成分，在数量上限内求与目标最接近的可达金额，
+    差异相同时取较大的金额。backend="numpy" 使用向量化内核，结果完全相同。
+    """
+    n = len(prices)
+    if n == 0:
+        return [], 0, target
+    problem = prepare_problem(prices, current_quantities, target)
+    if problem is None:
+        return [0] * n, 0, abs(target)
+    classes, target_cents, limit = problem
+
+    table = make_reachable_sums(classes.weights, classes.caps, limit, backend)
+    total_cents = classes.nearest(table, target_cents)
+    combo = classes.split(table.combination(total_cents // classes.scale))
+    if TRACE.enabled:
+        _trace_combination(prices, combo, target_cents, total_cents)
+    return combo, total_cents / 100, abs(total_cents - target_cents) / 100
+
+
+def _trace_combination(prices: List[float], combo: List[int], target_cents: int, total_cents: int):
+    """Melde die gewählten Services einer fertigen Kombination als Schritte"""
+    remaining = target_cents
+    for index, qty in enumerate(combo):
+        if qty > 0:
+            remaining -= to_cents(prices[index]) * qty
+            TRACE.emit("dp.take", index=index, quantity=qty, price=prices[index], remaining=remaining)
+    TRACE.emit("result", total=total_cents, target=target_cents, difference=abs(total_cents - target_cents))
+
+
+def reducible_quantities(prices: List[float], quantities: List[int]) -> List[int]:
+    """Wie viele Einheiten je Service abgezogen werden dürfen: ``qty - 1`` (einer bleibt immer)"""
+    return [q - 1 if q >= 2 and p > 0 else 0 for p, q in zip(prices, quantities)]
+
+
+def solve_reduction(prices: List[float], quantities: List[int], reduce_target: float,
+                    backend: str = "python") -> Tuple[List[int], float, float]:
+    """
+    减少模式：从现有数量中减去若干服务，使减少的金额最接近 reduce_target
+    每个服务至少保留 1 个（可减数量 = qty - 1），本质上是以可减数量为上限的
+    solve_dp，因此同样精确、同样快。
+    返回 (各服务减少数量, 实际减少金额, 差异)
+    """
+    return solve_dp(prices, reducible_quantities(prices, quantities), reduce_target, backend)
+
+
+class BatchSolver:
+    """Beantwortet viele Zielbeträge aus einer einzigen Tabelle (bis ``max_target``)"""
+
+    def __init__(self, prices: List[float], current_quantities: List[int], max_target: float,
+                 backend: str = "python"):
+        self.n = len(prices)
+        problem = prepare_problem(prices, current_quantities, max_target) if self.n else None
+        self.table = None
+        if problem is not None:
+            self.classes, _, limit = problem
+            self.table = make_reachable_sums(self.classes.weights, self.classes.caps, limit, backend)
+            if isinstance(self.table, ReachableSums):
+                self.table.keep_chunk_states()
+
+    def solve(self, targets: List[float]) -> List[Tuple[List[int], float, float]]:
+        if self.n == 0:
+            return [([], 0, target) for target in targets]
+        results = []
+        for target in targets:
+            target_cents = to_cents(target)
+            if self.table is None or target_cents <= 0:
+                results.append(([0] * self.n, 0, abs(target)))
+                continue
+            total_cents = self.classes.nearest(self.table, target_cents)
+            combo = self.classes.split(self.table.combination(total_cents // self.classes.scale))
+            results.append((combo, total_cents / 100,
+                            abs(total_cents - target_cents) / 100))
+        return results
+
+
+class IncrementalSolver:
+    """Hält die Tabelle der erreichbaren Summen über Katalogänderungen hinweg aktuell
+
+    Hinzufügen, Löschen und das Ändern von Preis oder Menge eines Services
+    markieren nur die Position, ab der die Tabelle ungültig ist; die nächste
+    Berechnung rechnet ab dort neu (``ReachableSums.replace_from``). Geänderte
+    Services wandern dabei ans Ende der internen Reihenfolge, so dass weitere
+    Änderungen am selben Service nur noch diesen einen Service kosten. Die
+    Ergebnisse sind dieselben wie bei solve_dp.
+
+    Änderungen sind aus jedem Thread erlaubt und blockieren nicht, solange in
+    einem anderen Thread gerechnet wird.
+    """
+
+    def __init__(self, prices: List[float], caps: List[int], max_target: float = 1000):
+        self.prices = list(prices)
+        self.caps = [max(0, c) for c in caps]
+        self.order = list(range(len(self.prices)))  # 内部处理顺序 -> 服务索引
+        self.rebuilds = 0  # 完整重建次数
+        self.updated_services = 0  # 增量重算过的服务个数
+        self._max_target = max(0, to_cents(max_target))
+        self._table = None
+        self._stale = True  # 需要完整重建
+        self._dirty = 0  # 从内部顺序的这个位置起表格失效
+        self._lock = threading.Lock()  # 保护价格、数量和顺序
+        self._compute_lock = threading.Lock()  # 保护表格本身
+
+    def _weight(self, index: int) -> Tuple[int, int]:
+        w = to_cents(self.prices[index]) if self.prices[index] > 0 else 0
+        return w, (self.caps[index] if w > 0 else 0)
+
+    def _move_to_end(self, index: int):
+        pos = self.order.index(index)
+        self.order.append(self.order.pop(pos))
+        self._dirty = min(self._dirty, pos)
+
+    def add_service(self, price: float, cap: int = 0):
+        """Neuer Service am Ende (Index ``len(prices)``)"""
+        with self._lock:
+            self.prices.append(price)
+            self.caps.append(max(0, cap))
+            self.order.append(len(self.prices) - 1)
+            self._dirty = min(self._dirty, len(self.order) - 1)
+
+    def remove_service(self, index: int):
+        """Service ``index`` entfernen; die Indizes dahinter rücken auf"""
+        with self._lock:
+            pos = self.order.index(index)
+            del self.order[pos]
+            self.order = [j - 1 if j > index else j for j in self.order]
+            del self.prices[index]
+            del self.caps[index]
+            self._dirty = min(self._dirty, pos)
+
+    def set_price(self, index: int, price: float):
+        with self._lock:
+            if price != self.prices[index]:
+                self.prices[index] = price
+                self._move_to_end(index)
+
+    def set_cap(self, index: int, cap: int):
+        with self._lock:
+            cap = max(0, cap)
+            if cap != self.caps[index]:
+                self.caps[index] = cap
+                self._move_to_end(index)
+
+    def update(self, prices: List[float], caps: List[int]):
+        """Gleiche den Stand mit vollständigen Listen ab (nur Abweichungen kosten)"""
+        if len(prices) != len(self.prices):
+            with self._lock:
+                self.prices = list(prices)
+                self.caps = [max(0, c) for c in caps]
+                self.order = list(range(len(self.prices)))
+                self._stale = True
+            return
+        for i, (price, cap) in enumerate(zip(prices, caps)):
+            self.set_price(i, price)
+            self.set_cap(i, cap)
+
+    def find_best_combination(self, target: float,
+                              cancelled: Optional[Callable[[], bool]] = None) -> Tuple[List[int], float, float]:
+        """Wie solve_dp mit den aktuellen Preisen und Mengenobergrenzen
+
+        ``cancelled`` wird zwischen den Services abgefragt (siehe
+        ReachableSums.replace_from); schon berechnete Services bleiben gültig.
+        """
+        with self._compute_lock:
+            with self._lock:
+                n = len(self.prices)
+                order = list(self.order)
+                items = [self._weight(i) for i in order]
+                dirty, stale = self._dirty, self._stale
+                self._dirty, self._stale = n, False
+            target_cents = to_cents(target)
+            active = [w for w, c in items if c > 0]
+            if not active or target_cents <= 0:
+                with self._lock:
+                    # 表格没有更新，失效标记留给下一次
+                    self._dirty = min(self._dirty, dirty)
+                    self._stale = self._stale or stale
+                return ([0] * n, 0, abs(target)) if n else ([], 0, target)
+
+            limit = max(target_cents, self._max_target) + max(active) - 1
+            table = self._table
+            rebuild = stale or table is None or limit > table.limit
+            try:
+                if rebuild:
+                    # 目标或最高价超出了表格范围：按新范围整体重建
+                    self._max_target = max(target_cents, self._max_target)
+                    table = ReachableSums([w for w, _ in items], [c for _, c in items], limit, cancelled)
+                    table.keep_chunk_states()  # 未改动服务的回溯状态可以一直复用
+                    self.rebuilds += 1
+                elif dirty < max(n, len(table.weights)):
+                    start = dirty
+                    table.replace_from(start, [w for w, _ in items[start:]], [c for _, c in items[start:]],
+                                       cancelled)
+                    self.updated_services += n - start
+            except CalculationCancelled:
+                with self._lock:
+                    # 已算完的服务留着，剩下的下一次再算
+                    if rebuild:
+                        self._stale = True
+                    else:
+                        self._dirty = min(self._dirty, len(table.prefixes) - 1)
+                raise
+            self._table = table
+
+            total_cents = table.nearest(target_cents)
+            combo = [0] * n
+            for i, take in zip(order, table.combination(total_cents)):
+                combo[i] = take
+            return combo, total_cents / 100, abs(total_cents - target_cents) / 100
+
+    def find_best_reduction(self, prices: List[float], quantities: List[int], reduce_target: float,
+                            cancelled: Optional[Callable[[], bool]] = None) -> Tuple[List[int], float, float]:
+        """Wie solve_reduction; Preise und Mengen werden vorher abgeglichen"""
+        self.update(prices, reducible_quantities(prices, quantities))
+        return self.find_best_combination(reduce_target, cancelled)
+
+
+# 进程池中每个工作进程自己的求解器（价格表只在初始化时传一次）
+_worker_solver = None
+
+
+def _init_worker(prices, current_quantities, max_target, backend):
+    global _worker_solver
+    _worker_solver = BatchSolver(prices, current_quantities, max_target, backend)
+
+
+def _solve_chunk(targets):
+    return _worker_solver.solve(targets)
+
+
+def find_best_combinations(prices: List[float], current_quantities: List[int], targets: List[float],
+                           backend: str = "python", workers: int = 1,
+                           chunk_size: int = None) -> List[Tuple[List[int], float, float]]:
+    """
+    批量求解：同一价格表、多个目标金额
+    只按最大的目标建一次可达金额表，每个目标都从这张表回答，
+    结果按输入顺序返回，与逐个调用 solve_dp 完全相同。
+    workers > 1 时分块交给 ProcessPoolExecutor：价格表通过 initializer
+    每个进程只传一次，各进程自建表，按块的顺序收集结果。
+    """
+    targets = list(targets)
+    positive = [t for t in targets if to_cents(t) > 0]
+    max_target = max(positive) if positive else 0
+    if workers <= 1 or len(targets) < 2:
+        return BatchSolver(prices, current_quantities, max_target, backend).solve(targets)
+
+    if chunk_size is None:
+        # 每个进程大约 4 块，兼顾负载均衡和调度开销
+        chunk_size = max(1, -(-len(targets) // (workers * 4)))
+    chunks = [targets[k:k + chunk_size] for k in range(0, len(targets), chunk_size)]
+    from concurrent.futures import ProcessPoolExecutor  # 只有多进程才需要（导入较慢）
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(list(prices), list(current_quantities), max_target, backend)) as executor:
+        results = []
+        for chunk_results in executor.map(_solve_chunk, chunks):
+            results.extend(chunk_results)
+    return results
+
+
+class CombinationSearch:
+    """Zählt Kombinationen zu einer Summe einzeln auf, ohne alle zu erzeugen
+
+    Grundlage ist dieselbe Bitfeld-Tabelle wie bei solve_dp, hier aber je
+    einzelnem Service (ohne Preisklassen, damit auch Services mit gleichem
+    Preis unterschieden werden). Für Service ``i`` ist bekannt, welche
+    Restbeträge die Services davor erreichen können; die Tiefensuche vom
+    letzten zum ersten Service läuft deshalb nie in eine Sackgasse.
+
+    Betrachtet werden nur Summen bis zum doppelten Zielbetrag: alles darüber
+    ist weiter vom Ziel entfernt als die leere Kombination. Mit ``exact=True``
+    reicht die Tabelle nur bis zum Ziel selbst.
+    """
+
+    def __init__(self, prices: List[float], current_quantities: List[int], target: float,
+                 exact: bool = False):
+        self.n = len(prices)
+        weights = [to_cents(p) if p > 0 else 0 for p in prices]
+        caps = [max(0, q) if w > 0 else 0 for w, q in zip(weights, current_quantities)]
+        active = [w for w, c in zip(weights, caps) if c > 0]
+        self.scale = math.gcd(*active) or 1
+        self.weights = [w // self.scale if c > 0 else 0 for w, c in zip(weights, caps)]
+        limit = (1 if exact else 2) * max(0, to_cents(target)) // self.scale
+        self.table = ReachableSums(self.weights, caps, limit)
+        size = (limit + 8) // 8
+        # 每个服务之前的可达金额（bytes，O(1) 位测试）
+        self._prefixes = [bits.to_bytes(size, "little") for bits in self.table.prefixes[:-1]]
+
+    def totals_by_distance(self, target_cents: int):
+        """Erreichbare Summen (in ``scale``-Einheiten) nach Differenz zum Ziel, bei Gleichstand die höhere zuerst"""
+        limit = self.table.limit
+        below, _ = self.table.neighbours(target_cents // self.scale)
+        _, above = self.table.neighbours(-(-target_cents // self.scale))
+        while below is not None or above is not None:
+            if above is not None and (below is None or above * self.scale - target_cents
+                                      <= target_cents - below * self.scale):
+                yield above
+                if above == below:
+                    below = None if below == 0 else self.table.neighbours(below - 1)[0]
+                above = self.table.neighbours(above + 1)[1] if above < limit else None
+            else:
+                yield below
+                below = None if below == 0 else self.table.neighbours(below - 1)[0]
+
+    def combinations(self, total: int, after: Optional[List[int]] = None):
+        """Alle Kombinationen mit Summe ``total`` (in ``scale``-Einheiten)
+
+        Reihenfolge: lexikographisch aufsteigend, beginnend beim letzten
+        Service. Mit ``after`` beginnt die Aufzählung direkt hinter dieser
+        Kombination.
+        """
+        if self.table.contains(total):
+            yield from self._descend(total, after)
+
+    def _descend(self, total: int, after: Optional[List[int]]):
+        """Tiefensuche vom letzten zum ersten Service mit explizitem Stapel (keine Rekursion)"""
+        n = self.n
+        if n == 0:
+            if after is None:
+                yield []
+            return
+        combo = [0] * n
+        remaining = [0] * n  # 服务 i 及之前还要凑的金额
+        tops = [0] * n
+        following = [False] * n  # 服务 i 这一层是否还在游标 after 的路径上
+        i = n - 1
+        remaining[i], following[i] = total, after is not None
+        while True:
+            # 进入第 i 层：从游标的数量（或 0）开始
+            w = self.weights[i]
+            tops[i] = min(self.table.caps[i], remaining[i] // w) if w else 0
+            combo[i] = after[i] if following[i] else 0
+            while True:
+                prefix, w = self._prefixes[i], self.weights[i]
+                while combo[i] <= tops[i]:
+                    rest = remaining[i] - combo[i] * w
+                    if prefix[rest >> 3] >> (rest & 7) & 1:
+                        break
+                    combo[i] += 1
+                if combo[i] <= tops[i]:
+                    follow = following[i] and combo[i] == after[i]
+                    if i > 0:
+                        remaining[i - 1], following[i - 1] = rest, follow
+                        i -= 1
+                        break  # 进入下一层
+                    if not follow:  # 仍在游标路径上说明正好是游标本身
+                        yield list(combo)
+                    combo[i] += 1
+                    continue
+                # 这一层试完了：回到上一层的下一个数量
+                combo[i] = 0
+                i += 1
+                if i == n:
+                    return
+                combo[i] += 1
+
+
+def find_top_k_combinations(prices: List[float], current_quantities: List[int], target: float,
+                            k: int) -> List[Tuple[List[int], float, float]]:
+    """
+    前 K 个最优的不同组合，按差异排序（差异相同时金额较大的在前）
+    按与目标的距离依次取可达金额，每个金额的组合用前缀可达表逐个回溯，
+    只生成需要的 K 个，因此 K=10 只比 K=1 多几次回溯。
+    """
+    n = len(prices)
+    if k <= 0:
+        return []
+    if n == 0:
+        return [([], 0, target)]
+    target_cents = to_cents(target)
+    if target_cents <= 0:
+        return [([0] * n, 0, abs(target))]
+
+    search = CombinationSearch(prices, current_quantities, target)
+    results = []
+    for total in search.totals_by_distance(target_cents):
+        total_cents = total * search.scale
+        for combo in search.combinations(total):
+            results.append((combo, total_cents / 100, abs(total_cents - target_cents) / 100))
+            if len(results) == k:
+                return results
+    return results
+
+
+def iter_exact_combinations(prices: List[float], current_quantities: List[int], target: float,
+                            after: Optional[List[int]] = None):
+    """
+    逐个生成恰好等于目标金额的所有组合（惰性，可随时停止）
+    顺序固定：从最后一个服务开始按数量字典序升序。把最后拿到的组合作为
+    after 传回即可从它之后继续（游标），不需要保存任何其他状态。
+    每次只占用 O(服务数) 的额外内存，结果集合再大也不会一次性生成。
+    """
+    target_cents = to_cents(target)
+    if target_cents < 0:
+        return
+    search = CombinationSearch(prices, current_quantities, target, exact=True)
+    total, rest = divmod(target_cents, search.scale)
+    if rest == 0:
+        yield from search.combinations(total, after)
+
+
+# 每个字节值对应的置位位置
+_BIT_POSITIONS = [tuple(p for p in range(8) if v >> p & 1) for v in range(256)]
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+# 枚举时一个金额约占 100 字节（字典），位集表格里只占 1 位：
+# 一半的组合数乘以这个系数超过表格上限时，折半搜索不会比 DP 更省
+_SPARSE_FACTOR = 1024
+
+
+def _set_bits(bits: int, size: int):
+    """Positionen aller gesetzten Bits von ``bits`` in aufsteigender Reihenfolge"""
+    data = bits.to_bytes((size + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        base = match.start() * 8
+        for p in _BIT_POSITIONS[data[match.start()]]:
+            yield base + p
+
+
+class _HalfSums:
+    """Alle Summen einer Hälfte bis ``limit``, einmal und aufsteigend sortiert
+
+    Gehalten werden nur zwei kompakte Arrays: die Summen und je Summe das
+    Zweierpotenz-Paket, durch das sie zuerst erreichbar wurde (Rückverweis
+    für die Kombination). Zwischenstände je Paket werden nicht aufbewahrt.
+    """
+
+    def __init__(self, items: List[Tuple[int, int, int]], limit: int):
+        self.chunks = [(k, take, w * take) for k, w, c in items for take in split_quantity(c)]
+        first = {0: -1}
+        for j, (_, _, shift) in enumerate(self.chunks):
+            reached = {s + shift: j for s in first if s + shift <= limit}
+            reached.update(first)
+            first = reached
+        self.sums = array("q", sorted(first))
+        self.first = array("i", (first[s] for s in self.sums))
+
+    def add_combination(self, total: int, combo: List[int]):
+        """Addiere eine Kombination dieser Hälfte mit Summe ``total`` zu ``combo``"""
+        while total:
+            k, take, shift = self.chunks[self.first[bisect_left(self.sums, total)]]
+            combo[k] += take
+            total -= shift
+
+
+def solve_meet_in_middle(prices: List[float], current_quantities: List[int],
+                         target: float) -> Tuple[List[int], float, float]:
+    """
+    折半搜索（Meet-in-the-Middle）
+    把服务分成两半，分别枚举各自可达的金额（超过上限的剪掉）并排序，
+    再用双指针找和最接近目标的一对。每一半只保存一个排序数组和一个回溯数组，
+    内存随搜索空间的平方根增长，与目标金额无关。某一半的组合数多到
+    排序数组比位集表格还大时，直接用 solve_dp 的表格；结果金额与 solve_dp 相同。
+    """
+    n = len(prices)
+    if n == 0:
+        return [], 0, target
+    problem = prepare_problem(prices, current_quantities, target)
+    if problem is None:
+        return [0] * n, 0, abs(target)
+    classes, target_cents, limit = problem
+    scale = classes.scale
+
+    # 按组合数（数量上限+1 的乘积）尽量均分成两半
+    items = sorted(((k, w, min(c, limit // w)) for k, (w, c) in enumerate(zip(classes.weights, classes.caps))),
+                   key=lambda item: -item[2])
+    halves = ([], [])
+    sizes = [1, 1]
+    for item in items:
+        side = 0 if sizes[0] <= sizes[1] else 1
+        halves[side].append(item)
+        sizes[side] *= item[2] + 1
+
+    if max(sizes) * _SPARSE_FACTOR > limit:
+        # 稠密：位集表格每个金额只要 1 位
+        table = ReachableSums(classes.weights, classes.caps, limit)
+        total_cents = classes.nearest(table, target_cents)
+        combo = classes.split(table.combination(total_cents // scale))
+        return combo, total_cents / 100, abs(total_cents - target_cents) / 100
+
+    left_half = _HalfSums(halves[0], limit)
+    right_half = _HalfSums(halves[1], limit)
+    left, right = left_half.sums, right_half.sums
+
+    # 双指针：左边从小到大，右边从大到小
+    best = None
+    i, j = 0, len(right) - 1
+    while i < len(left) and j >= 0:
+        total = (left[i] + right[j]) * scale
+        key = (abs(total - target_cents), -total)
+        if best is None or key < best[0]:
+            best = (key, left[i], right[j])
+        if total < target_cents:
+            i += 1
+        elif total > target_cents:
+            j -= 1
+        else:
+            break
+
+    _, left_total, right_total = best
+    combo = [0] * len(classes.weights)
+    left_half.add_combination(left_total, combo)
+    right_half.add_combination(right_total, combo)
+    total_cents = (left_total + right_total) * scale
+    return classes.split(combo), total_cents / 100, abs(total_cents - target_cents) / 100
+
+
+def _bound_key(low: int, high: int, target: int) -> Tuple[int, int]:
+    """Bester denkbarer (Differenz, -Summe)-Schlüssel für Summen im Intervall [low, high]
+
+    Das ist die LP-Relaxation: Mengen dürfen gebrochen sein, jede Summe im
+    Intervall gilt als erreichbar.
+    """
+    if low > target:
+        return low - target, -low
+    if high < target:
+        return target - high, -high
+    return 0, -target
+
+
+def solve_anytime(prices: List[float], current_quantities: List[int], target: float,
+                  time_budget: float = 0.05) -> Tuple[List[int], float, float, float]:
+    """
+    限时分支定界（Anytime）
+    按单价从高到低深度优先搜索，用分数松弛（LP 松弛）的区间界剪枝，
+    随时保留当前最好的组合。时间预算用完时返回该组合，以及对可达差异的
+    证明下界（所有未搜索分支的界的最小值）；搜索完整结束时下界等于差异。
+    返回 (组合, 总金额, 差异, 差异下界)
+    """
+    n = len(prices)
+    if n == 0:
+        return [], 0, target, target
+    problem = prepare_problem(prices, current_quantities, target)
+    if problem is None:
+        return [0] * n, 0, abs(target), abs(target)
+    classes, target_cents, limit = problem
+    deadline = time.perf_counter() + time_budget
+
+    # 分支定界的耗时与金额精度无关，这里直接用分计算
+    items = sorted(((k, w * classes.scale, min(c, limit // w))
+                    for k, (w, c) in enumerate(zip(classes.weights, classes.caps))),
+                   key=lambda item: -item[1])
+    # rest[k]: 第 k 个及之后的服务最多还能加的金额
+    rest = [0] * (len(items) + 1)
+    for k in range(len(items) - 1, -1, -1):
+        rest[k] = rest[k + 1] + items[k][1] * items[k][2]
+
+    best_key = (target_cents, 0)
+    best_node = None
+    # 节点: (界, 层, 当前金额, 父节点, 本层数量)；栈顶先搜索
+    stack = [(_bound_key(0, rest[0], target_cents), 0, 0, None, 0)]
+    expanded = 0
+    while stack:
+        expanded += 1
+        if expanded % 64 == 0 and time.perf_counter() > deadline:
+            break
+        node = stack.pop()
+        bound, level, total, _, _ = node
+        if bound >= best_key:
+            continue
+        # 其余服务都取 0 也是一个可行解
+        key = (abs(total - target_cents), -total)
+        if key < best_key:
+            best_key, best_node = key, node
+        if level == len(items):
+            continue
+        idx, w, c = items[level]
+        remaining = rest[level + 1]
+        # 只看界有可能优于当前最好解的数量区间
+        slack = best_key[0]
+        q_low = max(0, -((total + remaining - target_cents + slack) // w))
+        q_high = min(c, (target_cents + slack - total) // w)
+        children = []
+        for q in range(q_low, q_high + 1):
+            child_total = total + q * w
+            child_bound = _bound_key(child_total, child_total + remaining, target_cents)
+            if child_bound < best_key:
+                children.append((child_bound, level + 1, child_total, node, q))
+        # 界最好的子节点最后入栈、最先展开
+        children.sort(reverse=True)
+        stack.extend(children)
+
+    open_bounds = [entry[0][0] for entry in stack if entry[0] < best_key]
+    lower_bound = min([best_key[0]] + open_bounds)
+
+    combo = [0] * len(classes.weights)
+    node = best_node
+    while node is not None and node[3] is not None:
+        combo[items[node[1] - 1][0]] = node[4]
+        node = node[3]
+    total_cents = -best_key[1]
+    return classes.split(combo), total_cents / 100, best_key[0] / 100, lower_bound / 100
+
+
+def _unbounded_levels(classes: PriceClasses, limit: int, best: int) -> Optional[List[int]]:
+    """Erreichbare Summen je Höchstzahl an Einheiten, solange keine Obergrenze greift
+
+    ``levels[k]`` sind die Summen mit höchstens k Einheiten; jede Stufe ist
+    ein Shift pro Klasse. Das ist exakt, solange k keine Obergrenze
+    übersteigt. ``None``, wenn ``best`` vorher nicht erreicht wird.
+    """
+    mask = (1 << (limit + 1)) - 1
+    top = min(classes.caps)
+    levels = [1]
+    while not (levels[-1] >> best) & 1:
+        if len(levels) > top:
+            return None
+        previous = levels[-1]
+        bits = previous
+        for w in classes.weights:
+            bits |= previous << w
+        levels.append(bits & mask)
+    return levels
+
+
+def _min_item_counts(classes: PriceClasses, limit: int, bound: int):
+    """Kleinste Anzahl Einheiten je erreichbarer Summe bis ``limit``
+
+    Die Anzahlen sind bitweise zerlegt: Bit b der Anzahl von Summe s ist
+    Bit s von ``planes[b]`` (gültig für Summen in ``reach``). Jede Klasse
+    wird in einem Durchgang über ihre Zweierpotenz-Pakete eingemischt,
+    anzahl[s] = min(anzahl[s], anzahl[s - menge * preis] + menge); Addition
+    und Vergleich laufen dabei für alle Summen zugleich über die Bitebenen.
+    Von einer Klasse werden höchstens ``bound`` Einheiten betrachtet.
+    ``takes`` enthält je Paket (als Bytes) die Summen, die es verbessert hat.
+    """
+    mask = (1 << (limit + 1)) - 1
+    size = (limit + 8) // 8
+    caps = [min(c, bound, limit // w) for w, c in zip(classes.weights, classes.caps)]
+    width = max(1, sum(caps).bit_length())
+    reach = 1
+    planes = [0] * width
+    chunks = []  # (类, 数量, 金额)
+    takes = []
+    for k, (w, c) in enumerate(zip(classes.weights, caps)):
+        for take in split_quantity(c):
+            shift = w * take
+            shifted_reach = (reach << shift) & mask
+            # 平移后的数量加上 take（逐位加法，进位也是位集）
+            shifted = []
+            carry = 0
+            for b in range(width):
+                plane = (planes[b] << shift) & mask
+                if take >> b & 1:
+                    shifted.append(plane ^ carry ^ shifted_reach)
+                    carry |= plane
+                else:
+                    shifted.append(plane ^ carry)
+                    carry &= plane
+            # 从最高位往下比较：哪些金额用这个包更少
+            less, equal = 0, shifted_reach & reach
+            for b in range(width - 1, -1, -1):
+                less |= equal & planes[b] & ~shifted[b]
+                equal &= ~(planes[b] ^ shifted[b])
+            better = (shifted_reach & ~reach) | less
+            for b in range(width):
+                planes[b] ^= (planes[b] ^ shifted[b]) & better
+            reach |= shifted_reach
+            chunks.append((k, take, shift))
+            takes.append(better.to_bytes(size, "little"))
+    return reach, planes, chunks, takes
+
+
+class _LevelCounts:
+    """Mindestanzahlen aus ``_unbounded_levels`` (alle Klassen wie unbeschränkt)"""
+
+    def __init__(self, classes: PriceClasses, levels: List[int], limit: int):
+        self.weights = classes.weights
+        self.levels = levels
+        size = (limit + 8) // 8
+        self._bytes = [bits.to_bytes(size, "little") for bits in levels]
+
+    def at_most(self, count: int) -> int:
+        return self.levels[min(count, len(self.levels) - 1)]
+
+    def _has(self, k: int, total: int) -> bool:
+        return total >= 0 and self._bytes[k][total >> 3] >> (total & 7) & 1
+
+    def count_at(self, total: int) -> int:
+        return next(k for k in range(len(self.levels)) if self._has(k, total))
+
+    def combination(self, total: int) -> List[int]:
+        class_combo = [0] * len(self.weights)
+        k = self.count_at(total)
+        while k > 0:
+            # 少用一个服务也能达到的金额：找出是哪一类
+            index = next(index for index, w in enumerate(self.weights) if self._has(k - 1, total - w))
+            class_combo[index] += 1
+            total -= self.weights[index]
+            k -= 1
+        return class_combo
+
+
+class _PlaneCounts:
+    """Mindestanzahlen aus ``_min_item_counts`` (mit Obergrenzen)"""
+
+    def __init__(self, classes: PriceClasses, limit: int, bound: int):
+        self.n_classes = len(classes.weights)
+        self.reach, self.planes, self.chunks, self.takes = _min_item_counts(classes, limit, bound)
+        size = (limit + 8) // 8
+        self._plane_bytes = [plane.to_bytes(size, "little") for plane in self.planes]
+
+    def at_most(self, count: int) -> int:
+        less, equal = 0, self.reach
+        for b in range(len(self.planes) - 1, -1, -1):
+            if count >> b & 1:
+                less |= equal & ~self.planes[b]
+                equal &= self.planes[b]
+            else:
+                equal &= ~self.planes[b]
+        return less | equal
+
+    def count_at(self, total: int) -> int:
+        return sum((plane[total >> 3] >> (total & 7) & 1) << b for b, plane in enumerate(self._plane_bytes))
+
+    def combination(self, total: int) -> List[int]:
+        # 从最后一个包往前：这个金额是不是由该包改进的
+        class_combo = [0] * self.n_classes
+        for (k, take, shift), better in zip(reversed(self.chunks), reversed(self.takes)):
+            if better[total >> 3] >> (total & 7) & 1:
+                class_combo[k] += take
+                total -= shift
+        return class_combo
+
+
+def find_pareto_combinations(prices: List[float], current_quantities: List[int],
+                             target: float) -> List[Tuple[List[int], float, float]]:
+    """
+    差异与服务总数的帕累托前沿
+    一次 DP 记录每个可达金额的最少服务数，然后从差异最小的金额开始，每次在
+    服务数更少的金额里找最接近目标的，直到 0 个服务为止。
+    数量上限都够大时逐层计算（每层每类一次平移）；否则按位分层存储最少服务数，
+    每个类只处理一遍。结果按服务数升序（差异降序）排列，
+    最后一项就是差异最小且服务数最少的组合。
+    """
+    n = len(prices)
+    if n == 0:
+        return [([], 0, target)]
+    problem = prepare_problem(prices, current_quantities, target)
+    if problem is None:
+        return [([0] * n, 0, abs(target))]
+    classes, target_cents, _ = problem
+    scale = classes.scale
+    # 差异超过目标本身的金额不如一个都不选
+    limit = 2 * target_cents // scale
+    table = ReachableSums(classes.weights, classes.caps, limit)
+    best = classes.nearest(table, target_cents) // scale
+
+    levels = _unbounded_levels(classes, limit, best)
+    if levels is not None:
+        counts = _LevelCounts(classes, levels, limit)
+        bound = len(levels) - 1
+    else:
+        # 任意一个最优组合的服务数是上界：服务数更多的金额不可能在前沿上
+        bound = sum(table.combination(best))
+        counts = _PlaneCounts(classes, limit, bound)
+    del table
+
+    frontier = []
+    low, high = min(target_cents // scale, limit), min(-(-target_cents // scale), limit)
+    while True:
+        bits = counts.at_most(bound)
+        below, _ = _bit_neighbours(bits, low)
+        _, above = _bit_neighbours(bits, high)
+        total = _closer(below * scale, None if above is None else above * scale, target_cents) // scale
+        if above is not None and above != below and above * scale - target_cents == target_cents - below * scale:
+            # 差异相同：取服务数少的（相同时取金额大的）
+            if counts.count_at(below) < counts.count_at(above):
+                total = below
+        frontier.append((classes.split(counts.combination(total)), total * scale / 100,
+                         abs(total * scale - target_cents) / 100))
+        count = counts.count_at(total)
+        if count == 0:
+            break
+        bound = count - 1
+    frontier.reverse()
+    return frontier
+
+
+SOLVERS = {
+    "dp": solve_dp,
+    "mitm": solve_meet_in_middle,
+    "anytime": solve_anytime,
+}
+
 
 class ServiceCalculatorLogic:
     """Geschäftslogik des Service-Rechners ohne GUI"""
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 256, project: Optional[str] = None):
         self.config_file = ".service_config.json"
-        self.services = [
+        # 使用 SQLite 目录库时要读的项目（None：库里的当前项目）
+        self.project = project
+        # 服务目录在第一次用到时才读取（命令行启动更快，也可以先改 config_file）
+        self._project_name = "Service-Rechner"
+        self._services = None
+        self.journal = None  # 变更日志（不用 SQLite 目录库时）
+        self.last_lower_bound = None
+        # LRU-Cache für Ergebnisse von find_best_combination
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+    
+    @property
+    def services(self) -> List[dict]:
+        if self._services is None:
+            self.load_config()
+        return self._services
+    
+    @services.setter
+    def services(self, services: List[dict]):
+        self._services = services
+    
+    @property
+    def project_name(self) -> str:
+        if self._services is None:
+            self.load_config()
+        return self._project_name
+    
+    @project_name.setter
+    def project_name(self, name: str):
+        self._project_name = name
+    
+    def load_config(self):
+        """Lade gespeicherte Service-Preise (SQLite-Speicher, Format der GUI oder altes Preisformat)"""
+        store = open_store(self.config_file)
+        if store is not None:
+            try:
+                project = self.project or store.active_project()
+                if project is not None:
+                    try:
+                        self._services = store.load(project)
+                    except KeyError:
+                        raise ValueError(f"Unbekanntes Projekt: {project}") from None
+                    self._project_name = project
+                    return
+            finally:
+                store.close()
+        # 每次都从默认列表（或下面读到的快照）开始，重复加载时日志不会被重放两次
+        self._services = [
             {"name": "Service A", "price": 10},
             {"name": "Service B", "price": 15},
             {"name": "Service C", "price": 20},
             {"name": "Service D", "price": 25},
             {"name": "Service E", "price": 30}
         ]
-        self.load_config()
-    
-    def load_config(self):
-        """Lade gespeicherte Service-Preise"""
+        snapshot_seq = 0
         if os.path.exists(self.config_file):
             try:
                 with open(self.config_file, 'r') as f:
                     saved_prices = json.load(f)
-                    for i, service in enumerate(self.services):
-                        if str(i) in saved_prices:
-                            self.services[i]["price"] = saved_prices[str(i)]
+                    snapshot_seq = saved_prices.get("journal_seq", 0)
+                    if "services" in saved_prices:
+                        self._project_name = saved_prices.get("project_name", self._project_name)
+                        self._services = saved_prices["services"]
+                    else:
+                        for i, service in enumerate(self._services):
+                            if str(i) in saved_prices:
+                                service["price"] = saved_prices[str(i)]
             except Exception as e:
                 print(f"Fehler beim Laden: {e}")
+        # 快照之后的修改记录在日志里
+        self._journal().replay(self._services, snapshot_seq)
+    
+    def _journal(self) -> CatalogJournal:
+        """Änderungsprotokoll der aktuellen Konfigurationsdatei"""
+        if self.journal is None or self.journal.config_file != self.config_file:
+            self.journal = CatalogJournal(self.config_file)
+        return self.journal
     
     def save_config(self):
-        """Speichere aktuelle Service-Preise"""
+        """Speichere den ganzen Katalog (Projektname und Services) und leere das Änderungsprotokoll"""
         try:
-            prices_to_save = {str(i): service["price"] for i, service in enumerate(self.services)}
-            with open(self.config_file, 'w') as f:
-                json.dump(prices_to_save, f)
+            store = open_store(self.config_file)
+            if store is not None:
+                # 只写有变化的行
+                try:
+                    store.save(self.project_name, self.services)
+                finally:
+                    store.close()
+            else:
+                self._journal().compact({"project_name": self.project_name, "services": self.services})
         except Exception as e:
             print(f"Fehler beim Speichern: {e}")
+        # 价格已变，旧结果不能再用
+        self.clear_cache()
+    
+    def record_change(self, op: str, **fields):
+        """Speichere eine einzelne, bereits angewandte Änderung (Protokolleintrag statt ganzer Datei)"""
+        if os.path.exists(catalog_db_path(self.config_file)):
+            # 数据库按行写入，直接保存
+            self.save_config()
+            return
+        try:
+            if self._journal().append(op, **fields):
+                self.save_config()
+                return
+        except OSError as e:
+            print(f"Fehler beim Speichern: {e}")
+        self.clear_cache()
+    
+    def update_service(self, index: int, name: Optional[str] = None, price: Optional[float] = None):
+        """Ändere Name und/oder Preis eines Services und speichere die Änderung"""
+        fields = {key: value for key, value in (("name", name), ("price", price)) if value is not None}
+        self.services[index].update(fields)
+        self.record_change("set", index=index, **fields)
+    
+    def add_service(self, name: str, price: float):
+        """Hänge einen Service an und speichere die Änderung"""
+        self.services.append({"name": name, "price": price})
+        self.record_change("add", name=name, price=price)
+    
+    def remove_service(self, index: int):
+        """Entferne einen Service und speichere die Änderung"""
+        del self.services[index]
+        self.record_change("remove", index=index)
+    
+    def clear_cache(self):
+        """Leere den Ergebniscache (Zähler bleiben erhalten)"""
+        self._cache.clear()
+    
+    def cache_info(self) -> dict:
+        """Treffer, Fehlschläge, Verdrängungen und aktuelle Größe des Ergebniscaches"""
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "evictions": self.cache_evictions,
+            "size": len(self._cache),
+            "maxsize": self.cache_size,
+        }
+    
+    @staticmethod
+    def _cache_key(prices, current_quantities, target, method, options):
+        """Normalisierter Schlüssel: Preise in Cent, wirksame Obergrenzen, Ziel in Cent"""
+        weights = tuple(to_cents(p) if p > 0 else 0 for p in prices)
+        caps = tuple(max(0, q) if w > 0 else 0 for w, q in zip(weights, current_quantities))
+        return weights, caps, to_cents(target), method, tuple(sorted(options.items()))
     
     def validate_price(self, price_str: str) -> int:
         """Validiere und konvertiere Preis-Eingabe"""
@@ -64,7 +1295,75 @@ class ServiceCalculatorLogic:
         except ValueError:
             return 0
     
-    def find_best_combination(self, prices: List[int], current_quantities: List[int], target: float) -> Tuple[List[int], float, float]:
+    def find_best_combination(self, prices: List[int], current_quantities: List[int], target: float,
+                              method: str = "dp", **options) -> Tuple[List[int], float, float]:
+        """
+        精确求解：在数量上限内找与目标金额最接近的组合
+        method 选择 SOLVERS 中的求解器（默认 solve_dp），options 原样传给它，
+        例如 method="anytime", time_budget=0.05。
+        差异的证明下界保存在 self.last_lower_bound（精确求解时等于差异）。
+        结果按 (价格, 数量上限, 目标分, 方法) 缓存；限时的 anytime 不缓存。
+        """
+        if method not in SOLVERS:
+            raise ValueError(f"Unbekannte Methode: {method}")
+        cacheable = self.cache_size > 0 and method != "anytime" and len(prices) > 0
+        if cacheable:
+            key = self._cache_key(prices, current_quantities, target, method, options)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                combo, total, difference = cached
+                self.last_lower_bound = difference
+                return list(combo), total, difference
+            self.cache_misses += 1
+
+        result = SOLVERS[method](prices, current_quantities, target, **options)
+        combo, total, difference = result[:3]
+        self.last_lower_bound = result[3] if len(result) > 3 else difference
+        if cacheable:
+            self._cache[key] = (tuple(combo), total, difference)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.cache_evictions += 1
+        return combo, total, difference
+
+    def find_best_combinations(self, prices: List[int], current_quantities: List[int],
+                               targets: List[float], workers: int = 1) -> List[Tuple[List[int], float, float]]:
+        """
+        批量求解多个目标金额（见模块函数 find_best_combinations）
+        """
+        return find_best_combinations(prices, current_quantities, targets, workers=workers)
+    
+    def find_top_k_combinations(self, prices: List[int], current_quantities: List[int], target: float,
+                                k: int = 10) -> List[Tuple[List[int], float, float]]:
+        """
+        前 K 个不同的组合（见模块函数 find_top_k_combinations）
+        """
+        return find_top_k_combinations(prices, current_quantities, target, k)
+    
+    def find_pareto_combinations(self, prices: List[int], current_quantities: List[int],
+                                 target: float) -> List[Tuple[List[int], float, float]]:
+        """
+        差异与服务总数的帕累托前沿（见模块函数 find_pareto_combinations）
+        """
+        return find_pareto_combinations(prices, current_quantities, target)
+    
+    def iter_exact_combinations(self, prices: List[int], current_quantities: List[int], target: float,
+                                after: List[int] = None):
+        """
+        恰好命中目标的所有组合，惰性生成（见模块函数 iter_exact_combinations）
+        """
+        return iter_exact_combinations(prices, current_quantities, target, after)
+    
+    def find_best_reduction(self, prices: List[int], quantities: List[int],
+                            reduce_target: float) -> Tuple[List[int], float, float]:
+        """
+        减少模式（见模块函数 solve_reduction）
+        """
+        return solve_reduction(prices, quantities, reduce_target)
+    
+    def find_greedy_combination(self, prices: List[int], current_quantities: List[int], target: float) -> Tuple[List[int], float, float]:
         """
         贪心算法 + 最小服务微调方案
         第一步：用大服务快速接近目标（贪心）
@@ -75,8 +1374,11 @@ class ServiceCalculatorLogic:
         if n == 0:
             return [], 0, target
         
+        # 全程用整数分计算，避免浮点误差累积
+        cents = [to_cents(p) if p > 0 else 0 for p in prices]
+
         # 过滤有效服务（价格>0且有库存）
-        valid_items = [(prices[i], i) for i in range(n) if prices[i] > 0 and current_quantities[i] > 0]
+        valid_items = [(prices[i], i) for i in range(n) if cents[i] > 0 and current_quantities[i] > 0]
         if not valid_items:
             return [0] * n, 0, target
         
@@ -84,7 +1386,7 @@ class ServiceCalculatorLogic:
         valid_items.sort(reverse=True)
         
         combo = [0] * n
-        remaining_target = target
+        remaining_target = to_cents(target)
         
         # 第一步：用大服务快速接近目标（贪心）
         for price, idx in valid_items[:-1]:  # 除了最小的服务
@@ -93,14 +1395,16 @@ class ServiceCalculatorLogic:
             # 计算可以使用的最大数量（不超过库存）
             max_allowed = current_quantities[idx]
             # 计算需要的数量
-            needed_qty = int(remaining_target / price)
+            needed_qty = remaining_target // cents[idx]
             # 实际使用数量
             actual_qty = min(needed_qty, max_allowed)
             
             if actual_qty > 0:
                 combo[idx] = actual_qty
-                remaining_target -= price * actual_qty
-                print(f"步骤1 - 使用 {actual_qty} 个 {self.services[idx]['name']} (单价{price}), 剩余目标: {remaining_target:.2f}")
+                remaining_target -= cents[idx] * actual_qty
+                if TRACE.enabled:
+                    TRACE.emit("greedy.take", step=1, index=idx, quantity=actual_qty, price=price,
+                               remaining=remaining_target)
         
         # 第二步：用最小价格服务精确调整
         if remaining_target > 0 and valid_items:
@@ -109,16 +1413,16 @@ class ServiceCalculatorLogic:
             
             # 计算需要的最小服务数量
             if remaining_target > 0:
-                needed_min_qty = int(remaining_target / min_price)
-                # 允许稍微超过一点点来达到目标
-                if needed_min_qty * min_price < remaining_target:
-                    needed_min_qty += 1
+                # 允许稍微超过一点点来达到目标（向上取整）
+                needed_min_qty = -(-remaining_target // cents[min_idx])
                 
                 # 实际使用数量（不超过库存）
                 actual_min_qty = min(needed_min_qty, min_max_allowed)
                 combo[min_idx] = actual_min_qty
-                remaining_target -= min_price * actual_min_qty
-                print(f"步骤2 - 使用 {actual_min_qty} 个 {self.services[min_idx]['name']} (单价{min_price}), 剩余目标: {remaining_target:.2f}")
+                remaining_target -= cents[min_idx] * actual_min_qty
+                if TRACE.enabled:
+                    TRACE.emit("greedy.take", step=2, index=min_idx, quantity=actual_min_qty, price=min_price,
+                               remaining=remaining_target)
         
         # 第三步：确保结果在输入约束内
         # 验证所有数量都不超过输入限制
@@ -126,10 +1430,13 @@ class ServiceCalculatorLogic:
             combo[i] = min(combo[i], current_quantities[i])
         
         # 计算最终结果
-        total = sum(prices[i] * combo[i] for i in range(n))
-        difference = abs(total - target)
+        total_cents = sum(cents[i] * combo[i] for i in range(n))
+        total = total_cents / 100
+        difference = abs(total_cents - to_cents(target)) / 100
         
-        print(f"\n最终结果 - 总金额: {total:.2f}, 目标: {target:.2f}, 差异: {difference:.2f}")
+        if TRACE.enabled:
+            TRACE.emit("result", total=total_cents, target=to_cents(target),
+                       difference=abs(total_cents - to_cents(target)))
         
         return combo, total, difference
 
@@ -144,7 +1451,7 @@ def demo_calculation():
     
     # Beispiel-Berechnung
     prices = [service["price"] for service in calc.services]
-    current_quantities = [0, 0, 0, 0, 0]  # Alle auf 0
+    current_quantities = [10] * len(prices)  # Höchstens 10 pro Service
     target_amount = 65.0
     
     print(f"\nSuche optimale Kombination für {target_amount}€")
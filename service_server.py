@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Lokaler Rechen-Dienst (asyncio, JSON über HTTP oder Unix-Socket)
+
+Statt für jede Anfrage Python zu starten und .service_config.json neu zu
+lesen, hält der Dienst den Katalog und die Tabellen der erreichbaren Summen
+(BatchSolver, je Mengenobergrenzen) im Speicher. Gerechnet wird in einem
+Executor, die Ereignisschleife blockiert also nie. Gleichzeitige identische
+Anfragen (gleicher Katalog-Hash, gleiche Obergrenzen, gleiches Ziel) teilen
+sich eine einzige Berechnung.
+
+    python service_server.py --port 8765
+    curl -d '{"target": 1500.98, "quantities": {"L01": 3}}' http://127.0.0.1:8765/solve
+
+Anfragen haben dasselbe Format wie eine JSONL-Zeile im Stapelbetrieb der
+Kommandozeile (``"reduce": true`` für den Reduziermodus), die Antworten
+ebenso, ergänzt um ``"catalog"`` (Hash des verwendeten Katalogs).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from service_calculator_cli import parse_request, reduction_record, result_record
+from service_database import catalog_db_path
+from service_logic import BatchSolver, ServiceCalculatorLogic, reducible_quantities, to_cents
+from service_storage import JOURNAL_SUFFIX
+
+CONFIG_FILE = ".service_config.json"
+# 表格至少建到这个目标金额，常见的目标都不必重建
+WARM_TARGET = 5000.0
+# 最多保留多少张表（每组不同的数量上限一张）
+MAX_TABLES = 8
+MAX_BODY = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large"}
+
+
+def catalog_hash(services: List[dict]) -> str:
+    """Kurzer Hash über Namen und Preise (in Cent) des Katalogs"""
+    canonical = json.dumps([[service["name"], to_cents(service["price"])] for service in services],
+                           ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class SolveService:
+    """Hält Katalog und Tabellen warm und fasst gleiche Anfragen zusammen"""
+
+    def __init__(self, config_file: str = CONFIG_FILE, default_cap: int = 1000,
+                 warm_target: float = WARM_TARGET, max_tables: int = MAX_TABLES, workers: int = 2,
+                 project: Optional[str] = None):
+        self.config_file = config_file
+        self.project = project  # 使用 SQLite 目录库时的项目（None：当前项目）
+        self.default_cap = default_cap
+        self.warm_target = warm_target
+        self.max_tables = max_tables
+        # 线程池：表格在线程之间共享，事件循环只负责收发
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="solve")
+        self.computations = 0  # 实际计算次数
+        self.coalesced = 0  # 直接搭上进行中计算的请求数
+        self._catalog = None  # (文件状态, 哈希, 服务列表)
+        self._tables = OrderedDict()  # (哈希, 上限) -> (表格最大目标分, BatchSolver, 锁)
+        self._tables_lock = threading.Lock()
+        self._inflight = {}  # (哈希, 上限, 目标分) -> 进行中的 Future
+
+    def catalog(self) -> Tuple[str, List[dict]]:
+        """Aktueller Katalog als (Hash, Services); neu geladen, wenn sich die Datei geändert hat"""
+        stamp = self._stamp()
+        if self._catalog is None or self._catalog[0] != stamp:
+            calc = ServiceCalculatorLogic(project=self.project)
+            calc.config_file = self.config_file
+            services = calc.services
+            self._catalog = (stamp, catalog_hash(services), services)
+        return self._catalog[1], self._catalog[2]
+
+    def _stamp(self):
+        """Änderungsstand von JSON-Datei (samt Änderungsprotokoll) und SQLite-Speicher (samt WAL-Datei)"""
+        db_path = catalog_db_path(self.config_file)
+        stamp = []
+        for path in (self.config_file, self.config_file + JOURNAL_SUFFIX, db_path, db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    async def warm(self):
+        """Baue die Tabelle für die Standard-Obergrenzen vorab"""
+        catalog_id, services = self.catalog()
+        prices = [service["price"] for service in services]
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._solver, catalog_id, prices, [self.default_cap] * len(prices), self.warm_target)
+
+    async def solve(self, record: dict) -> dict:
+        """Beantworte eine Anfrage (Format wie eine JSONL-Zeile der Kommandozeile)"""
+        catalog_id, services = self.catalog()
+        reduce = bool(record.get("reduce", False))
+        target, quantities = parse_request(record, services, 0 if reduce else self.default_cap)
+        prices = [service["price"] for service in services]
+        caps = reducible_quantities(prices, quantities) if reduce else quantities
+        # 减少模式只是换了上限，同样的上限和目标可以共用一次计算
+        key = (catalog_id, tuple(caps), to_cents(target))
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, self._compute, catalog_id, prices, caps, target)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield：一个客户端断开不会取消别人也在等的计算
+        result = await asyncio.shield(future)
+        if reduce:
+            response = reduction_record(target, services, quantities, result)
+        else:
+            response = result_record(target, services, result)
+        response["catalog"] = catalog_id
+        return response
+
+    def _compute(self, catalog_id: str, prices: List[float], caps: List[int], target: float):
+        with self._tables_lock:
+            self.computations += 1
+        solver, lock = self._solver(catalog_id, prices, caps, target)
+        with lock:
+            return solver.solve([target])[0]
+
+    def _solver(self, catalog_id: str, prices: List[float], caps: List[int], target: float):
+        """Tabelle für diese Obergrenzen, die bis ``target`` reicht (aus dem Cache oder neu)"""
+        key = (catalog_id, tuple(caps))
+        with self._tables_lock:
+            entry = self._tables.get(key)
+            if entry is not None and entry[0] >= to_cents(target):
+                self._tables.move_to_end(key)
+                return entry[1], entry[2]
+        # 在锁外建表；目标超出时把范围至少翻倍，避免反复重建
+        max_target = max(target, self.warm_target, 2 * entry[0] / 100 if entry is not None else 0)
+        entry = (to_cents(max_target), BatchSolver(prices, caps, max_target), threading.Lock())
+        with self._tables_lock:
+            self._tables[key] = entry
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return entry[1], entry[2]
+
+    def health(self) -> dict:
+        catalog_id, services = self.catalog()
+        return {
+            "status": "ok",
+            "catalog": catalog_id,
+            "services": len(services),
+            "tables": len(self._tables),
+            "computations": self.computations,
+            "coalesced": self.coalesced,
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Eine HTTP/1.1-Anfrage beantworten (danach wird die Verbindung geschlossen)"""
+        try:
+            status, body = await self._respond(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n")
+        try:
+            writer.write(head.encode("ascii") + payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, reader: asyncio.StreamReader) -> Tuple[int, dict]:
+        parts = (await reader.readline()).decode("latin-1").split()
+        if len(parts) != 3:
+            return 400, {"error": "ungültige Anfragezeile"}
+        method, path, _ = parts
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return 400, {"error": "ungültige Content-Length"}
+        if length > MAX_BODY:
+            return 413, {"error": "Anfrage zu groß"}
+        body = await reader.readexactly(length) if length > 0 else b""
+
+        if path == "/health":
+            return (200, self.health()) if method == "GET" else (405, {"error": "nur GET"})
+        if path != "/solve":
+            return 404, {"error": f"unbekannter Pfad: {path}"}
+        if method != "POST":
+            return 405, {"error": "nur POST"}
+        try:
+            record = json.loads(body)
+            if not isinstance(record, dict):
+                raise ValueError("JSON-Objekt erwartet")
+            return 200, await self.solve(record)
+        except (ValueError, KeyError, TypeError, OverflowError, MemoryError) as e:
+            # 目标与数量的检查和 CLI 共用（parse_request），剩余的异常也算错误请求
+            return 400, {"error": str(e) or type(e).__name__}
+
+
+async def serve(args):
+    service = SolveService(args.config, args.cap, workers=args.workers, project=args.project)
+    await service.warm()
+    if args.unix:
+        server = await asyncio.start_unix_server(service.handle, path=args.unix)
+        where = args.unix
+    else:
+        server = await asyncio.start_server(service.handle, args.host, args.port)
+        where = f"http://{args.host}:{args.port}"
+    print(f"Rechen-Dienst läuft auf {where} (Katalog {service.catalog()[0]})")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Lokaler Rechen-Dienst (JSON über HTTP)")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse (Standard: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (Standard: 8765)")
+    parser.add_argument("--unix", metavar="PFAD", help="Unix-Socket statt TCP")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Katalogdatei (Standard: .service_config.json)")
+    parser.add_argument("--cap", type=int, default=1000,
+                        help="Mengenobergrenze für Services ohne eigene Angabe (Standard: 1000)")
+    parser.add_argument("--project", metavar="NAME",
+                        help="Projekt aus .service_catalog.db (Standard: das aktive Projekt)")
+    parser.add_argument("--workers", type=int, default=2, help="Rechen-Threads (Standard: 2)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
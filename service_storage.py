@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Speichern der Konfiguration: atomar und als Änderungsprotokoll
+
+Geschrieben wird immer über eine temporäre Datei plus Umbenennen, damit die
+Konfiguration nie halb geschrieben auf der Platte liegt.
+
+Einzelne Katalogänderungen schreiben die Oberflächen als kleine Einträge in
+ein Änderungsprotokoll (CatalogJournal); die ganze Datei wird nur noch beim
+Verdichten neu geschrieben. Änderungen bei jedem Tastendruck fasst die
+Oberfläche selbst zusammen (ein Eintrag je Feld nach kurzer Ruhepause).
+"""
+
+import json
+import os
+
+
+def write_json_atomic(path: str, data, indent=None):
+    """Schreibe ``data`` als JSON nach ``path`` (temporäre Datei + os.replace)"""
+    import tempfile  # 只有写盘时才需要，不拖慢启动
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+JOURNAL_SUFFIX = ".journal"
+# 日志超过这个大小就压缩成新的快照
+COMPACT_BYTES = 64 * 1024
+
+
+def apply_change(services: list, record: dict):
+    """Wende einen Protokolleintrag auf die Service-Liste an"""
+    op = record["op"]
+    if op == "set":
+        service = services[record["index"]]
+        for key in ("name", "price"):
+            if key in record:
+                service[key] = record[key]
+    elif op == "add":
+        services.append({"name": record["name"], "price": record["price"]})
+    elif op == "remove":
+        del services[record["index"]]
+    else:
+        raise ValueError(f"unbekannte Änderung: {op}")
+
+
+class CatalogJournal:
+    """Append-only Änderungsprotokoll neben der Konfigurationsdatei
+
+    Jede Änderung (Name/Preis setzen, Service hinzufügen oder löschen) ist eine
+    JSON-Zeile mit laufender Nummer; eine Änderung kostet also unabhängig von
+    der Kataloggröße ein kurzes Anhängen plus fsync. Beim Laden werden die
+    Einträge nachgespielt, die neuer sind als der Gesamtstand in der
+    Konfigurationsdatei (``journal_seq``). Ist das Protokoll größer als
+    ``compact_bytes``, schreibt ``compact`` einen neuen Gesamtstand (atomar)
+    und leert danach das Protokoll.
+
+    Absturzsicherheit: Eine halb geschriebene letzte Zeile wird beim Laden
+    verworfen; ein Absturz zwischen Gesamtstand und Leeren schadet nicht, weil
+    ``journal_seq`` die schon enthaltenen Einträge überspringt.
+    """
+
+    def __init__(self, config_file: str, compact_bytes: int = COMPACT_BYTES):
+        self.config_file = config_file
+        self.path = config_file + JOURNAL_SUFFIX
+        self.compact_bytes = compact_bytes
+        self.seq = 0  # 最后一条记录的序号
+        self.size = 0  # 日志文件的字节数
+
+    def replay(self, services: list, snapshot_seq: int = 0) -> int:
+        """Spiele Einträge nach ``snapshot_seq`` auf ``services`` nach; liefert deren Anzahl"""
+        self.seq = snapshot_seq
+        self.size = 0
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        applied = 0
+        good = 0  # 最后一条完整记录之后的位置
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # 写到一半时崩溃
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record["seq"] > snapshot_seq:
+                try:
+                    apply_change(services, record)
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    # 日志和快照对不上：保留文件，不再继续
+                    print(f"Fehler im Änderungsprotokoll (Eintrag {record.get('seq')}): {e}")
+                    self.size = len(data)
+                    return applied
+                applied += 1
+            self.seq = max(self.seq, record["seq"])
+            good += len(line)
+        if good < len(data):
+            # 截掉残缺的尾部，新记录才能接在完整记录后面
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+                os.fsync(f.fileno())
+        self.size = good
+        return applied
+
+    def append(self, op: str, **fields) -> bool:
+        """Hänge eine Änderung an (mit fsync); True, wenn verdichtet werden sollte"""
+        self.seq += 1
+        record = dict(seq=self.seq, op=op, **fields)
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.size += len(line)
+        return self.size > self.compact_bytes
+
+    def compact(self, snapshot: dict, indent=None):
+        """Schreibe den Gesamtstand (atomar) und leere danach das Protokoll"""
+        write_json_atomic(self.config_file, dict(snapshot, journal_seq=self.seq), indent)
+        if self.size or os.path.exists(self.path):
+            with open(self.path, "wb") as f:
+                os.fsync(f.fileno())
+        self.size = 0
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Strukturierte Ablaufverfolgung (Trace) für die Löser
+
+Statt print() melden die Löser ihre Schritte (gewählter Service, Menge,
+Restbetrag) als Ereignisse an ``TRACE``. Jeder Aufrufpunkt prüft vorher
+``if TRACE.enabled:`` – ausgeschaltet wird also weder ein String formatiert
+noch ein Objekt angelegt. Eingeschaltet landen die Ereignisse unformatiert in
+einem Ringpuffer und auf Wunsch zusätzlich bei einem Empfänger (z. B.
+logging). Erst eine Anzeige wie "Schritte anzeigen" macht mit
+``format_steps`` Text daraus.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import logging  # 只用于类型标注；运行时按需导入
+
+DEFAULT_CAPACITY = 1000
+
+
+class TraceEvent(NamedTuple):
+    time: float  # time.perf_counter()
+    kind: str  # z. B. "greedy.take", "dp.take", "result"
+    fields: Dict
+
+
+class Tracer:
+    """Sammelt Ereignisse in einem Ringpuffer fester Größe"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.enabled = False
+        self.events = deque(maxlen=capacity)
+        self.sink = None  # 可选：每个事件额外交给它（例如写日志）
+
+    def enable(self, capacity: Optional[int] = None, sink: Optional[Callable[[TraceEvent], None]] = None):
+        if capacity is not None and capacity != self.events.maxlen:
+            self.events = deque(self.events, maxlen=capacity)
+        self.sink = sink
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.sink = None
+
+    def clear(self):
+        self.events.clear()
+
+    def emit(self, kind: str, **fields):
+        """Ereignis aufzeichnen; Aufrufer prüfen vorher ``enabled``"""
+        event = TraceEvent(time.perf_counter(), kind, fields)
+        self.events.append(event)
+        if self.sink is not None:
+            self.sink(event)
+
+    @contextmanager
+    def recording(self, capacity: Optional[int] = None):
+        """Zeichne nur innerhalb des Blocks auf; liefert die Liste der neuen Ereignisse"""
+        previous = (self.enabled, self.sink)
+        self.clear()
+        self.enable(capacity, self.sink)
+        recorded = []
+        try:
+            yield recorded
+        finally:
+            recorded.extend(self.events)
+            self.enabled, self.sink = previous
+
+
+TRACE = Tracer()
+
+
+def logging_sink(logger: "logging.Logger", level: Optional[int] = None) -> Callable[[TraceEvent], None]:
+    """Empfänger, der jedes Ereignis als strukturierten Log-Eintrag schreibt (Standard: DEBUG)"""
+    if level is None:
+        import logging  # 只在真正需要时导入，命令行启动时不加载 logging
+        level = logging.DEBUG
+
+    def sink(event: TraceEvent):
+        if logger.isEnabledFor(level):
+            logger.log(level, "%s %s", event.kind, event.fields, extra={"trace": event.fields})
+    return sink
+
+
+def format_event(event: TraceEvent, names: Optional[List[str]] = None) -> str:
+    """Eine Zeile Text für die Schrittanzeige"""
+    f = event.fields
+    if event.kind in ("greedy.take", "dp.take"):
+        index = f["index"]
+        name = names[index] if names and index < len(names) else f"Service {index + 1}"
+        prefix = f"步骤{f['step']} - " if "step" in f else ""
+        return (f"{prefix}使用 {f['quantity']} 个 {name} (单价{f['price']}), "
+                f"剩余目标: {f['remaining'] / 100:.2f}")
+    if event.kind == "result":
+        return (f"最终结果 - 总金额: {f['total'] / 100:.2f}, 目标: {f['target'] / 100:.2f}, "
+                f"差异: {f['difference'] / 100:.2f}")
+    return f"{event.kind} {f}"
+
+
+def format_steps(events, names: Optional[List[str]] = None) -> List[str]:
+    return [format_event(event, names) for event in events]
@@ -16,7 +16,7 @@ from unittest.mock import patch, MagicMock
 # 导入GUI类
 import sys
 sys.path.append('/home/wp/PycharmProjects/PythonProject')
-from service_gui import ServiceCalculatorGUI
+from service_gui import NAME, ServiceCalculatorGUI
 
 class TestNewFeatures(unittest.TestCase):
     
@@ -70,7 +70,7 @@ class TestNewFeatures(unittest.TestCase):
         
         # 测试服务名称修改
         new_name = "测试服务1"
-        gui.on_service_name_changed(len(gui.services) - 1, new_name)
+        gui.table_model.setData(gui.table_model.index(len(gui.services) - 1, NAME), new_name)
         self.assertEqual(gui.services[-1]['name'], new_name)
         
         # 测试价格修改
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+单元测试：求解器基准测试
+"""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import service_benchmark
+from service_benchmark import (check_startup, compare, load_catalog, load_legacy_solver, measure_startup, percentile,
+                               run_benchmark)
+from service_logic import solve_dp
+from service_storage import CatalogJournal, write_json_atomic
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = [27.85, 14.91, 6.80, 6.80, 0.68]
+        self.targets = [12.34, 50.00]
+        self.profiles = {"cap3": lambda n: [3] * n}
+
+    def test_catalog_includes_journal(self):
+        """基准目录包含日志里的修改，也能读旧的价格格式"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, ".service_config.json")
+            write_json_atomic(path, {"services": [{"name": "A", "price": 1.0}]})
+            CatalogJournal(path).append("set", index=0, price=2.5)
+            self.assertEqual(load_catalog(path), [2.5])
+            write_json_atomic(path, {"0": 3.0})
+            os.remove(path + ".journal")
+            self.assertEqual(load_catalog(path)[0], 3.0)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_percentile(self):
+        """最近秩百分位数"""
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 90), 5)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_results(self):
+        """精确解法差距为 0；结果可以序列化为 JSON"""
+        greedy = load_legacy_solver(os.path.join(HERE, "test_unit_greedy.py"))
+        results = run_benchmark(self.prices, {"dp": solve_dp, "greedy": greedy},
+                                self.targets, self.profiles, repeat=2)
+        dp = results["solvers"]["dp"]
+        self.assertEqual(dp["calls"], 4)
+        self.assertEqual((dp["exact_rate"], dp["gap_cents"]["max"], dp["invalid"]), (1, 0, 0))
+        self.assertGreaterEqual(results["solvers"]["greedy"]["gap_cents"]["max"], 0)
+        self.assertLessEqual(dp["latency_ms"]["p50"], dp["latency_ms"]["max"])
+        json.dumps(results)
+
+    def test_invalid_combinations(self):
+        """超出数量上限的组合记为无效"""
+        too_many = lambda prices, quantities, target: ([q + 1 for q in quantities], 0, 0)
+        results = run_benchmark(self.prices, {"bad": too_many}, self.targets, self.profiles, repeat=1)
+        self.assertEqual(results["solvers"]["bad"]["invalid"], 2)
+        self.assertEqual(results["solvers"]["bad"]["exact_rate"], 0)
+
+    def test_legacy_copies_load_without_running(self):
+        """旧副本只取出函数，脚本本身不执行"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            solver = load_legacy_solver(os.path.join(HERE, "reproduce_error.py"))
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(len(solver([10, 15], [3, 3], 40)[0]), 2)
+
+    def test_compare_flags_regressions(self):
+        """变慢或精度下降时报告回归"""
+        results = run_benchmark(self.prices, {"dp": solve_dp}, self.targets, self.profiles, repeat=1)
+        self.assertEqual(compare(results, results), [])
+        slower = copy.deepcopy(results)
+        slower["solvers"]["dp"]["latency_ms"]["p50"] *= service_benchmark.REGRESSION_FACTOR * 2
+        self.assertEqual(len(compare(slower, results)), 1)
+        worse = copy.deepcopy(results)
+        worse["solvers"]["dp"]["exact_rate"] = 0.5
+        self.assertEqual(len(compare(worse, results)), 1)
+
+    def test_startup_is_headless(self):
+        """命令行冷启动不加载 GUI、NumPy 和多进程模块"""
+        startup = measure_startup(repeat=1)
+        self.assertEqual(startup["heavy_modules"], [])
+        self.assertGreater(startup["process_ms"], startup["import_ms"])
+        slow = dict(startup, import_ms=service_benchmark.STARTUP_BUDGET_MS + 1, heavy_modules=["numpy"])
+        self.assertEqual(len(check_startup(slow)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
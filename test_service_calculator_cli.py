@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+单元测试：命令行版本的批量模式
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+from service_calculator_cli import EXIT_BAD_RECORDS, EXIT_OK, EXIT_USAGE, parse_record, run_batch
+from service_logic import ServiceCalculatorLogic, solve_dp
+
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service_calculator_cli.py")
+
+
+class TestBatchMode(unittest.TestCase):
+
+    def setUp(self):
+        self.calc = ServiceCalculatorLogic()
+        self.calc.services = [{"name": "A", "price": 10}, {"name": "B", "price": 15}, {"name": "C", "price": 0.68}]
+
+    def run_lines(self, text, default_cap=5):
+        out, err = io.StringIO(), io.StringIO()
+        code = run_batch(io.StringIO(text), out, err, self.calc, default_cap)
+        return code, [json.loads(line) for line in out.getvalue().splitlines()], err.getvalue()
+
+    def test_parse_record(self):
+        """CSV 和 JSONL 输入"""
+        services = self.calc.services
+        self.assertEqual(parse_record("12.5", services, 4), (12.5, [4, 4, 4]))
+        self.assertEqual(parse_record("12.5,1,,3", services, 4), (12.5, [1, 0, 3]))
+        self.assertEqual(parse_record('{"target": 7, "quantities": [2]}', services, 4), (7.0, [2, 4, 4]))
+        self.assertEqual(parse_record('{"target": 7, "quantities": {"C": 9}}', services, 4), (7.0, [4, 4, 9]))
+        for line in ("abc", "0", "5,1,2,3,4", '{"target": 7, "quantities": {"X": 1}}', '{"quantities": []}'):
+            with self.assertRaises((ValueError, KeyError)):
+                parse_record(line, services, 4)
+
+    def test_results_in_order(self):
+        """每行一个结果，与 solve_dp 一致"""
+        code, results, err = self.run_lines("target\n40\n# Kommentar\n\n41,1,1,1\n{\"target\": 3.4}\n")
+        self.assertEqual(code, EXIT_OK)
+        self.assertEqual(err, "")
+        self.assertEqual([r["target"] for r in results], [40, 41, 3.4])
+        for result, caps in zip(results, ([5, 5, 5], [1, 1, 1], [5, 5, 5])):
+            combo, total, difference = solve_dp([10, 15, 0.68], caps, result["target"])
+            self.assertEqual(result["total"], total)
+            self.assertEqual(result["difference"], round(difference, 2))
+            names = ["A", "B", "C"]
+            self.assertEqual(result["combination"], {names[i]: q for i, q in enumerate(combo) if q > 0})
+
+    def test_bad_records(self):
+        """坏行写到 stderr，其余照常输出，退出码为 1"""
+        code, results, err = self.run_lines("40\nkaputt\n-1\n25\n")
+        self.assertEqual(code, EXIT_BAD_RECORDS)
+        self.assertEqual([r["target"] for r in results], [40, 25])
+        self.assertIn("Zeile 2", err)
+        self.assertIn("Zeile 3", err)
+
+    def test_unreasonable_targets(self):
+        """nan、inf 和过大的目标作为坏行处理，同组的其他目标照常输出"""
+        code, results, err = self.run_lines("40\nnan\ninf\n1e9\n{\"target\": Infinity}\n25\n")
+        self.assertEqual(code, EXIT_BAD_RECORDS)
+        self.assertEqual([r["target"] for r in results], [40, 25])
+        for line_no in range(2, 6):
+            self.assertIn(f"Zeile {line_no}", err)
+
+    def test_bad_quantities(self):
+        """数量为 Infinity、1e400 或过大时只报告该行，之前的结果照常输出"""
+        code, results, err = self.run_lines(
+            "40\n{\"target\": 25, \"quantities\": [Infinity]}\n{\"target\": 25, \"quantities\": {\"A\": 1e400}}\n"
+            "{\"target\": 25, \"quantities\": [1e12]}\n25\n")
+        self.assertEqual(code, EXIT_BAD_RECORDS)
+        self.assertEqual([r["target"] for r in results], [40, 25])
+        self.assertEqual([line.split(":")[0] for line in err.splitlines()], ["Zeile 2", "Zeile 3", "Zeile 4"])
+
+    def test_failed_group(self):
+        """一组求解失败时报告该组的行，其他组照常输出"""
+        def failing(prices, caps, targets):
+            if caps == [1, 1, 1]:
+                raise MemoryError()
+            return [solve_dp(prices, caps, target) for target in targets]
+
+        with mock.patch("service_calculator_cli.find_best_combinations", failing):
+            code, results, err = self.run_lines("40\n41,1,1,1\n25\n")
+        self.assertEqual(code, EXIT_BAD_RECORDS)
+        self.assertEqual([r["target"] for r in results], [40, 25])
+        self.assertEqual(err, "Zeile 2: MemoryError\n")
+
+    def test_many_targets(self):
+        """超过一组的输入"""
+        code, results, _ = self.run_lines("".join(f"{t}\n" for t in range(1, 600)))
+        self.assertEqual(code, EXIT_OK)
+        self.assertEqual(len(results), 599)
+
+    def test_reduce_mode(self):
+        """减少模式：数量是现有数量，每个服务至少保留 1 个"""
+        out, err = io.StringIO(), io.StringIO()
+        code = run_batch(io.StringIO("25,3,1,10\n"), out, err, self.calc, 0, reduce=True)
+        self.assertEqual(code, EXIT_OK)
+        result = json.loads(out.getvalue())
+        self.assertEqual(result["reduction"], {"A": 2, "C": 7})
+        self.assertEqual(result["reduced"], 24.76)
+        self.assertEqual(result["original_total"], 51.8)
+        self.assertEqual(result["final_total"], 27.04)
+
+    def test_exit_codes(self):
+        """命令行退出码"""
+        done = subprocess.run([sys.executable, CLI, "--batch", "/nicht/vorhanden.csv"], capture_output=True)
+        self.assertEqual(done.returncode, EXIT_USAGE)
+        done = subprocess.run([sys.executable, CLI, "--batch"], input=b"12.5\n", capture_output=True)
+        self.assertEqual(done.returncode, EXIT_OK)
+        self.assertEqual(json.loads(done.stdout)["target"], 12.5)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+单元测试：SQLite 多项目目录库
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from service_database import DB_FILE, CatalogStore, migrate, open_store
+from service_logic import ServiceCalculatorLogic
+from service_storage import CatalogJournal
+
+
+class TestCatalogStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.tmp_dir, ".service_config.json")
+        self.db_path = os.path.join(self.tmp_dir, DB_FILE)
+        self.services = [{"name": "A", "price": 10.0}, {"name": "B", "price": 6.8}, {"name": "C", "price": 0.68}]
+        with open(self.config_file, "w") as f:
+            json.dump({"project_name": "Alpha", "services": self.services}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_migrate_once(self):
+        """一次性从 JSON 迁移；第二次拒绝，JSON 保持不变"""
+        other = os.path.join(self.tmp_dir, "beta.json")
+        with open(other, "w") as f:
+            json.dump({"project_name": "Beta", "services": [{"name": "X", "price": 1}]}, f)
+        self.assertEqual(migrate([self.config_file, other], self.db_path), ["Alpha", "Beta"])
+        with self.assertRaises(FileExistsError):
+            migrate([self.config_file], self.db_path)
+        store = open_store(self.config_file)
+        self.assertEqual((store.projects(), store.active_project()), (["Alpha", "Beta"], "Alpha"))
+        self.assertEqual(store.load("Alpha"), self.services)
+        self.assertEqual(store.count("Beta"), 1)
+        store.close()
+        with open(self.config_file) as f:
+            self.assertEqual(json.load(f)["services"], self.services)
+
+    def test_migrate_replays_journal(self):
+        """迁移时带上日志里还没压缩的修改"""
+        journal = CatalogJournal(self.config_file)
+        journal.append("set", index=0, price=12.5)
+        journal.append("add", name="D", price=2.0)
+        migrate([self.config_file], self.db_path)
+        store = open_store(self.config_file)
+        self.assertEqual([(s["name"], s["price"]) for s in store.load("Alpha")],
+                         [("A", 12.5), ("B", 6.8), ("C", 0.68), ("D", 2.0)])
+        store.close()
+
+    def test_failed_migration_leaves_nothing(self):
+        """迁移失败时不留下半成品数据库"""
+        with open(self.config_file, "w") as f:
+            json.dump({"0": 12.5}, f)
+        with self.assertRaises(ValueError):
+            migrate([self.config_file], self.db_path)
+        self.assertFalse(os.path.exists(self.db_path))
+
+    def test_row_level_writes(self):
+        """只写有变化的行"""
+        store = CatalogStore(self.db_path)
+        store.save("Alpha", self.services)
+        self.assertEqual(store.rows_written, 3)
+        changed = [dict(s) for s in self.services]
+        changed[1]["price"] = 7.5
+        store.save("Alpha", changed)
+        self.assertEqual(store.rows_written, 4)
+        store.save("Alpha", changed + [{"name": "D", "price": 2}])
+        store.save("Alpha", changed[:2])
+        self.assertEqual(store.rows_written, 7)
+        self.assertEqual(store.load("Alpha"), changed[:2])
+        with self.assertRaises(KeyError):
+            store.load("Gamma")
+        store.close()
+
+    def test_logic_uses_store(self):
+        """有数据库时从当前项目读取，保存写回数据库"""
+        migrate([self.config_file], self.db_path)
+        store = CatalogStore(self.db_path)
+        store.save("Beta", [{"name": "X", "price": 1.5}])
+        store.close()
+        calc = ServiceCalculatorLogic()
+        calc.config_file = self.config_file
+        self.assertEqual((calc.project_name, calc.services), ("Alpha", self.services))
+        calc.services[0]["price"] = 11.0
+        calc.save_config()
+        beta = ServiceCalculatorLogic(project="Beta")
+        beta.config_file = self.config_file
+        self.assertEqual(beta.services, [{"name": "X", "price": 1.5}])
+        unknown = ServiceCalculatorLogic(project="Gamma")
+        unknown.config_file = self.config_file
+        with self.assertRaises(ValueError):
+            unknown.services
+        store = CatalogStore(self.db_path)
+        self.assertEqual(store.load("Alpha")[0]["price"], 11.0)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
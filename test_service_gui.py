@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+单元测试：PyQt5 界面的服务表格模型（没有 PyQt5 时跳过）
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from PyQt5.QtWidgets import QApplication
+    from service_gui import ACTION, NAME, PRICE, QUANTITY, ServiceCalculatorGUI, ServiceTableModel
+except ImportError:  # PyQt5 ist optional
+    ServiceTableModel = None
+
+
+@unittest.skipIf(ServiceTableModel is None, "PyQt5 nicht installiert")
+class TestServiceTableModel(unittest.TestCase):
+
+    def setUp(self):
+        self.services = [{"name": "A", "price": 10.0}, {"name": "B", "price": 6.8}]
+        self.model = ServiceTableModel(self.services)
+        self.prices = []
+        self.changed = []
+        self.model.priceChanged.connect(lambda row, price: self.prices.append((row, price)))
+        self.model.dataChanged.connect(lambda first, last: self.changed.append((first.row(), last.row())))
+
+    def test_rows(self):
+        """每个服务一行，最后一行用于新增"""
+        self.assertEqual(self.model.rowCount(), 3)
+        self.assertEqual(self.model.index(1, PRICE).data(), "6.8")
+        self.assertEqual(self.model.index(2, ACTION).data(), "✓")
+        self.assertEqual(self.model.headerData(0, 1), "Service-Name")
+        self.model.set_language("cn")
+        self.assertEqual(self.model.headerData(0, 1), "服务名称")
+
+    def test_price_edit_touches_one_index(self):
+        """改价只影响一个单元格；无效价格不接受"""
+        self.assertFalse(self.model.setData(self.model.index(0, PRICE), "abc"))
+        self.assertFalse(self.model.setData(self.model.index(0, PRICE), "-1"))
+        self.assertTrue(self.model.setData(self.model.index(0, PRICE), "12.5"))
+        self.assertEqual(self.services[0]["price"], 12.5)
+        self.assertEqual(self.prices, [(0, 12.5)])
+        self.assertEqual(self.changed, [(0, 0)])
+
+    def test_unchanged_edit_is_silent(self):
+        """提交未改动的名称或价格时不写回、不发信号"""
+        names = []
+        self.model.nameChanged.connect(lambda row, name: names.append((row, name)))
+        for _ in range(10):
+            self.assertTrue(self.model.setData(self.model.index(0, NAME), "A"))
+            self.assertTrue(self.model.setData(self.model.index(1, PRICE), "6.80"))
+        self.assertEqual((names, self.prices, self.changed), ([], [], []))
+        self.model.setData(self.model.index(0, NAME), "A2")
+        self.assertEqual(names, [(0, "A2")])
+
+    def test_quantities(self):
+        """数量只保存在模型里，清空后全为 0"""
+        self.assertTrue(self.model.setData(self.model.index(1, QUANTITY), "4"))
+        self.assertFalse(self.model.setData(self.model.index(1, QUANTITY), "x"))
+        self.assertEqual(self.model.quantities, [0, 4])
+        self.assertEqual(self.model.index(0, QUANTITY).data(), "0")
+        self.model.clear_quantities()
+        self.assertEqual(self.model.quantities, [0, 0])
+
+    def test_add_and_remove(self):
+        """新增和删除只插入/移除一行，共享同一个服务列表"""
+        inserted = []
+        self.model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+        self.model.setData(self.model.index(2, NAME), "C")
+        self.model.setData(self.model.index(2, PRICE), "-3")
+        self.assertEqual(self.model.new_price, "0.00")
+        self.model.add_service("C", 1.5)
+        self.assertEqual(inserted, [(2, 2)])
+        self.assertEqual(self.services[-1], {"name": "C", "price": 1.5})
+        self.assertEqual((self.model.new_name, self.model.rowCount()), ("", 4))
+        self.model.remove_service(0)
+        self.assertEqual([s["name"] for s in self.services], ["B", "C"])
+        self.assertEqual(len(self.model.quantities), 2)
+
+
+class FakeJob:
+    cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@unittest.skipIf(ServiceTableModel is None, "PyQt5 nicht installiert")
+class TestCatalogEditsCancel(unittest.TestCase):
+
+    def setUp(self):
+        self.app = QApplication.instance() or QApplication([])
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+        self.gui = ServiceCalculatorGUI()
+
+    def tearDown(self):
+        self.gui.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir)
+
+    def start_fake_job(self):
+        job = FakeJob()
+        self.gui.running_job = job
+        return job
+
+    def test_edits_cancel_running_job(self):
+        """改名、改价、新增都会作废正在进行的计算"""
+        model = self.gui.table_model
+        for edit in (lambda: model.setData(model.index(0, NAME), "Neu"),
+                     lambda: model.setData(model.index(0, PRICE), "99"),
+                     lambda: (model.setData(model.index(len(self.gui.services), NAME), "X"),
+                              self.gui.save_new_service())):
+            job = self.start_fake_job()
+            generation = self.gui.calc_generation
+            edit()
+            self.assertTrue(job.cancelled)
+            self.assertIsNone(self.gui.running_job)
+            self.assertGreater(self.gui.calc_generation, generation)
+
+    def test_result_uses_snapshot_names(self):
+        """结果按计算开始时的服务名称显示"""
+        self.gui.display_reduction(["Alt"], [2.0], [3], 2.0, [1])
+        self.assertIn("Alt: 3 → 2", self.gui.result_label.text())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+单元测试：持久化的可达金额索引
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from service_index import ReachableSumsIndex
+from service_logic import solve_dp
+
+
+class TestReachableSumsIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "index.bin")
+        self.prices = [27.85, 14.91, 6.80, 0.0, 17.00, 3.92, 9.81, 35.31, 0.68]
+        self.caps = [3, 4, 5, 10, 2, 6, 3, 2, 20]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_matches_solver(self):
+        """索引查询与 solve_dp 结果完全一致"""
+        index = ReachableSumsIndex.open(self.path, self.prices, self.caps, 300)
+        rng = random.Random(1)
+        try:
+            for target in [rng.randint(1, 30000) / 100 for _ in range(300)] + [0.01, 300]:
+                self.assertEqual(index.find_best_combination(target), solve_dp(self.prices, self.caps, target))
+        finally:
+            index.close()
+
+    def test_reuse_and_rebuild(self):
+        """目录相同则复用，价格或上限变化时自动重建"""
+        ReachableSumsIndex.open(self.path, self.prices, self.caps, 200).close()
+        mtime = os.stat(self.path).st_mtime_ns
+        index = ReachableSumsIndex.open(self.path, self.prices, self.caps, 150)
+        index.close()
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+        prices = list(self.prices)
+        prices[0] = 27.86
+        index = ReachableSumsIndex.open(self.path, prices, self.caps, 200)
+        try:
+            self.assertEqual(index.find_best_combination(123.45), solve_dp(prices, self.caps, 123.45))
+        finally:
+            index.close()
+
+        # 目标超出已有范围时也重建
+        index = ReachableSumsIndex.open(self.path, prices, self.caps, 400)
+        try:
+            self.assertEqual(index.max_target, 40000)
+        finally:
+            index.close()
+
+    def test_target_out_of_range(self):
+        """超出索引范围的目标报错"""
+        index = ReachableSumsIndex.open(self.path, self.prices, self.caps, 100)
+        try:
+            with self.assertRaises(ValueError):
+                index.find_best_combination(100.01)
+        finally:
+            index.close()
+
+    def test_corrupt_file_is_rebuilt(self):
+        """损坏的索引文件会被重建"""
+        with open(self.path, "wb") as f:
+            f.write(b"kaputt")
+        index = ReachableSumsIndex.open(self.path, self.prices, self.caps, 100)
+        try:
+            self.assertEqual(index.find_best_combination(50), solve_dp(self.prices, self.caps, 50))
+        finally:
+            index.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
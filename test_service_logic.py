@@ -0,0 +1,666 @@
+#!/usr/bin/env python3
+"""
+单元测试：service_logic 中的精确求解器（无GUI）
+"""
+
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+from unittest import mock
+
+import service_logic
+from service_logic import (CalculationCancelled, IncrementalSolver, PriceClasses, ServiceCalculatorLogic, ReachableSums,
+                           find_best_combinations, find_pareto_combinations, find_top_k_combinations,
+                           iter_exact_combinations, make_reachable_sums, reducible_quantities, solve_anytime,
+                           solve_dp, solve_meet_in_middle, solve_reduction, split_quantity, to_cents)
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".service_config.json")
+
+
+def load_catalog_prices():
+    """读取真实的服务价格表"""
+    with open(CONFIG_FILE, 'r') as f:
+        return [service["price"] for service in json.load(f)["services"]]
+
+
+def brute_force(prices, quantities, target):
+    """穷举所有组合，返回最优 (总金额分, 差异分)"""
+    weights = [to_cents(p) if p > 0 else 0 for p in prices]
+    caps = [q if w > 0 else 0 for w, q in zip(weights, quantities)]
+    target_cents = to_cents(target)
+    best = None
+    for combo in itertools.product(*[range(c + 1) for c in caps]):
+        total = sum(w * q for w, q in zip(weights, combo))
+        key = (abs(total - target_cents), -total)
+        if best is None or key < best:
+            best = key
+    return -best[1], best[0]
+
+
+class TestExactSolver(unittest.TestCase):
+
+    def assert_valid(self, prices, quantities, target, result):
+        combo, total, difference = result
+        self.assertEqual(len(combo), len(prices))
+        for qty, cap, price in zip(combo, quantities, prices):
+            self.assertGreaterEqual(qty, 0)
+            self.assertLessEqual(qty, cap if price > 0 else 0)
+        self.assertEqual(sum(to_cents(p) * q for p, q in zip(prices, combo) if p > 0), to_cents(total))
+
+    def test_split_quantity(self):
+        """测试二进制分包"""
+        self.assertEqual(split_quantity(0), [])
+        self.assertEqual(split_quantity(1), [1])
+        self.assertEqual(split_quantity(10), [1, 2, 4, 3])
+        for qty in range(50):
+            self.assertEqual(sum(split_quantity(qty)), qty)
+
+    def test_matches_brute_force(self):
+        """随机小规模问题与穷举结果一致"""
+        rng = random.Random(7)
+        for _ in range(200):
+            n = rng.randint(1, 4)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 12.23, 35.31]) for _ in range(n)]
+            quantities = [rng.randint(0, 4) for _ in range(n)]
+            target = rng.randint(1, 8000) / 100
+            result = solve_dp(prices, quantities, target)
+            self.assert_valid(prices, quantities, target, result)
+            best_total, best_diff = brute_force(prices, quantities, target)
+            self.assertEqual(to_cents(result[1]), best_total)
+            self.assertEqual(to_cents(result[2]), best_diff)
+
+    def test_prefers_higher_total_on_tie(self):
+        """差异相同时取较大的金额"""
+        combo, total, difference = solve_dp([10], [5], 25)
+        self.assertEqual(total, 30)
+        self.assertEqual(difference, 5)
+
+    def test_edge_cases(self):
+        """测试边界情况"""
+        self.assertEqual(solve_dp([], [], 100), ([], 0, 100))
+        self.assertEqual(solve_dp([10, 20], [0, 0], 100), ([0, 0], 0, 100))
+        self.assertEqual(solve_dp([0, -5], [10, 10], 100), ([0, 0], 0, 100))
+        self.assertEqual(solve_dp([10], [10], 0), ([0], 0, 0))
+
+    def test_reachable_sums(self):
+        """测试可达金额表"""
+        table = ReachableSums([300, 500], [2, 1], 1200)
+        self.assertEqual(sorted(s for s in range(1201) if table.contains(s)), [0, 300, 500, 600, 800, 1100])
+        self.assertEqual(table.nearest(950), 1100)
+        self.assertEqual(table.nearest(700), 800)
+        self.assertEqual(table.combination(1100), [2, 1])
+        with self.assertRaises(ValueError):
+            table.combination(700)
+
+    def test_price_classes(self):
+        """相同价格合并为一类，数量按索引顺序分回"""
+        classes = PriceClasses([680, 981, 680, 0, 680], [2, 3, 4, 5, 0])
+        self.assertEqual(classes.weights, [680, 981])
+        self.assertEqual(classes.caps, [6, 3])
+        self.assertEqual(classes.split([5, 1]), [2, 1, 3, 0, 0])
+        self.assertEqual(classes.split([0, 3]), [0, 3, 0, 0, 0])
+        # 目录中的重复价格（6.80、9.81 …）由一个类承担，结果不超各自上限
+        combo, total, difference = solve_dp([6.8, 6.8, 6.8], [1, 2, 3], 27.2)
+        self.assertEqual((combo, total, difference), ([1, 2, 1], 27.2, 0))
+
+    def test_to_cents(self):
+        """金额按十进制一次性换算成分（四舍五入）"""
+        self.assertEqual(to_cents(1.005), 101)
+        self.assertEqual(to_cents("12,34"), 1234)
+        self.assertEqual(to_cents(0.1 + 0.2), 30)
+        self.assertEqual(to_cents(-2.5), -250)
+
+    def test_gcd_scaling(self):
+        """价格按最大公约数缩放：表格变小，结果与穷举一致"""
+        problem = service_logic.prepare_problem([2.5, 7.5, 10], [4, 4, 4], 33.3)
+        classes, target_cents, limit = problem
+        self.assertEqual((classes.scale, classes.weights), (250, [1, 3, 4]))
+        self.assertEqual(limit, 14 + 4 - 1)
+        for target in (33.3, 33.75, 33.76, 0.01, 123.74, 200):
+            result = solve_dp([2.5, 7.5, 10], [4, 4, 4], target)
+            self.assert_valid([2.5, 7.5, 10], [4, 4, 4], target, result)
+            self.assertEqual((to_cents(result[1]), to_cents(result[2])),
+                             brute_force([2.5, 7.5, 10], [4, 4, 4], target))
+            for solver in (solve_meet_in_middle, solve_anytime):
+                self.assertEqual(solver([2.5, 7.5, 10], [4, 4, 4], target)[1:3], result[1:])
+
+    def test_real_catalog(self):
+        """真实价格表：1500.98 精确命中且足够快"""
+        prices = load_catalog_prices()
+        quantities = [1000] * len(prices)
+        start = time.perf_counter()
+        result = solve_dp(prices, quantities, 1500.98)
+        elapsed = time.perf_counter() - start
+        self.assert_valid(prices, quantities, 1500.98, result)
+        self.assertEqual(result[2], 0)
+        self.assertLess(elapsed, 0.1)
+
+    def test_logic_uses_exact_solver(self):
+        """ServiceCalculatorLogic.find_best_combination 使用精确求解"""
+        calc = ServiceCalculatorLogic()
+        prices = [27.85, 14.91, 6.80, 17.00, 12.20, 23.50, 3.92, 9.81, 35.31, 0.68]
+        quantities = [5, 3, 10, 4, 6, 2, 15, 8, 3, 50]
+        combo, total, difference = calc.find_best_combination(prices, quantities, 150.00)
+        self.assertEqual(difference, 0)
+        self.assert_valid(prices, quantities, 150.00, (combo, total, difference))
+
+
+class TestMeetInTheMiddle(unittest.TestCase):
+
+    def test_matches_dp(self):
+        """折半搜索与动态规划得到相同的金额"""
+        rng = random.Random(3)
+        for _ in range(200):
+            n = rng.randint(1, 7)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 12.23, 35.31, 104.61]) for _ in range(n)]
+            quantities = [rng.randint(0, 6) for _ in range(n)]
+            target = rng.randint(1, 30000) / 100
+            combo, total, difference = solve_meet_in_middle(prices, quantities, target)
+            self.assertEqual((total, difference), solve_dp(prices, quantities, target)[1:])
+            for qty, cap, price in zip(combo, quantities, prices):
+                self.assertLessEqual(qty, cap if price > 0 else 0)
+            self.assertEqual(sum(to_cents(p) * q for p, q in zip(prices, combo) if p > 0), to_cents(total))
+
+    def test_sparse_halves_match_dp(self):
+        """每一半组合很少、目标很高时直接枚举，结果仍与动态规划相同"""
+        rng = random.Random(5)
+        for _ in range(30):
+            n = rng.randint(1, 4)
+            prices = [rng.randint(10000, 500000) / 100 for _ in range(n)]
+            quantities = [rng.randint(0, 6) for _ in range(n)]
+            target = sum(p * rng.randint(0, q) for p, q in zip(prices, quantities)) + rng.randint(-5000, 5000) / 100
+            combo, total, difference = solve_meet_in_middle(prices, quantities, max(target, 0.01))
+            self.assertEqual((total, difference), solve_dp(prices, quantities, max(target, 0.01))[1:])
+            self.assertEqual(sum(to_cents(p) * q for p, q in zip(prices, combo)), to_cents(total))
+
+    def test_peak_memory(self):
+        """内存：组合少时远小于 DP 表格，稠密时不超过 DP"""
+        def peak(solver, *args):
+            tracemalloc.start()
+            try:
+                result = solver(*args)
+                return result, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        sparse = ([1234.57, 987.65, 555.55, 321.09], [50] * 4, 90000.0)
+        (_, total, _), mitm_peak = peak(solve_meet_in_middle, *sparse)
+        (_, dp_total, _), dp_peak = peak(solve_dp, *sparse)
+        self.assertEqual(total, dp_total)
+        self.assertLess(mitm_peak, dp_peak / 10)
+        prices = load_catalog_prices()
+        dense = (prices, [200] * len(prices), 1500.98)
+        _, mitm_peak = peak(solve_meet_in_middle, *dense)
+        _, dp_peak = peak(solve_dp, *dense)
+        self.assertLess(mitm_peak, 2 * dp_peak)
+
+    def test_large_caps(self):
+        """数量上限很大、目标很高"""
+        prices = [104.61, 88.26, 50.21, 49.69, 41.39]
+        quantities = [60, 60, 60, 60, 60]
+        combo, total, difference = solve_meet_in_middle(prices, quantities, 45678.91)
+        self.assertEqual((total, difference), solve_dp(prices, quantities, 45678.91)[1:])
+        self.assertAlmostEqual(sum(p * q for p, q in zip(prices, combo)), total, places=6)
+
+    def test_edge_cases(self):
+        """测试边界情况"""
+        self.assertEqual(solve_meet_in_middle([], [], 100), ([], 0, 100))
+        self.assertEqual(solve_meet_in_middle([10, 20], [0, 0], 100), ([0, 0], 0, 100))
+
+    def test_method_selection(self):
+        """find_best_combination 通过 method 选择求解器"""
+        calc = ServiceCalculatorLogic()
+        self.assertEqual(calc.find_best_combination([10, 15], [3, 3], 40, method="mitm")[1:], (40, 0))
+        with self.assertRaises(ValueError):
+            calc.find_best_combination([10], [1], 10, method="unbekannt")
+
+
+class TestAnytimeSolver(unittest.TestCase):
+
+    def test_complete_search_is_optimal(self):
+        """时间足够时结果与动态规划相同，下界等于差异"""
+        rng = random.Random(5)
+        for _ in range(200):
+            n = rng.randint(1, 6)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 12.23, 35.31, 104.61]) for _ in range(n)]
+            quantities = [rng.randint(0, 6) for _ in range(n)]
+            target = rng.randint(1, 30000) / 100
+            combo, total, difference, lower_bound = solve_anytime(prices, quantities, target, time_budget=10)
+            self.assertEqual((total, difference), solve_dp(prices, quantities, target)[1:])
+            self.assertEqual(lower_bound, difference)
+            self.assertEqual(sum(to_cents(p) * q for p, q in zip(prices, combo) if p > 0), to_cents(total))
+
+    def test_deadline(self):
+        """预算用完时返回可行解和有效下界"""
+        prices = load_catalog_prices()
+        quantities = [1000] * len(prices)
+        start = time.perf_counter()
+        combo, total, difference, lower_bound = solve_anytime(prices, quantities, 1500.98, time_budget=0.05)
+        self.assertLess(time.perf_counter() - start, 0.1)
+        for qty, cap in zip(combo, quantities):
+            self.assertLessEqual(qty, cap)
+        self.assertAlmostEqual(sum(p * q for p, q in zip(prices, combo) if p > 0), total, places=6)
+        optimum = solve_dp(prices, quantities, 1500.98)[2]
+        self.assertLessEqual(lower_bound, optimum)
+        self.assertGreaterEqual(difference, optimum)
+
+    def test_lower_bound_on_logic(self):
+        """find_best_combination 记录差异下界"""
+        calc = ServiceCalculatorLogic()
+        combo, total, difference = calc.find_best_combination([10, 15], [3, 3], 41, method="anytime", time_budget=1)
+        self.assertEqual((total, difference), (40, 1))
+        self.assertEqual(calc.last_lower_bound, 1)
+        calc.find_best_combination([10, 15], [3, 3], 40)
+        self.assertEqual(calc.last_lower_bound, 0)
+
+
+class TestReduction(unittest.TestCase):
+
+    def test_reducible_quantities(self):
+        """每个服务至少保留 1 个，无价格的服务不减"""
+        self.assertEqual(reducible_quantities([10, 10, 10, 0], [0, 1, 5, 5]), [0, 0, 4, 0])
+
+    def test_matches_brute_force(self):
+        """减少的金额最接近目标"""
+        rng = random.Random(8)
+        for _ in range(150):
+            n = rng.randint(1, 4)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 35.31]) for _ in range(n)]
+            quantities = [rng.randint(0, 5) for _ in range(n)]
+            target = rng.randint(1, 5000) / 100
+            reduction, reduced, difference = solve_reduction(prices, quantities, target)
+            for qty, cut in zip(quantities, reduction):
+                self.assertTrue(cut == 0 or qty - cut >= 1)
+            best_total, best_diff = brute_force(prices, reducible_quantities(prices, quantities), target)
+            self.assertEqual((to_cents(reduced), to_cents(difference)), (best_total, best_diff))
+
+    def test_better_than_greedy(self):
+        """贪心会错过的情况"""
+        calc = ServiceCalculatorLogic()
+        reduction, reduced, difference = calc.find_best_reduction([6, 4], [2, 4], 8)
+        self.assertEqual((reduction, reduced, difference), ([0, 2], 8, 0))
+
+
+class TestBatchSolve(unittest.TestCase):
+
+    def test_matches_single_solves(self):
+        """批量结果与逐个求解相同，顺序不变"""
+        prices = load_catalog_prices()
+        quantities = [5, 0, 12, 3] * 9
+        rng = random.Random(9)
+        targets = [rng.randint(1, 200000) / 100 for _ in range(60)] + [0, -5, 1500.98, 0.004]
+        results = find_best_combinations(prices, quantities, targets)
+        self.assertEqual(results, [solve_dp(prices, quantities, t) for t in targets])
+
+    def test_edge_cases(self):
+        """测试边界情况"""
+        self.assertEqual(find_best_combinations([], [], [10, 20]), [([], 0, 10), ([], 0, 20)])
+        self.assertEqual(find_best_combinations([10], [0], [10]), [([0], 0, 10)])
+        self.assertEqual(find_best_combinations([10], [3], []), [])
+        self.assertEqual(find_best_combinations([10], [3], [0, -1]), [([0], 0, 0), ([0], 0, 1)])
+
+    def test_process_pool(self):
+        """多进程结果与串行完全相同，顺序确定"""
+        prices = load_catalog_prices()
+        quantities = [4] * len(prices)
+        rng = random.Random(4)
+        targets = [rng.randint(1, 100000) / 100 for _ in range(50)] + [0]
+        serial = find_best_combinations(prices, quantities, targets)
+        self.assertEqual(find_best_combinations(prices, quantities, targets, workers=2), serial)
+        self.assertEqual(find_best_combinations(prices, quantities, targets, workers=3, chunk_size=7), serial)
+
+    def test_logic_method(self):
+        """ServiceCalculatorLogic.find_best_combinations"""
+        calc = ServiceCalculatorLogic()
+        results = calc.find_best_combinations([10, 15], [3, 3], [40, 41, 100])
+        self.assertEqual([r[1:] for r in results], [(40, 0), (40, 1), (75, 25)])
+
+
+class TestIncrementalSolver(unittest.TestCase):
+
+    def check(self, solver, prices, caps, target):
+        """与 solve_dp 的总额和差异一致，组合不超上限且总额正确"""
+        combo, total, diff = solver.find_best_combination(target)
+        expected = solve_dp(prices, caps, target)
+        self.assertEqual((total, diff), expected[1:])
+        self.assertTrue(all(0 <= q <= c for q, c in zip(combo, caps)))
+        self.assertEqual(sum(int(round(p * 100)) * q for p, q in zip(prices, combo)), int(round(total * 100)))
+
+    def test_random_edits(self):
+        """随机增删改之后结果始终与从头计算相同"""
+        rng = random.Random(13)
+        prices = load_catalog_prices()[:12]
+        caps = [rng.randint(0, 6) for _ in prices]
+        solver = IncrementalSolver(prices, caps, max_target=800)
+        for _ in range(60):
+            action = rng.random()
+            if action < 0.2:
+                prices.append(rng.randint(100, 9000) / 100)
+                caps.append(rng.randint(0, 6))
+                solver.add_service(prices[-1], caps[-1])
+            elif action < 0.35 and len(prices) > 1:
+                index = rng.randrange(len(prices))
+                del prices[index], caps[index]
+                solver.remove_service(index)
+            elif action < 0.7:
+                index = rng.randrange(len(prices))
+                prices[index] = rng.randint(0, 9000) / 100
+                solver.set_price(index, prices[index])
+            else:
+                index = rng.randrange(len(prices))
+                caps[index] = rng.randint(0, 6)
+                solver.set_cap(index, caps[index])
+            self.check(solver, prices, caps, rng.randint(-100, 90000) / 100)
+
+    def test_edit_recomputes_only_changed_service(self):
+        """重复修改同一个服务时只重算这一个服务"""
+        prices = load_catalog_prices()
+        solver = IncrementalSolver(prices, [5] * len(prices), max_target=1000)
+        solver.find_best_combination(500)
+        solver.set_price(3, 12.5)
+        solver.find_best_combination(500)
+        before = solver.updated_services
+        solver.set_price(3, 13.5)
+        solver.add_service(7.25, 5)
+        prices = prices[:3] + [13.5] + prices[4:] + [7.25]
+        self.check(solver, prices, [5] * len(prices), 500)
+        self.assertEqual(solver.updated_services - before, 2)
+        self.assertEqual(solver.rebuilds, 1)
+
+    def test_grows_for_larger_targets(self):
+        """目标或最高价超出表格范围时整体重建"""
+        solver = IncrementalSolver([10, 15], [3, 3], max_target=20)
+        self.assertEqual(solver.find_best_combination(40)[1:], (40, 0))
+        solver.set_price(0, 100)
+        self.assertEqual(solver.find_best_combination(310)[1:], (315, 5))
+        self.assertEqual(solver.rebuilds, 2)
+
+    def test_cancel(self):
+        """取消后在下一个服务前停止；之后的计算仍然正确"""
+        prices = load_catalog_prices()
+        caps = [5] * len(prices)
+        solver = IncrementalSolver(prices, caps, max_target=1000)
+        calls = []
+
+        def cancel_after(count):
+            calls.clear()
+            return lambda: calls.append(1) or len(calls) > count
+
+        with self.assertRaises(CalculationCancelled):
+            solver.find_best_combination(500, cancel_after(3))
+        self.assertEqual(len(calls), 4)
+        self.check(solver, prices, caps, 500)
+        for index in (2, 20):
+            prices[index] += 1
+            solver.set_price(index, prices[index])
+        with self.assertRaises(CalculationCancelled):
+            solver.find_best_combination(500, cancel_after(1))
+        before = solver.updated_services
+        self.check(solver, prices, caps, 500)
+        # 改价的服务移到末尾，从位置 2 起失效；取消前算完的那一个不再重算
+        self.assertEqual(solver.updated_services - before, len(prices) - 3)
+        self.assertEqual(solver.rebuilds, 1)
+
+    def test_reduction_and_edge_cases(self):
+        """减少模式与边界情况"""
+        solver = IncrementalSolver([], [])
+        self.assertEqual(solver.find_best_combination(10), ([], 0, 10))
+        solver.add_service(10, 0)
+        self.assertEqual(solver.find_best_combination(10), ([0], 0, 10))
+        self.assertEqual(solver.find_best_reduction([10, 15], [3, 3], 25),
+                         solve_reduction([10, 15], [3, 3], 25))
+
+
+class TestTopK(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        """前 K 个组合的 (差异, 金额) 与穷举排序一致，组合互不相同且有效"""
+        rng = random.Random(16)
+        for _ in range(60):
+            n = rng.randint(1, 4)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 12.23]) for _ in range(n)]
+            quantities = [rng.randint(0, 3) for _ in range(n)]
+            target = rng.randint(1, 6000) / 100
+            k = rng.randint(1, 12)
+            weights = [to_cents(p) for p in prices]
+            target_cents = to_cents(target)
+            ranked = sorted((abs(t - target_cents), -t) for t in
+                            (sum(w * q for w, q in zip(weights, combo)) for combo in
+                             itertools.product(*[range(q + 1 if w > 0 else 1) for w, q in zip(weights, quantities)]))
+                            if t <= 2 * target_cents)
+            results = find_top_k_combinations(prices, quantities, target, k)
+            self.assertEqual([(to_cents(d), -to_cents(t)) for _, t, d in results], ranked[:k])
+            self.assertEqual(len({tuple(combo) for combo, _, _ in results}), len(results))
+            for combo, total, _ in results:
+                self.assertTrue(all(0 <= q <= (c if w > 0 else 0) for q, c, w in zip(combo, quantities, weights)))
+                self.assertEqual(sum(w * q for w, q in zip(weights, combo)), to_cents(total))
+
+    def test_first_matches_best(self):
+        """第一个结果与 solve_dp 的金额和差异相同"""
+        prices = load_catalog_prices()
+        quantities = [1000] * len(prices)
+        results = find_top_k_combinations(prices, quantities, 1500.98, 10)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(results[0][1:], solve_dp(prices, quantities, 1500.98)[1:])
+
+    def test_large_catalog(self):
+        """几千个服务也不会超出递归深度（top-K 与精确枚举）"""
+        prices = [(i * 37 % 9000 + 100) / 100 for i in range(3000)]
+        quantities = [3] * len(prices)
+        results = find_top_k_combinations(prices, quantities, 1234.56, 5)
+        self.assertEqual(results[0][1:], solve_dp(prices, quantities, 1234.56)[1:])
+        first = next(iter_exact_combinations(prices, quantities, 1234.56))
+        self.assertEqual(sum(to_cents(p) * q for p, q in zip(prices, first)), 123456)
+
+    def test_edge_cases(self):
+        """测试边界情况"""
+        self.assertEqual(find_top_k_combinations([10], [3], 25, 0), [])
+        self.assertEqual(find_top_k_combinations([], [], 25, 3), [([], 0, 25)])
+        self.assertEqual(find_top_k_combinations([10], [3], 0, 3), [([0], 0, 0)])
+        self.assertEqual(find_top_k_combinations([10, 0], [0, 5], 25, 3), [([0, 0], 0, 25)])
+        self.assertEqual(find_top_k_combinations([10], [5], 25, 3),
+                         [([3], 30, 5), ([2], 20, 5), ([4], 40, 15)])
+
+
+class TestExactEnumeration(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        """生成的组合与穷举完全相同，顺序为从最后一个服务开始的字典序"""
+        rng = random.Random(17)
+        for _ in range(60):
+            n = rng.randint(1, 4)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 13.6]) for _ in range(n)]
+            quantities = [rng.randint(0, 4) for _ in range(n)]
+            target = rng.randint(0, 40) * 0.68
+            weights = [to_cents(p) for p in prices]
+            expected = sorted((list(combo) for combo in itertools.product(
+                *[range(q + 1 if w > 0 else 1) for w, q in zip(weights, quantities)])
+                if sum(w * q for w, q in zip(weights, combo)) == to_cents(target)),
+                key=lambda combo: combo[::-1])
+            self.assertEqual(list(iter_exact_combinations(prices, quantities, target)), expected)
+
+    def test_resume_from_cursor(self):
+        """从游标继续与一次性生成的结果相同，可以分页"""
+        prices = load_catalog_prices()
+        quantities = [1000] * len(prices)
+        generator = iter_exact_combinations(prices, quantities, 1500.98)
+        first_page = list(itertools.islice(generator, 50))
+        second_page = list(itertools.islice(generator, 50))
+        resumed = list(itertools.islice(iter_exact_combinations(prices, quantities, 1500.98,
+                                                                after=first_page[-1]), 50))
+        self.assertEqual(resumed, second_page)
+        for combo in first_page + second_page:
+            self.assertEqual(sum(to_cents(p) * q for p, q in zip(prices, combo) if p > 0), 150098)
+
+    def test_edge_cases(self):
+        """测试边界情况"""
+        self.assertEqual(list(iter_exact_combinations([10, 15], [3, 3], 30)), [[3, 0], [0, 2]])
+        self.assertEqual(list(iter_exact_combinations([10, 15], [3, 3], 31)), [])
+        self.assertEqual(list(iter_exact_combinations([10, 15], [3, 3], 30, after=[0, 2])), [])
+        self.assertEqual(list(iter_exact_combinations([10], [3], 0)), [[0]])
+        self.assertEqual(list(iter_exact_combinations([10], [3], -10)), [])
+
+
+class TestParetoFrontier(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        """前沿上的 (服务数, 差异) 与穷举一致，组合有效"""
+        rng = random.Random(18)
+        for _ in range(80):
+            n = rng.randint(1, 4)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 27.85]) for _ in range(n)]
+            quantities = [rng.choice([0, 1, 2, 5, 20]) for _ in range(n)]
+            target = rng.randint(1, 9000) / 100
+            weights = [to_cents(p) for p in prices]
+            target_cents = to_cents(target)
+            best_by_count = {}
+            for combo in itertools.product(*[range(q + 1 if w > 0 else 1) for w, q in zip(weights, quantities)]):
+                diff = abs(sum(w * q for w, q in zip(weights, combo)) - target_cents)
+                count = sum(combo)
+                best_by_count[count] = min(diff, best_by_count.get(count, diff))
+            expected = []
+            for count in sorted(best_by_count):
+                if not expected or best_by_count[count] < expected[-1][1]:
+                    expected.append((count, best_by_count[count]))
+
+            frontier = find_pareto_combinations(prices, quantities, target)
+            self.assertEqual([(sum(combo), to_cents(diff)) for combo, _, diff in frontier], expected)
+            for combo, total, diff in frontier:
+                self.assertTrue(all(0 <= q <= (c if w > 0 else 0) for q, c, w in zip(combo, quantities, weights)))
+                self.assertEqual(sum(w * q for w, q in zip(weights, combo)), to_cents(total))
+            self.assertEqual(frontier[-1][1:], solve_dp(prices, quantities, target)[1:])
+
+    def test_real_catalog(self):
+        """真实价格表：最后一个前沿点就是最优差异，服务数最少"""
+        prices = load_catalog_prices()
+        for cap in (1000, 3):
+            quantities = [cap] * len(prices)
+            frontier = find_pareto_combinations(prices, quantities, 1500.98)
+            self.assertEqual(frontier[0], ([0] * len(prices), 0, 1500.98))
+            self.assertEqual(frontier[-1][2], solve_dp(prices, quantities, 1500.98)[2])
+            counts = [sum(combo) for combo, _, _ in frontier]
+            self.assertEqual(counts, sorted(set(counts)))
+
+    def test_small_caps(self):
+        """每行数量很少（界面的实际情况）：不再按层 × 分包建表，内存有限"""
+        prices = load_catalog_prices()
+        quantities = [5] * len(prices)
+        tracemalloc.start()
+        try:
+            frontier = find_pareto_combinations(prices, quantities, 4321.17)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(frontier[-1][1:], solve_dp(prices, quantities, 4321.17)[1:])
+        self.assertTrue(all(q <= 5 for q in frontier[-1][0]))
+        self.assertLess(peak, 30 * 1024 * 1024)
+
+    def test_edge_cases(self):
+        """测试边界情况"""
+        self.assertEqual(find_pareto_combinations([], [], 10), [([], 0, 10)])
+        self.assertEqual(find_pareto_combinations([10], [0], 10), [([0], 0, 10)])
+        self.assertEqual(find_pareto_combinations([10], [3], 0), [([0], 0, 0)])
+        self.assertEqual(find_pareto_combinations([10, 15], [3, 3], 30),
+                         [([0, 0], 0, 30), ([0, 1], 15, 15), ([0, 2], 30, 0)])
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calc = ServiceCalculatorLogic(cache_size=2)
+
+    def test_hits_and_misses(self):
+        """相同输入命中缓存，返回的组合可以安全修改"""
+        combo, total, difference = self.calc.find_best_combination([10, 15], [3, 3], 40)
+        combo[0] = 99
+        self.assertEqual(self.calc.find_best_combination([10.0, 15], [3, 3], 40.001), ([1, 2], 40, 0))
+        info = self.calc.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["size"]), (1, 1, 1))
+
+    def test_normalized_key(self):
+        """无价格的服务数量不影响缓存键"""
+        self.calc.find_best_combination([10, 0], [3, 5], 20)
+        self.calc.find_best_combination([10, 0], [3, 7], 20)
+        self.assertEqual(self.calc.cache_info()["hits"], 1)
+
+    def test_eviction(self):
+        """超过容量时淘汰最久未用的结果"""
+        for target in (10, 20, 10, 30):
+            self.calc.find_best_combination([10], [5], target)
+        info = self.calc.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["evictions"], info["size"]), (1, 3, 1, 2))
+        self.calc.find_best_combination([10], [5], 20)
+        self.assertEqual(self.calc.cache_info()["misses"], 4)
+
+    def test_anytime_not_cached(self):
+        """限时求解不缓存"""
+        self.calc.find_best_combination([10], [5], 20, method="anytime", time_budget=1)
+        self.assertEqual(self.calc.cache_info()["size"], 0)
+
+    def test_save_config_invalidates(self):
+        """保存配置后清空缓存"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            self.calc.config_file = os.path.join(tmp_dir, "config.json")
+            self.calc.find_best_combination([10], [5], 20)
+            self.calc.save_config()
+            self.assertEqual(self.calc.cache_info()["size"], 0)
+            self.calc.find_best_combination([10], [5], 20)
+            self.assertEqual(self.calc.cache_info()["misses"], 2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_catalog_loaded_lazily(self):
+        """服务目录在第一次使用时才读取"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            calc = ServiceCalculatorLogic()
+            calc.config_file = os.path.join(tmp_dir, "config.json")
+            with open(calc.config_file, 'w') as f:
+                json.dump({"project_name": "P", "services": [{"name": "X", "price": 1.5}]}, f)
+            self.assertIsNone(calc._services)
+            self.assertEqual(calc.project_name, "P")
+            self.assertEqual(calc.services, [{"name": "X", "price": 1.5}])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_unknown_backend(self):
+        """未知后端报错"""
+        with self.assertRaises(ValueError):
+            make_reachable_sums([100], [1], 100, backend="gpu")
+
+    def test_numpy_falls_back_without_numpy(self):
+        """没有 NumPy 时回退到纯 Python"""
+        with mock.patch.object(service_logic, "load_numpy", return_value=None):
+            table = make_reachable_sums([300, 500], [2, 1], 1200, backend="numpy")
+        self.assertIsInstance(table, ReachableSums)
+
+    @unittest.skipIf(service_logic.load_numpy() is None, "NumPy nicht installiert")
+    def test_numpy_matches_python(self):
+        """NumPy 后端与纯 Python 结果完全一致"""
+        rng = random.Random(11)
+        catalog = load_catalog_prices()
+        cases = [(catalog, [1000] * len(catalog), 12345.67), (catalog, [3] * len(catalog), 1500.98)]
+        for _ in range(100):
+            n = rng.randint(1, 8)
+            prices = [rng.choice([0, 0.68, 3.92, 6.8, 9.81, 12.23, 35.31, 104.61]) for _ in range(n)]
+            cases.append((prices, [rng.randint(0, 20) for _ in range(n)], rng.randint(1, 100000) / 100))
+        for prices, quantities, target in cases:
+            self.assertEqual(solve_dp(prices, quantities, target, backend="numpy"),
+                             solve_dp(prices, quantities, target, backend="python"))
+        targets = [rng.randint(1, 100000) / 100 for _ in range(50)]
+        self.assertEqual(find_best_combinations(catalog, [7] * len(catalog), targets, backend="numpy"),
+                         find_best_combinations(catalog, [7] * len(catalog), targets))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+单元测试：本地求解服务（asyncio）
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from service_logic import solve_dp, solve_reduction
+from service_server import SolveService
+
+
+class TestSolveService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.tmp_dir, "config.json")
+        self.write_catalog([{"name": "A", "price": 10}, {"name": "B", "price": 15}, {"name": "C", "price": 0.68}])
+        self.service = SolveService(self.config_file, default_cap=5, warm_target=100)
+
+    def tearDown(self):
+        self.service.executor.shutdown()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_catalog(self, services):
+        with open(self.config_file, "w") as f:
+            json.dump({"project_name": "Test", "services": services}, f)
+
+    async def request(self, raw: bytes):
+        server = await asyncio.start_server(self.service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    async def test_solve_matches_dp(self):
+        """结果与 solve_dp 相同；超出预建表格的目标也正确"""
+        await self.service.warm()
+        for target in (37.04, 12.34, 250.0):
+            response = await self.service.solve({"target": target, "quantities": {"C": 20}})
+            combo, total, difference = solve_dp([10, 15, 0.68], [5, 5, 20], target)
+            self.assertEqual((response["total"], response["difference"]), (round(total, 2), round(difference, 2)))
+        response = await self.service.solve({"target": 20, "quantities": [3, 2, 1], "reduce": True})
+        self.assertEqual(response["reduced"], solve_reduction([10, 15, 0.68], [3, 2, 1], 20)[1])
+
+    async def test_identical_requests_coalesce(self):
+        """同时到达的相同请求只计算一次"""
+        record = {"target": 37.04, "quantities": [1, 2, 30]}
+        responses = await asyncio.gather(*[self.service.solve(record) for _ in range(5)])
+        self.assertEqual(self.service.computations, 1)
+        self.assertEqual(self.service.coalesced, 4)
+        self.assertTrue(all(response == responses[0] for response in responses))
+        await self.service.solve(record)
+        self.assertEqual(self.service.computations, 2)
+
+    async def test_catalog_reload(self):
+        """目录文件变化后自动重新读取（哈希随之改变）"""
+        first = (await self.service.solve({"target": 15}))["catalog"]
+        self.write_catalog([{"name": "A", "price": 7}])
+        os.utime(self.config_file, ns=(0, 0))
+        response = await self.service.solve({"target": 15})
+        self.assertNotEqual(response["catalog"], first)
+        self.assertEqual(response["combination"], {"A": 2})
+
+    async def test_http(self):
+        """HTTP 接口：正常请求、错误请求和未知路径"""
+        body = json.dumps({"target": 25}).encode()
+        status, response = await self.request(
+            b"POST /solve HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+        self.assertEqual((status, response["total"]), (200, 25))
+        status, response = await self.request(b"POST /solve HTTP/1.1\r\nContent-Length: 14\r\n\r\n{\"target\": -1}")
+        self.assertEqual(status, 400)
+        self.assertIn("error", response)
+        for body in (b'{"target": Infinity}', b'{"target": NaN}', b'{"target": "1e12"}',
+                     b'{"target": 25, "quantities": [Infinity]}'):
+            status, response = await self.request(
+                b"POST /solve HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+            self.assertEqual(status, 400)
+            self.assertTrue(response["error"])
+        status, response = await self.request(b"GET /health HTTP/1.1\r\n\r\n")
+        self.assertEqual((status, response["services"]), (200, 3))
+        status, _ = await self.request(b"GET /nothing HTTP/1.1\r\n\r\n")
+        self.assertEqual(status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
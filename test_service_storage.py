@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+单元测试：配置文件的原子写入和变更日志
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from service_logic import ServiceCalculatorLogic
+from service_storage import CatalogJournal, write_json_atomic
+
+
+class TestConfigWriting(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, ".service_config.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def read(self, path=None):
+        with open(path or self.path, 'r') as f:
+            return json.load(f)
+
+    def test_atomic_write(self):
+        """写入后没有残留的临时文件"""
+        write_json_atomic(self.path, {"services": [{"name": "L01", "price": 27.85}]}, indent=2)
+        self.assertEqual(self.read()["services"][0]["price"], 27.85)
+        self.assertEqual(os.listdir(self.tmp_dir), [".service_config.json"])
+
+    def test_failed_write_keeps_old_file(self):
+        """序列化失败时旧文件保持不变"""
+        write_json_atomic(self.path, {"a": 1})
+        with self.assertRaises(TypeError):
+            write_json_atomic(self.path, {"a": object()})
+        self.assertEqual(self.read(), {"a": 1})
+        self.assertEqual(os.listdir(self.tmp_dir), [".service_config.json"])
+
+
+class TestCatalogJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, ".service_config.json")
+        self.services = [{"name": "A", "price": 10.0}, {"name": "B", "price": 6.8}]
+        write_json_atomic(self.path, {"project_name": "Test", "services": self.services})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def edit(self, journal):
+        journal.append("set", index=0, price=12.5)
+        journal.append("add", name="C", price=0.68)
+        journal.append("set", index=2, name="C2")
+        journal.append("remove", index=1)
+
+    def test_append_and_replay(self):
+        """每次修改一行记录；重新加载时按顺序重放"""
+        journal = CatalogJournal(self.path)
+        self.edit(journal)
+        with open(journal.path) as f:
+            self.assertEqual(len(f.readlines()), 4)
+        services = [dict(s) for s in self.services]
+        reloaded = CatalogJournal(self.path)
+        self.assertEqual(reloaded.replay(services), 4)
+        self.assertEqual(services, [{"name": "A", "price": 12.5}, {"name": "C2", "price": 0.68}])
+        self.assertEqual(reloaded.seq, 4)
+
+    def test_torn_last_record(self):
+        """写到一半的最后一条记录被丢弃并截掉，之后可以继续追加"""
+        journal = CatalogJournal(self.path)
+        journal.append("set", index=1, price=7.0)
+        with open(journal.path, "ab") as f:
+            f.write(b'{"seq": 2, "op": "set", "ind')
+        services = [dict(s) for s in self.services]
+        reloaded = CatalogJournal(self.path)
+        self.assertEqual(reloaded.replay(services), 1)
+        self.assertEqual(services[1]["price"], 7.0)
+        reloaded.append("set", index=0, price=1.0)
+        services = [dict(s) for s in self.services]
+        self.assertEqual(CatalogJournal(self.path).replay(services), 2)
+        self.assertEqual([s["price"] for s in services], [1.0, 7.0])
+
+    def test_compact(self):
+        """压缩写出新快照并清空日志；快照后、清空前崩溃也不会重复应用"""
+        journal = CatalogJournal(self.path, compact_bytes=100)
+        journal.append("set", index=0, price=12.5)
+        self.assertTrue(journal.append("add", name="C", price=0.68))
+        services = [dict(s) for s in self.services]
+        journal.replay(services)
+        # 模拟崩溃：快照已写入，日志还没清空
+        write_json_atomic(self.path, {"project_name": "Test", "services": services, "journal_seq": journal.seq})
+        config = self.read_config()
+        CatalogJournal(self.path).replay(config["services"], config["journal_seq"])
+        self.assertEqual(config["services"], services)
+        journal.compact({"project_name": "Test", "services": services})
+        self.assertEqual(os.path.getsize(journal.path), 0)
+        self.assertEqual(self.read_config()["journal_seq"], 2)
+        journal.append("set", index=0, price=3.0)
+        config = self.read_config()
+        CatalogJournal(self.path).replay(config["services"], config["journal_seq"])
+        self.assertEqual(config["services"][0]["price"], 3.0)
+
+    def test_logic_edits(self):
+        """单个修改不重写配置文件，重新加载后可见；超过阈值时压缩"""
+        calc = ServiceCalculatorLogic()
+        calc.config_file = self.path
+        before = os.stat(self.path).st_mtime_ns, os.path.getsize(self.path)
+        calc.update_service(1, price=7.5)
+        calc.add_service("C", 0.68)
+        self.assertEqual((os.stat(self.path).st_mtime_ns, os.path.getsize(self.path)), before)
+        other = ServiceCalculatorLogic()
+        other.config_file = self.path
+        self.assertEqual([s["price"] for s in other.services], [10.0, 7.5, 0.68])
+        calc.journal.compact_bytes = 0
+        calc.remove_service(0)
+        self.assertEqual(self.read_config()["services"], [{"name": "B", "price": 7.5}, {"name": "C", "price": 0.68}])
+        self.assertEqual(os.path.getsize(calc.journal.path), 0)
+
+    def test_reload_is_idempotent(self):
+        """重复加载不会把日志重放两次（有无服务快照都一样）"""
+        os.remove(self.path)
+        calc = ServiceCalculatorLogic()
+        calc.config_file = self.path
+        calc.add_service("X", 1.0)
+        defaults = [s["name"] for s in calc.services]
+        for _ in range(2):
+            calc.load_config()
+            self.assertEqual([s["name"] for s in calc.services], defaults)
+        self.assertEqual(defaults.count("X"), 1)
+        write_json_atomic(self.path, {"project_name": "Test", "services": self.services})
+        calc.load_config()
+        calc.load_config()
+        self.assertEqual([s["name"] for s in calc.services], ["A", "B", "X"])
+
+    def read_config(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+单元测试：求解器的结构化跟踪
+"""
+
+import contextlib
+import io
+import logging
+import unittest
+
+from service_logic import ServiceCalculatorLogic, solve_dp
+from service_trace import TRACE, Tracer, format_event, format_steps, logging_sink
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.calc = ServiceCalculatorLogic.__new__(ServiceCalculatorLogic)
+        self.calc.services = [{"name": "A", "price": 10.0}, {"name": "B", "price": 0.5}]
+        TRACE.disable()
+        TRACE.clear()
+
+    def tearDown(self):
+        TRACE.disable()
+        TRACE.clear()
+
+    def test_disabled_records_nothing(self):
+        """关闭时既不记录事件也不输出"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.calc.find_greedy_combination([10.0, 0.5], [5, 5], 21.0)
+            solve_dp([10.0, 0.5], [5, 5], 21.0)
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(len(TRACE.events), 0)
+
+    def test_greedy_steps(self):
+        """贪心每一步记录服务、数量和剩余目标（分）"""
+        with TRACE.recording() as events:
+            self.calc.find_greedy_combination([10.0, 0.5], [5, 5], 21.0)
+        self.assertEqual([e.kind for e in events], ["greedy.take", "greedy.take", "result"])
+        self.assertEqual(events[0].fields, {"step": 1, "index": 0, "quantity": 2, "price": 10.0, "remaining": 100})
+        self.assertEqual(events[1].fields["remaining"], 0)
+        self.assertEqual(events[2].fields, {"total": 2100, "target": 2100, "difference": 0})
+        self.assertFalse(TRACE.enabled)
+
+    def test_dp_steps(self):
+        """DP 的结果按所选服务逐个记录"""
+        with TRACE.recording() as events:
+            combo = solve_dp([10.0, 0.5], [5, 5], 21.0)[0]
+        takes = [e.fields for e in events if e.kind == "dp.take"]
+        self.assertEqual([(f["index"], f["quantity"]) for f in takes], [(i, q) for i, q in enumerate(combo) if q])
+        self.assertEqual(takes[-1]["remaining"], 0)
+        self.assertEqual(events[-1].kind, "result")
+
+    def test_ring_buffer(self):
+        """环形缓冲区只保留最新的事件"""
+        tracer = Tracer(capacity=3)
+        tracer.enable()
+        for i in range(5):
+            tracer.emit("tick", i=i)
+        self.assertEqual([e.fields["i"] for e in tracer.events], [2, 3, 4])
+
+    def test_format(self):
+        """文字只在显示时生成"""
+        with TRACE.recording() as events:
+            self.calc.find_greedy_combination([10.0, 0.5], [5, 5], 21.0)
+        lines = format_steps(events, ["A", "B"])
+        self.assertEqual(lines[0], "步骤1 - 使用 2 个 A (单价10.0), 剩余目标: 1.00")
+        self.assertEqual(lines[-1], "最终结果 - 总金额: 21.00, 目标: 21.00, 差异: 0.00")
+        self.assertIn("Service 2", format_event(events[1]))
+
+    def test_logging_sink(self):
+        """事件可以作为结构化日志输出"""
+        logger = logging.getLogger("test_service_trace")
+        with self.assertLogs(logger, logging.DEBUG) as logs:
+            TRACE.enable(sink=logging_sink(logger))
+            solve_dp([10.0, 0.5], [5, 5], 21.0)
+        self.assertEqual(logs.records[-1].trace["difference"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()